@@ -59,16 +59,34 @@ function migrate(db: Database): void {
       tokens_out INTEGER,
       cost_usd REAL,
       error TEXT,
+      metadata TEXT,
       FOREIGN KEY (trace_id) REFERENCES traces(id),
       FOREIGN KEY (parent_span_id) REFERENCES spans(id)
     );
 
+    CREATE TABLE IF NOT EXISTS blobs (
+      project_id TEXT NOT NULL,
+      digest TEXT NOT NULL,
+      content TEXT NOT NULL,
+      created_at TEXT DEFAULT (datetime('now')),
+      PRIMARY KEY (project_id, digest),
+      FOREIGN KEY (project_id) REFERENCES projects(id)
+    );
+
     CREATE INDEX IF NOT EXISTS idx_traces_project ON traces(project_id);
     CREATE INDEX IF NOT EXISTS idx_traces_started ON traces(started_at);
     CREATE INDEX IF NOT EXISTS idx_spans_trace ON spans(trace_id);
     CREATE INDEX IF NOT EXISTS idx_spans_started ON spans(started_at);
   `);
 
+  // Databases created before spans.metadata existed
+  const spanColumns = db.prepare("PRAGMA table_info(spans)").all() as {
+    name: string;
+  }[];
+  if (!spanColumns.some((col) => col.name === "metadata")) {
+    db.exec("ALTER TABLE spans ADD COLUMN metadata TEXT");
+  }
+
   // Seed a default project if none exist
   const count = db.prepare("SELECT COUNT(*) as n FROM projects").get() as {
     n: number;
@@ -1,6 +1,7 @@
 import { Hono } from "hono";
 import { cors } from "hono/cors";
 import { logger } from "hono/logger";
+import blobs from "./routes/blobs";
 import health from "./routes/health";
 import spans from "./routes/spans";
 import stats from "./routes/stats";
@@ -23,6 +24,7 @@ app.use(
 app.route("/v1/health", health);
 app.route("/v1/traces", traces);
 app.route("/v1/spans", spans);
+app.route("/v1/blobs", blobs);
 app.route("/v1/stats", stats);
 
 // Root
@@ -0,0 +1,44 @@
+import { Hono } from "hono";
+import { getDb } from "../db/schema";
+import { authMiddleware } from "../services/auth";
+
+const blobs = new Hono();
+
+// Ingest content-addressed blobs referenced from span input (batch)
+blobs.post("/", authMiddleware, async (c) => {
+  const projectId = c.get("projectId");
+  const body = await c.req.json();
+  const items = Array.isArray(body) ? body : [body];
+  const db = getDb();
+
+  const insert = db.prepare(`
+    INSERT OR IGNORE INTO blobs (project_id, digest, content)
+    VALUES (?, ?, ?)
+  `);
+
+  const insertMany = db.transaction(() => {
+    for (const b of items) {
+      insert.run(projectId, b.digest, JSON.stringify(b.content));
+    }
+  });
+
+  insertMany();
+  return c.json({ ingested: items.length }, 201);
+});
+
+// Get a single blob
+blobs.get("/:digest", authMiddleware, async (c) => {
+  const projectId = c.get("projectId");
+  const db = getDb();
+
+  const row = db
+    .prepare("SELECT content FROM blobs WHERE project_id = ? AND digest = ?")
+    .get(projectId, c.req.param("digest")) as { content: string } | null;
+
+  if (!row) {
+    return c.json({ error: "Blob not found" }, 404);
+  }
+  return c.json({ digest: c.req.param("digest"), content: JSON.parse(row.content) });
+});
+
+export default blobs;
@@ -13,8 +13,8 @@ spans.post("/", authMiddleware, async (c) => {
   const insert = db.prepare(`
     INSERT OR REPLACE INTO spans
       (id, trace_id, parent_span_id, name, kind, started_at, ended_at,
-       input, output, model, tokens_in, tokens_out, cost_usd, error)
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+       input, output, model, tokens_in, tokens_out, cost_usd, error, metadata)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
   `);
 
   const insertMany = db.transaction(() => {
@@ -33,7 +33,8 @@ spans.post("/", authMiddleware, async (c) => {
         s.tokens_in || null,
         s.tokens_out || null,
         s.cost_usd || null,
-        s.error || null
+        s.error || null,
+        s.metadata ? JSON.stringify(s.metadata) : null
       );
     }
   });
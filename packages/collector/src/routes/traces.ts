@@ -1,6 +1,7 @@
 import { Hono } from "hono";
 import { getDb } from "../db/schema";
 import { authMiddleware } from "../services/auth";
+import { expandBlobs } from "../services/blobs";
 
 const traces = new Hono();
 
@@ -99,9 +100,11 @@ traces.get("/:id", authMiddleware, async (c) => {
     return c.json({ error: "Trace not found" }, 404);
   }
 
-  const spans = db
-    .prepare("SELECT * FROM spans WHERE trace_id = ? ORDER BY started_at ASC")
-    .all(traceId);
+  const spans = (
+    db
+      .prepare("SELECT * FROM spans WHERE trace_id = ? ORDER BY started_at ASC")
+      .all(traceId) as any[]
+  ).map((s) => ({ ...s, input: expandBlobs(db, projectId, s.input) }));
 
   return c.json({ ...(trace as any), spans });
 });
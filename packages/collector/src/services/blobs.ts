@@ -0,0 +1,47 @@
+import type { Database } from "bun:sqlite";
+
+const BLOB_KEY = "$blob";
+
+/**
+ * Replaces {"$blob": digest} references in a stored JSON column with the
+ * blob content, so clients see span input exactly as the SDK captured it.
+ */
+export function expandBlobs(
+  db: Database,
+  projectId: string,
+  json: string | null
+): string | null {
+  if (!json || !json.includes(BLOB_KEY)) {
+    return json;
+  }
+
+  const lookup = db.prepare(
+    "SELECT content FROM blobs WHERE project_id = ? AND digest = ?"
+  );
+  const cache = new Map<string, unknown>();
+
+  const expand = (value: any): any => {
+    if (Array.isArray(value)) {
+      return value.map(expand);
+    }
+    if (value && typeof value === "object") {
+      const keys = Object.keys(value);
+      if (keys.length === 1 && keys[0] === BLOB_KEY) {
+        const digest = value[BLOB_KEY];
+        if (!cache.has(digest)) {
+          const row = lookup.get(projectId, digest) as { content: string } | null;
+          cache.set(digest, row ? JSON.parse(row.content) : value);
+        }
+        return cache.get(digest);
+      }
+      const out: Record<string, any> = {};
+      for (const key of keys) {
+        out[key] = expand(value[key]);
+      }
+      return out;
+    }
+    return value;
+  };
+
+  return JSON.stringify(expand(JSON.parse(json)));
+}
@@ -46,6 +46,7 @@ export interface Span {
 	tokens_out: number | null;
 	cost_usd: number | null;
 	error: string | null;
+	metadata: string | null;
 }
 
 export interface TraceWithSpans extends Trace {
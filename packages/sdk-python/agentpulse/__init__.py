@@ -1,20 +1,38 @@
 """AgentPulse - Lightweight observability for AI agents."""
 
+from .cache import ResponseCache, ToolCache
 from .client import AgentPulse, get_client
+from .compaction import CompactionProcessor
 from .decorators import tool, trace
+from .limits import Limiter
+from .loop_monitor import LoopMonitor
 from .models import MODEL_COSTS, Span, SpanKind, Trace, TraceStatus, calculate_cost
+from .processors import BatchProcessor, SpanProcessor
+from .profiling import StackSampler
+from .ratelimits import RateLimitTracker
+from .resources import ResourceProcessor
 
 __all__ = [
     "AgentPulse",
     "get_client",
     "trace",
     "tool",
+    "ToolCache",
+    "ResponseCache",
+    "Limiter",
+    "RateLimitTracker",
     "Trace",
     "Span",
     "SpanKind",
     "TraceStatus",
     "calculate_cost",
     "MODEL_COSTS",
+    "SpanProcessor",
+    "BatchProcessor",
+    "ResourceProcessor",
+    "StackSampler",
+    "CompactionProcessor",
+    "LoopMonitor",
 ]
 
 __version__ = "0.1.0"
@@ -0,0 +1,41 @@
+"""Interpreter startup hook used by `agentpulse-run`.
+
+`agentpulse-run` puts this directory on PYTHONPATH, so Python imports this
+file as `sitecustomize`. It loads `agentpulse/autoinstrument.py` by path,
+without importing the SDK, installs the lazy import hook, and then hands over
+to any other `sitecustomize` on the path.
+"""
+
+import importlib.util
+import os
+import sys
+
+
+def _install() -> None:
+    here = os.path.dirname(os.path.abspath(__file__))
+    path = os.path.join(os.path.dirname(here), "autoinstrument.py")
+    spec = importlib.util.spec_from_file_location("_agentpulse_autoinstrument", path)
+    if spec is None or spec.loader is None:
+        return
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    module.bootstrap()
+
+
+def _chain() -> None:
+    here = os.path.dirname(os.path.abspath(__file__))
+    ours = sys.modules.pop("sitecustomize", None)
+    saved = sys.path[:]
+    sys.path[:] = [entry for entry in sys.path if os.path.abspath(entry or ".") != here]
+    try:
+        importlib.import_module("sitecustomize")
+    except ImportError:
+        if ours is not None:
+            sys.modules["sitecustomize"] = ours
+    finally:
+        sys.path[:] = saved
+
+
+_install()
+_chain()
@@ -0,0 +1,354 @@
+"""Offline columnar analytics over exported traces and spans.
+
+Records are streamed from `FileExporter` output directories or `SQLiteExporter`
+databases straight into compact columns: numbers in `array.array("d")` (8
+bytes per value, NaN for missing) and strings as integer codes plus a label
+list. Aggregations then run over whole columns, with NumPy when it is
+installed and in plain Python otherwise.
+
+Usage:
+    from agentpulse.analysis import load_spans, load_traces
+
+    spans = load_spans("agentpulse-data")
+    spans.group_by("model", "duration_ms")   # count/sum/mean/percentiles per model
+    spans.percentiles("duration_ms", where=("kind", "llm"))
+    load_traces("traces.db").trend("total_cost_usd", bucket=3600, by="agent_name")
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import math
+import os
+import sqlite3
+from array import array
+from collections.abc import Iterable, Iterator, Sequence
+from typing import Any
+
+from .exporters.file import FILE_PREFIX, FILE_SUFFIX
+from .upload import UPLOADED_SUFFIX
+
+try:
+    import numpy as _np
+except ImportError:  # pragma: no cover - exercised when NumPy is absent
+    _np = None
+
+NAN = float("nan")
+DEFAULT_PERCENTILES = (50, 95, 99)
+
+_SPAN_NUMERIC = ("started_at", "duration_ms", "tokens_in", "tokens_out", "cost_usd")
+_SPAN_CATEGORICAL = ("name", "kind", "model", "status")
+_TRACE_NUMERIC = (
+    "started_at",
+    "duration_ms",
+    "total_tokens_in",
+    "total_tokens_out",
+    "total_cost_usd",
+)
+_TRACE_CATEGORICAL = ("agent_name", "status")
+
+_SQL = {
+    "span": (
+        "SELECT started_at, ended_at, tokens_in, tokens_out, cost_usd, name, kind, "
+        "model, error FROM spans"
+    ),
+    "trace": (
+        "SELECT started_at, ended_at, total_tokens_in, total_tokens_out, "
+        "total_cost_usd, agent_name, status "
+        "FROM traces"
+    ),
+}
+
+
+def read_records(source: str, kind: str = "span") -> Iterator[dict[str, Any]]:
+    """Stream `span` or `trace` records from an export directory, file or SQLite db."""
+    if os.path.isdir(source):
+        names = sorted(
+            n
+            for n in os.listdir(source)
+            if n.startswith(FILE_PREFIX)
+            and (n.endswith(FILE_SUFFIX) or n.endswith(FILE_SUFFIX + UPLOADED_SUFFIX))
+        )
+        for name in names:
+            yield from _read_file(os.path.join(source, name), kind)
+    elif ".ndjson" in os.path.basename(source):
+        yield from _read_file(source, kind)
+    else:
+        yield from _read_sqlite(source, kind)
+
+
+def _read_file(path: str, kind: str) -> Iterator[dict[str, Any]]:
+    with gzip.open(path, "rt", encoding="utf-8") as fh:
+        for line in fh:
+            record = json.loads(line)
+            if record.get("type") == kind:
+                yield record["data"]
+
+
+def _read_sqlite(path: str, kind: str) -> Iterator[dict[str, Any]]:
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    try:
+        for row in conn.execute(_SQL[kind]):
+            yield dict(row)
+    finally:
+        conn.close()
+
+
+class Columns:
+    """A column-oriented table of numeric and categorical columns.
+
+    Numeric columns are `array("d")` with NaN for missing values; categorical
+    columns are `array("l")` codes into `labels(name)`. `column(name)` returns
+    a zero-copy NumPy view when NumPy is installed.
+    """
+
+    def __init__(self, numeric: Sequence[str], categorical: Sequence[str]) -> None:
+        self._numeric: dict[str, array] = {name: array("d") for name in numeric}
+        self._codes: dict[str, array] = {name: array("l") for name in categorical}
+        self._labels: dict[str, list[str | None]] = {name: [] for name in categorical}
+        self._index: dict[str, dict[str | None, int]] = {
+            name: {} for name in categorical
+        }
+        self._rows = 0
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def append(
+        self, numbers: Iterable[float], categories: Iterable[str | None]
+    ) -> None:
+        """Append one row; values are given in column order."""
+        for column, value in zip(self._numeric.values(), numbers):
+            column.append(value)
+        for name, value in zip(self._codes, categories):
+            index = self._index[name]
+            code = index.get(value)
+            if code is None:
+                code = index[value] = len(self._labels[name])
+                self._labels[name].append(value)
+            self._codes[name].append(code)
+        self._rows += 1
+
+    def column(self, name: str) -> Any:
+        data = self._numeric.get(name)
+        if data is None:
+            data = self._codes[name]
+        if _np is not None:
+            return _np.frombuffer(
+                data,
+                dtype=_np.float64
+                if data.typecode == "d"
+                else _np.dtype(f"i{data.itemsize}"),
+            )
+        return data
+
+    def labels(self, name: str) -> list[str | None]:
+        return self._labels[name]
+
+    def percentiles(
+        self,
+        value: str,
+        q: Sequence[float] = DEFAULT_PERCENTILES,
+        where: tuple[str, str | None] | None = None,
+    ) -> dict[str, float]:
+        """Percentiles of a numeric column, optionally filtered by `where`."""
+        values = self._numeric[value]
+        if where is not None:
+            column, label = where
+            code = self._index[column].get(label)
+            codes = self._codes[column]
+            if code is None:
+                return {f"p{p:g}": NAN for p in q}
+            if _np is not None:
+                selected = self.column(value)[self.column(column) == code]
+            else:
+                selected = array("d", (v for v, c in zip(values, codes) if c == code))
+        else:
+            selected = self.column(value) if _np is not None else values
+        return _percentiles(selected, q)
+
+    def group_by(
+        self,
+        key: str,
+        value: str,
+        q: Sequence[float] = DEFAULT_PERCENTILES,
+    ) -> dict[str | None, dict[str, float]]:
+        """Per-label `count`, `sum`, `mean`, `min`, `max` and percentiles of `value`.
+
+        Missing (NaN) values are ignored; `count` is the number of present values.
+        """
+        labels = self._labels[key]
+        if _np is not None:
+            groups = _group_numpy(self.column(key), self.column(value), len(labels))
+        else:
+            groups = _group_python(self._codes[key], self._numeric[value], len(labels))
+        result: dict[str | None, dict[str, float]] = {}
+        for code, values in enumerate(groups):
+            if len(values) == 0:
+                continue
+            total = float(sum(values)) if _np is None else float(values.sum())
+            stats = {
+                "count": len(values),
+                "sum": total,
+                "mean": total / len(values),
+                "min": float(values[0]),
+                "max": float(values[-1]),
+            }
+            stats.update(_percentiles(values, q, presorted=True))
+            result[labels[code]] = stats
+        return result
+
+    def trend(
+        self,
+        value: str = "cost_usd",
+        bucket: float = 3600.0,
+        by: str | None = None,
+        time_column: str = "started_at",
+    ) -> dict[Any, dict[float, float]]:
+        """Sum of `value` per `bucket`-second time window, keyed by window start.
+
+        Returns `{None: {window: sum}}`, or `{label: {window: sum}}` with `by`.
+        """
+        times = self._numeric[time_column]
+        values = self._numeric[value]
+        groups = self._codes[by] if by is not None else None
+        labels = self._labels[by] if by is not None else [None]
+        sums: dict[tuple[int, int], float] = {}
+        if _np is not None and len(times):
+            t = self.column(time_column)
+            v = self.column(value)
+            codes = (
+                self.column(by)
+                if by is not None
+                else _np.zeros(len(t), dtype=_np.int64)
+            )
+            mask = ~(_np.isnan(t) | _np.isnan(v))
+            windows = _np.floor(t[mask] / bucket).astype(_np.int64)
+            codes = codes[mask].astype(_np.int64)
+            if len(windows):
+                first = int(windows.min())
+                span = int(windows.max()) - first + 1
+                totals = _np.bincount(
+                    (windows - first) * len(labels) + codes,
+                    weights=v[mask],
+                    minlength=span * len(labels),
+                )
+                counts = _np.bincount(
+                    (windows - first) * len(labels) + codes,
+                    minlength=span * len(labels),
+                )
+                for flat in _np.nonzero(counts)[0]:
+                    window, code = divmod(int(flat), len(labels))
+                    sums[(code, window + first)] = float(totals[flat])
+        else:
+            for i, (t, v) in enumerate(zip(times, values)):
+                if math.isnan(t) or math.isnan(v):
+                    continue
+                slot = (groups[i] if groups is not None else 0, math.floor(t / bucket))
+                sums[slot] = sums.get(slot, 0.0) + v
+        result: dict[Any, dict[float, float]] = {}
+        for (code, window), total in sorted(sums.items()):
+            result.setdefault(labels[code], {})[window * bucket] = total
+        return result
+
+
+def load_spans(source: str) -> Columns:
+    """Load span records into columns.
+
+    Numeric: `started_at`, `duration_ms`, `tokens_in`, `tokens_out`, `cost_usd`.
+    Categorical: `name`, `kind`, `model`, `status` (`ok` or `error`).
+    """
+    columns = Columns(_SPAN_NUMERIC, _SPAN_CATEGORICAL)
+    append = columns.append
+    for record in read_records(source, "span"):
+        started = record["started_at"]
+        append(
+            (
+                started,
+                _duration_ms(started, record.get("ended_at")),
+                _number(record.get("tokens_in")),
+                _number(record.get("tokens_out")),
+                _number(record.get("cost_usd")),
+            ),
+            (
+                record["name"],
+                record["kind"],
+                record.get("model"),
+                "error" if record.get("error") else "ok",
+            ),
+        )
+    return columns
+
+
+def load_traces(source: str) -> Columns:
+    """Load trace records into columns.
+
+    Numeric: `started_at`, `duration_ms`, `total_tokens_in`, `total_tokens_out`,
+    `total_cost_usd`. Categorical: `agent_name`, `status`.
+    """
+    columns = Columns(_TRACE_NUMERIC, _TRACE_CATEGORICAL)
+    append = columns.append
+    for record in read_records(source, "trace"):
+        started = record["started_at"]
+        append(
+            (
+                started,
+                _duration_ms(started, record.get("ended_at")),
+                _number(record.get("total_tokens_in")),
+                _number(record.get("total_tokens_out")),
+                _number(record.get("total_cost_usd")),
+            ),
+            (record.get("agent_name"), record.get("status")),
+        )
+    return columns
+
+
+def _number(value: Any) -> float:
+    return NAN if value is None else float(value)
+
+
+def _duration_ms(started: float, ended: float | None) -> float:
+    return NAN if ended is None else (ended - started) * 1000
+
+
+def _group_numpy(codes: Any, values: Any, groups: int) -> list[Any]:
+    """Split `values` into sorted per-code arrays with one lexsort."""
+    mask = ~_np.isnan(values)
+    codes, values = codes[mask], values[mask]
+    order = _np.lexsort((values, codes))
+    counts = _np.bincount(codes, minlength=groups)
+    return _np.split(values[order], _np.cumsum(counts)[:-1])
+
+
+def _group_python(codes: array, values: array, groups: int) -> list[array]:
+    buckets = [array("d") for _ in range(groups)]
+    for code, value in zip(codes, values):
+        if value == value:  # skip NaN
+            buckets[code].append(value)
+    return [array("d", sorted(bucket)) for bucket in buckets]
+
+
+def _percentiles(
+    values: Any, q: Sequence[float], presorted: bool = False
+) -> dict[str, float]:
+    """Linear-interpolation percentiles (NumPy's default method), ignoring NaN."""
+    if _np is not None:
+        data = _np.asarray(values, dtype=_np.float64)
+        if not presorted:
+            data = _np.sort(data[~_np.isnan(data)])
+        if not len(data):
+            return {f"p{p:g}": NAN for p in q}
+        return {f"p{p:g}": float(v) for p, v in zip(q, _np.percentile(data, q))}
+    data = values if presorted else sorted(v for v in values if v == v)
+    result = {}
+    for p in q:
+        if not len(data):
+            result[f"p{p:g}"] = NAN
+            continue
+        rank = (len(data) - 1) * p / 100
+        low = math.floor(rank)
+        high = min(low + 1, len(data) - 1)
+        result[f"p{p:g}"] = data[low] + (data[high] - data[low]) * (rank - low)
+    return result
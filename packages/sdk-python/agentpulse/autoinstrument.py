@@ -0,0 +1,248 @@
+"""Patch LLM providers lazily, when their modules are first imported.
+
+`install()` puts an import hook on `sys.meta_path`. Nothing is imported up
+front: `openai` / `anthropic` are patched right after they are first
+imported, and the AgentPulse client the patches report to is resolved on the
+first LLM call - the current client, or one configured from
+`AGENTPULSE_API_KEY` / `AGENTPULSE_ENDPOINT`. Processes that never touch a
+provider only pay for installing the hook.
+
+This module imports nothing but the standard library at import time, so the
+`agentpulse-run` bootstrap can load it without importing the SDK itself.
+
+Usage:
+    from agentpulse import autoinstrument
+    autoinstrument.install()          # or: agentpulse-run python app.py
+
+    # {"install_ms": ..., "providers": {"openai": {"import_ms": ..., "patch_ms": ...}}}
+    autoinstrument.startup_stats()
+"""
+
+from __future__ import annotations
+
+import importlib.abc
+import importlib.machinery
+import os
+import sys
+import threading
+import time
+from collections.abc import Sequence
+from types import ModuleType
+from typing import Any
+
+PROVIDERS = ("openai", "anthropic")
+# Comma-separated providers to patch at startup ("1" or "all" for every provider).
+ENV_VAR = "AGENTPULSE_AUTOINSTRUMENT"
+# When set, `startup_stats()` is printed to stderr as JSON at exit.
+REPORT_ENV_VAR = "AGENTPULSE_STARTUP_REPORT"
+
+
+def install(
+    providers: Sequence[str] = PROVIDERS, **patch_options: Any
+) -> _PatchOnImport:
+    """Patch `providers` when they are imported (at once if they already are).
+
+    `patch_options` are passed to `patch_openai` / `patch_anthropic` (`cache`,
+    `rate_limits`, `limit`). Calling `install` again reuses the installed hook,
+    and already patched modules are never patched twice.
+    """
+    started = time.perf_counter()
+    hook = _installed_hook()
+    if hook is None:
+        hook = _PatchOnImport(patch_options)
+        sys.meta_path.insert(0, hook)
+    for name in providers:
+        if name not in PROVIDERS:
+            raise ValueError(
+                f"unknown provider {name!r}; expected one of {', '.join(PROVIDERS)}"
+            )
+        hook.watch(name)
+    hook.stats["install_ms"] = round(
+        hook.stats.get("install_ms", 0.0) + (time.perf_counter() - started) * 1000, 3
+    )
+    return hook
+
+
+def bootstrap() -> _PatchOnImport | None:
+    """Install the hook as configured by `AGENTPULSE_AUTOINSTRUMENT` (at startup)."""
+    value = os.environ.get(ENV_VAR, "").strip().lower()
+    if value in ("", "0", "false", "no"):
+        return None
+    if value in ("1", "true", "yes", "all"):
+        providers: Sequence[str] = PROVIDERS
+    else:
+        providers = tuple(name.strip() for name in value.split(",") if name.strip())
+    hook = install(providers)
+    if os.environ.get(REPORT_ENV_VAR):
+        import atexit
+
+        atexit.register(_report)
+    return hook
+
+
+def _report() -> None:
+    import json
+
+    print(f"agentpulse startup: {json.dumps(startup_stats())}", file=sys.stderr)
+
+
+def startup_stats() -> dict[str, Any]:
+    """Time spent installing the hook and, per provider, importing and patching it."""
+    hook = _installed_hook()
+    return dict(hook.stats) if hook is not None else {}
+
+
+def uninstall() -> None:
+    """Remove the import hook. Modules already patched stay patched."""
+    sys.meta_path[:] = [
+        finder
+        for finder in sys.meta_path
+        if not getattr(finder, "_agentpulse_hook", False)
+    ]
+
+
+def _installed_hook() -> _PatchOnImport | None:
+    # Matched by attribute, not class: the bootstrap may have loaded a
+    # separate copy of this module before `agentpulse` was imported.
+    for finder in sys.meta_path:
+        if getattr(finder, "_agentpulse_hook", False):
+            return finder  # type: ignore[return-value]
+    return None
+
+
+class _PatchOnImport(importlib.abc.MetaPathFinder):
+    _agentpulse_hook = True
+
+    def __init__(self, patch_options: dict[str, Any]) -> None:
+        self.patch_options = patch_options
+        self.stats: dict[str, Any] = {"providers": {}}
+        self._pending: set[str] = set()
+        self._lock = threading.Lock()
+
+    def watch(self, name: str) -> None:
+        module = sys.modules.get(name)
+        with self._lock:
+            if name in self.stats["providers"]:
+                return
+            if module is None:
+                self._pending.add(name)
+                return
+        self.patch(name, 0.0)
+
+    def find_spec(
+        self,
+        fullname: str,
+        path: Sequence[str] | None,
+        target: ModuleType | None = None,
+    ) -> importlib.machinery.ModuleSpec | None:
+        if fullname not in self._pending:
+            return None
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = _PatchingLoader(spec.loader, self, fullname)
+        return spec
+
+    def patch(self, name: str, import_s: float) -> None:
+        with self._lock:
+            if name in self.stats["providers"]:
+                return
+            self._pending.discard(name)
+            record = self.stats["providers"][name] = {
+                "import_ms": round(import_s * 1000, 3)
+            }
+        started = time.perf_counter()
+        try:
+            getattr(_CurrentClient(), f"patch_{name}")(**self.patch_options)
+        except Exception as exc:  # never break the application's import
+            import logging
+
+            logging.getLogger("agentpulse").warning(
+                "AgentPulse: failed to patch %s on import: %s", name, exc
+            )
+            record["error"] = str(exc)
+        record["patch_ms"] = round((time.perf_counter() - started) * 1000, 3)
+
+
+class _PatchingLoader(importlib.abc.Loader):
+    """Runs the real loader, then patches the freshly executed module."""
+
+    def __init__(self, loader: Any, hook: _PatchOnImport, name: str) -> None:
+        self._loader = loader
+        self._hook = hook
+        self._name = name
+
+    def create_module(self, spec: importlib.machinery.ModuleSpec) -> ModuleType | None:
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module: ModuleType) -> None:
+        started = time.perf_counter()
+        # Give the module its real loader back so introspection sees no wrapper.
+        module.__loader__ = self._loader
+        if module.__spec__ is not None:
+            module.__spec__.loader = self._loader
+        self._loader.exec_module(module)
+        self._hook.patch(self._name, time.perf_counter() - started)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._loader, name)
+
+
+class _CurrentClient:
+    """Stands in for the client in lazily installed patches.
+
+    Attributes are looked up on the current client when an LLM call is made,
+    so a client created after the provider was imported still receives its
+    spans, and none is created until then. Attributes the patches set while
+    no client exists yet (`rate_limits`) are kept and copied onto the client
+    once it is resolved; later writes go straight to the client.
+    """
+
+    def __init__(self) -> None:
+        object.__setattr__(self, "_pending", {"rate_limits": None})
+
+    def patch_openai(self, **options: Any) -> Any:
+        from agentpulse.patches.openai import patch_openai
+
+        return patch_openai(self, **options)  # type: ignore[arg-type]
+
+    def patch_anthropic(self, **options: Any) -> Any:
+        from agentpulse.patches.anthropic import patch_anthropic
+
+        return patch_anthropic(self, **options)  # type: ignore[arg-type]
+
+    def __getattr__(self, name: str) -> Any:
+        from agentpulse.client import get_client
+
+        if name in self._pending and get_client() is None:
+            return self._pending[name]
+        return getattr(self._resolve(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        from agentpulse.client import get_client
+
+        client = get_client()
+        if client is None:
+            self._pending[name] = value
+        else:
+            setattr(client, name, value)
+
+    def _resolve(self) -> Any:
+        from agentpulse.client import AgentPulse, get_client
+
+        client = get_client()
+        if client is None:
+            client = AgentPulse(
+                api_key=os.environ.get("AGENTPULSE_API_KEY"),
+                endpoint=os.environ.get("AGENTPULSE_ENDPOINT", "http://localhost:3000"),
+            )
+        for name, value in self._pending.items():
+            if value is not None and getattr(client, name, None) is None:
+                setattr(client, name, value)
+        return client
@@ -0,0 +1,359 @@
+"""Result caching for `@tool` functions."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from .models import Span
+
+logger = logging.getLogger("agentpulse")
+
+HIT = "hit"
+MISS = "miss"
+COALESCED = "coalesced"
+
+
+@dataclass
+class _Entry:
+    value: Any
+    expires_at: float | None
+    duration: float
+
+
+class ToolCache:
+    """In-memory LRU cache with TTL and optional on-disk backing store.
+
+    Concurrent calls with the same key are coalesced: only the first one runs
+    the tool, the others wait for its result (per thread for sync tools, per
+    event loop for async tools). Exceptions are never cached.
+
+    Args:
+        maxsize: maximum number of in-memory entries.
+        ttl: seconds an entry stays valid; None keeps entries until evicted.
+        path: optional SQLite file used as a persistent second level, so
+            results survive across runs. Values must be picklable.
+        key: optional function `(args, kwargs) -> str` computing the cache key;
+            by default the arguments are JSON-encoded. Calls whose arguments
+            have no JSON form are not cached (a warning is logged once per
+            tool), since their repr may embed a reusable memory address.
+
+    Usage:
+        @tool(cache=ToolCache(ttl=3600, path=".agentpulse-cache.db"))
+        def search(query: str) -> list[str]: ...
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float | None = None,
+        path: str | None = None,
+        key: Callable[[tuple[Any, ...], dict[str, Any]], str] | None = None,
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._key = key
+        self._unkeyable: set[str] = set()
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight: dict[str, threading.Event] = {}
+        self._async_inflight: dict[tuple[int, str], asyncio.Future[Any]] = {}
+        self._disk: sqlite3.Connection | None = None
+        self._disk_lock = threading.Lock()
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._disk = sqlite3.connect(
+                path, check_same_thread=False, isolation_level=None
+            )
+            self._disk.execute("PRAGMA journal_mode = WAL")
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS tool_cache "
+                "(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL, "
+                "duration REAL NOT NULL)"
+            )
+
+    def make_key(
+        self, name: str, args: tuple[Any, ...], kwargs: dict[str, Any]
+    ) -> str | None:
+        """Cache key for a call, or None if the arguments can't be keyed reliably."""
+        if self._key is not None:
+            raw = f"{name}:{self._key(args, kwargs)}"
+        else:
+            try:
+                raw = f"{name}:{json.dumps([args, kwargs], sort_keys=True)}"
+            except (TypeError, ValueError):
+                return None
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _uncached(self, name: str) -> None:
+        if name not in self._unkeyable:
+            self._unkeyable.add(name)
+            logger.warning(
+                "AgentPulse: %s called with arguments that have no JSON form; "
+                "not caching them (pass key=)",
+                name,
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        if self._disk is not None:
+            with self._disk_lock:
+                self._disk.execute("DELETE FROM tool_cache")
+
+    def call(
+        self,
+        name: str,
+        func: Callable[..., Any],
+        args: tuple[Any, ...],
+        kwargs: dict[str, Any],
+        span: Span | None = None,
+    ) -> Any:
+        """Return the cached result for a sync tool call, running it on a miss."""
+        key = self.make_key(name, args, kwargs)
+        if key is None:
+            self._uncached(name)
+            return func(*args, **kwargs)
+        start = time.perf_counter()
+
+        while True:
+            entry = self._get(key)
+            if entry is not None:
+                _record(span, HIT, entry.duration)
+                return entry.value
+            with self._lock:
+                event = self._inflight.get(key)
+                if event is None:
+                    event = self._inflight[key] = threading.Event()
+                    leader = True
+                else:
+                    leader = False
+            if leader:
+                break
+            event.wait()
+            entry = self._get(key)
+            if entry is not None:
+                _record(span, COALESCED, entry.duration - (time.perf_counter() - start))
+                return entry.value
+            # The leader failed; retry and possibly become the leader ourselves.
+
+        try:
+            value = func(*args, **kwargs)
+            self._put(key, value, time.perf_counter() - start)
+            _record(span, MISS, 0.0)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            event.set()
+
+    async def acall(
+        self,
+        name: str,
+        func: Callable[..., Any],
+        args: tuple[Any, ...],
+        kwargs: dict[str, Any],
+        span: Span | None = None,
+    ) -> Any:
+        """Async counterpart of `call`; coalesces concurrent calls on the same loop."""
+        key = self.make_key(name, args, kwargs)
+        if key is None:
+            self._uncached(name)
+            return await func(*args, **kwargs)
+        start = time.perf_counter()
+        entry = self._get(key)
+        if entry is not None:
+            _record(span, HIT, entry.duration)
+            return entry.value
+
+        flight_key = (id(asyncio.get_running_loop()), key)
+        future = self._async_inflight.get(flight_key)
+        if future is not None:
+            try:
+                value = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The leader was cancelled; run the call ourselves.
+                return await self.acall(name, func, args, kwargs, span)
+            except Exception:
+                # The leader failed; retry and possibly become the leader ourselves.
+                return await self.acall(name, func, args, kwargs, span)
+            entry = self._get(key)
+            duration = entry.duration if entry is not None else 0.0
+            _record(span, COALESCED, duration - (time.perf_counter() - start))
+            return value
+
+        future = asyncio.get_running_loop().create_future()
+        self._async_inflight[flight_key] = future
+        try:
+            value = await func(*args, **kwargs)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            # Consume the exception so an unawaited future does not log a warning.
+            future.exception()
+            raise
+        finally:
+            self._async_inflight.pop(flight_key, None)
+        # Release the followers before persisting; they read the entry once resumed.
+        future.set_result(value)
+        self._put(key, value, time.perf_counter() - start)
+        _record(span, MISS, 0.0)
+        return value
+
+    def _get(self, key: str) -> _Entry | None:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.expires_at is None or entry.expires_at > now:
+                    self._entries.move_to_end(key)
+                    return entry
+                del self._entries[key]
+
+        if self._disk is None:
+            return None
+        try:
+            with self._disk_lock:
+                row = self._disk.execute(
+                    "SELECT value, expires_at, duration FROM tool_cache WHERE key = ?",
+                    (key,),
+                ).fetchone()
+        except sqlite3.Error as exc:
+            logger.debug("AgentPulse: tool cache read failed: %s", exc)
+            return None
+        if row is None or (row[1] is not None and row[1] <= now):
+            return None
+        try:
+            entry = _Entry(pickle.loads(row[0]), row[1], row[2])
+        except Exception:
+            return None
+        self._remember(key, entry)
+        return entry
+
+    def _put(self, key: str, value: Any, duration: float) -> None:
+        expires_at = time.time() + self.ttl if self.ttl is not None else None
+        entry = _Entry(value, expires_at, duration)
+        self._remember(key, entry)
+        if self._disk is None:
+            return
+        try:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as exc:
+            logger.debug(
+                "AgentPulse: tool result not picklable, caching in memory only: %s", exc
+            )
+            return
+        try:
+            with self._disk_lock:
+                self._disk.execute(
+                    "INSERT OR REPLACE INTO tool_cache "
+                    "(key, value, expires_at, duration) VALUES (?, ?, ?, ?)",
+                    (key, blob, expires_at, duration),
+                )
+        except sqlite3.Error as exc:
+            logger.debug(
+                "AgentPulse: tool cache write failed, caching in memory only: %s", exc
+            )
+
+    def _remember(self, key: str, entry: _Entry) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+def _record(span: Span | None, status: str, saved: float) -> None:
+    if span is not None:
+        span.set_metadata(
+            "cache", {"status": status, "saved_ms": round(max(saved, 0.0) * 1000, 3)}
+        )
+
+
+# Request options that do not change what the model generates.
+_NON_SEMANTIC_KWARGS = frozenset(
+    {"timeout", "extra_headers", "extra_query", "user", "metadata", "store"}
+)
+
+
+class ResponseCache(ToolCache):
+    """Exact-match cache for LLM responses, used by the OpenAI/Anthropic patches.
+
+    The key is a canonical hash of the model, messages and every sampling
+    parameter. Only deterministic requests are cached: `temperature` must be
+    explicitly 0, `n` must be 1 and streaming is never cached. Set
+    `require_deterministic=False` to cache every non-streaming request.
+
+    Usage:
+        cache = ResponseCache(ttl=86400, path=".agentpulse-llm.db")
+        ap.patch_openai(client, cache=cache)
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float | None = None,
+        path: str | None = None,
+        require_deterministic: bool = True,
+    ) -> None:
+        super().__init__(maxsize=maxsize, ttl=ttl, path=path)
+        self.require_deterministic = require_deterministic
+
+    def is_cacheable(self, kwargs: dict[str, Any]) -> bool:
+        if kwargs.get("stream"):
+            return False
+        if not self.require_deterministic:
+            return True
+        return kwargs.get("temperature") == 0 and kwargs.get("n", 1) == 1
+
+    def make_key(
+        self, name: str, args: tuple[Any, ...], kwargs: dict[str, Any]
+    ) -> str | None:
+        request = {
+            key: value
+            for key, value in kwargs.items()
+            if key not in _NON_SEMANTIC_KWARGS
+        }
+        try:
+            raw = json.dumps(
+                [name, args, request],
+                sort_keys=True,
+                separators=(",", ":"),
+                default=_model_dump,
+            )
+        except (TypeError, ValueError):
+            return None
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _model_dump(value: Any) -> Any:
+    """JSON form of SDK request objects (pydantic models); anything else is unkeyed."""
+    dump = getattr(value, "model_dump", None)
+    if callable(dump):
+        return dump()
+    raise TypeError(f"{type(value).__name__} has no JSON form")
+
+
+def record_cached_llm_call(span: Span) -> None:
+    """Mark an LLM span served from `ResponseCache`: no cost, flagged as cached."""
+    cache = (span.metadata or {}).get("cache")
+    if cache and cache["status"] != MISS:
+        span.cost_usd = 0.0
+        span.set_metadata("cached", True)
@@ -0,0 +1,275 @@
+"""Command-line entry point: `agentpulse <command>`."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import sys
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="agentpulse", description="AgentPulse command-line tools"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    up = commands.add_parser(
+        "upload", help="upload files written by FileExporter to a collector"
+    )
+    up.add_argument("directory", help="directory containing *.ndjson.gz export files")
+    up.add_argument(
+        "--endpoint",
+        default=os.environ.get("AGENTPULSE_ENDPOINT", "http://localhost:3000"),
+        help="collector URL (default: $AGENTPULSE_ENDPOINT or http://localhost:3000)",
+    )
+    up.add_argument(
+        "--api-key",
+        default=os.environ.get("AGENTPULSE_API_KEY"),
+        help="project API key (default: $AGENTPULSE_API_KEY)",
+    )
+    up.add_argument(
+        "--batch-size",
+        type=int,
+        default=1000,
+        help="records per request (default: 1000)",
+    )
+    up.add_argument(
+        "--concurrency", type=int, default=4, help="requests in flight (default: 4)"
+    )
+    up.add_argument(
+        "--retries", type=int, default=3, help="retries per batch (default: 3)"
+    )
+    up.add_argument(
+        "--delete",
+        action="store_true",
+        help="delete files once uploaded instead of renaming them",
+    )
+    up.add_argument(
+        "--stale-after",
+        type=float,
+        default=900.0,
+        help=(
+            "recover .part files left by crashed processes once idle this many "
+            "seconds (default: 900)"
+        ),
+    )
+
+    load = commands.add_parser(
+        "loadgen",
+        help="generate synthetic traces to measure SDK and collector capacity",
+    )
+    load.add_argument(
+        "--endpoint",
+        default=os.environ.get("AGENTPULSE_ENDPOINT", "http://localhost:3000"),
+        help="collector URL (default: $AGENTPULSE_ENDPOINT or http://localhost:3000)",
+    )
+    load.add_argument(
+        "--api-key",
+        default=os.environ.get("AGENTPULSE_API_KEY"),
+        help="project API key",
+    )
+    load.add_argument(
+        "--mode",
+        choices=("thread", "async", "process"),
+        default="thread",
+        help="concurrency model",
+    )
+    load.add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="threads, tasks or processes (default: 8)",
+    )
+    load.add_argument(
+        "--traces",
+        type=int,
+        default=1000,
+        help="number of traces to generate (default: 1000)",
+    )
+    load.add_argument(
+        "--depth", type=int, default=2, help="tool nesting depth (default: 2)"
+    )
+    load.add_argument(
+        "--fanout", type=int, default=3, help="child tools per span (default: 3)"
+    )
+    load.add_argument(
+        "--payload-bytes",
+        type=int,
+        default=256,
+        help="input/output size per span (default: 256)",
+    )
+    load.add_argument(
+        "--error-rate",
+        type=float,
+        default=0.0,
+        help="probability a tool raises (default: 0)",
+    )
+    load.add_argument(
+        "--batch-size", type=int, default=50, help="client batch size (default: 50)"
+    )
+    load.add_argument(
+        "--flush-interval",
+        type=float,
+        default=2.0,
+        help="client flush interval (default: 2.0)",
+    )
+    load.add_argument(
+        "--stub", action="store_true", help="run against an in-process stub collector"
+    )
+    load.add_argument(
+        "--stub-delay", type=float, default=0.0, help="stub response delay in seconds"
+    )
+    load.add_argument(
+        "--stub-fail-rate",
+        type=float,
+        default=0.0,
+        help="fraction of stub requests that fail",
+    )
+
+    stub = commands.add_parser(
+        "stub-collector",
+        help="run a lightweight collector that only records throughput",
+    )
+    stub.add_argument("--host", default="127.0.0.1")
+    stub.add_argument("--port", type=int, default=3000)
+    stub.add_argument(
+        "--delay", type=float, default=0.0, help="response delay in seconds"
+    )
+    stub.add_argument(
+        "--fail-rate",
+        type=float,
+        default=0.0,
+        help="fraction of requests answered with 503",
+    )
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if args.command == "upload":
+        return _upload(args)
+    if args.command == "loadgen":
+        return _loadgen(args)
+    if args.command == "stub-collector":
+        return _stub_collector(args)
+    return 2
+
+
+def _upload(args: argparse.Namespace) -> int:
+    from .upload import upload
+
+    stats = upload(
+        args.directory,
+        endpoint=args.endpoint,
+        api_key=args.api_key,
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        retries=args.retries,
+        delete=args.delete,
+        stale_after=args.stale_after,
+    )
+    print(f"uploaded {stats.files} file(s): {stats.traces} traces, {stats.spans} spans")
+    return 1 if stats.failed_batches else 0
+
+
+def _loadgen(args: argparse.Namespace) -> int:
+    from .loadgen import TraceShape, run
+    from .stub_collector import StubCollector
+
+    shape = TraceShape(
+        depth=args.depth,
+        fanout=args.fanout,
+        payload_bytes=args.payload_bytes,
+        error_rate=args.error_rate,
+    )
+    stub = None
+    endpoint = args.endpoint
+    if args.stub:
+        stub = StubCollector(
+            port=0, delay=args.stub_delay, fail_rate=args.stub_fail_rate
+        ).start()
+        endpoint = stub.endpoint
+
+    result = run(
+        endpoint=endpoint,
+        api_key=args.api_key,
+        shape=shape,
+        traces=args.traces,
+        concurrency=args.concurrency,
+        mode=args.mode,
+        batch_size=args.batch_size,
+        flush_interval=args.flush_interval,
+    )
+    if stub:
+        stub.stop()
+        result.rejected = stub.rejected
+    print(json.dumps({"loadgen": result.summary()}, indent=2))
+    if stub:
+        print(json.dumps({"collector": stub.summary()}, indent=2))
+    return 0
+
+
+def _stub_collector(args: argparse.Namespace) -> int:
+    from .stub_collector import StubCollector
+
+    stub = StubCollector(
+        host=args.host, port=args.port, delay=args.delay, fail_rate=args.fail_rate
+    )
+    print(f"AgentPulse stub collector running on {stub.endpoint}")
+    try:
+        stub.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(json.dumps(stub.summary(), indent=2))
+    return 0
+
+
+def run(argv: list[str] | None = None) -> int:
+    """`agentpulse-run`: start a command with providers patched lazily on import."""
+    from .autoinstrument import ENV_VAR, REPORT_ENV_VAR
+
+    parser = argparse.ArgumentParser(
+        prog="agentpulse-run",
+        description=(
+            "Run a command with OpenAI/Anthropic auto-instrumented when first imported."
+        ),
+    )
+    parser.add_argument(
+        "--providers",
+        default="all",
+        help=(
+            "comma-separated providers to patch: openai, anthropic or all "
+            "(default: all)"
+        ),
+    )
+    parser.add_argument(
+        "--report",
+        action="store_true",
+        help="print the SDK's startup cost to stderr at exit",
+    )
+    parser.add_argument(
+        "command", nargs=argparse.REMAINDER, help="command to run, e.g. python app.py"
+    )
+    args = parser.parse_args(argv)
+    if not args.command:
+        parser.error("a command is required")
+
+    bootstrap = os.path.join(os.path.dirname(os.path.abspath(__file__)), "_bootstrap")
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        p for p in (bootstrap, env.get("PYTHONPATH")) if p
+    )
+    env[ENV_VAR] = args.providers
+    if args.report:
+        env[REPORT_ENV_VAR] = "1"
+    try:
+        os.execvpe(args.command[0], args.command, env)
+    except OSError as exc:
+        print(f"agentpulse-run: cannot run {args.command[0]!r}: {exc}", file=sys.stderr)
+        return 127
+    return 0  # not reached
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,8 +4,10 @@ from __future__ import annotations
 
 import atexit
 import logging
+import threading
+from collections.abc import Generator
 from contextlib import contextmanager
-from typing import Any, Generator, Optional
+from typing import TYPE_CHECKING, Any
 
 from .context import (
     get_current_span,
@@ -14,14 +16,22 @@ from .context import (
     set_current_span,
 )
 from .models import Span, SpanKind, Trace, TraceStatus
-from .transport import Transport
+from .processors import BatchProcessor, SpanProcessor
+from .transport import DEFAULT, Lanes, Transport
+
+if TYPE_CHECKING:
+    from .cache import ResponseCache
+    from .dedup import BlobDeduplicator
+    from .exporters import Exporter
+    from .limits import Limiter
+    from .ratelimits import RateLimitTracker
 
 logger = logging.getLogger("agentpulse")
 
-_global_client: Optional[AgentPulse] = None
+_global_client: AgentPulse | None = None
 
 
-def get_client() -> Optional[AgentPulse]:
+def get_client() -> AgentPulse | None:
     return _global_client
 
 
@@ -34,38 +44,80 @@ class AgentPulse:
 
         # Self-hosted
         ap = AgentPulse(endpoint="http://localhost:3000")
+
+        # Local only, no collector
+        from agentpulse.exporters import SQLiteExporter
+        ap = AgentPulse(exporters=[SQLiteExporter("traces.db")])
+
+        # Redact, sample or enrich spans before export
+        ap = AgentPulse(processors=[MyRedactor()])
+
+        # Send repeated prompts once and reference them by digest
+        ap = AgentPulse(endpoint="http://localhost:3000", dedupe=True)
+
+        # Tune the transport's priority/default/bulk lanes
+        from agentpulse.transport import Lane, Lanes
+        bulk = Lane(flush_interval=30, batch_size=1000, capacity=5000)
+        ap = AgentPulse(lanes=Lanes(cost_usd=0.05, bulk=bulk))
     """
 
     def __init__(
         self,
-        api_key: Optional[str] = None,
+        api_key: str | None = None,
         endpoint: str = "http://localhost:3000",
         flush_interval: float = 2.0,
         batch_size: int = 50,
         enabled: bool = True,
+        exporters: list[Exporter] | None = None,
+        processors: list[SpanProcessor] | None = None,
+        dedupe: bool = False,
+        lanes: Lanes | None = None,
     ) -> None:
         global _global_client
 
         self.api_key = api_key
         self.endpoint = endpoint
         self.enabled = enabled
-        self._transport: Optional[Transport] = None
+        self._transport: Transport | None = None
+        # Set by patch_openai/patch_anthropic(rate_limits=True).
+        self.rate_limits: RateLimitTracker | None = None
+        self._processors: list[SpanProcessor] = list(processors or [])
 
         if enabled:
-            self._transport = Transport(
-                endpoint=endpoint,
-                api_key=api_key,
-                flush_interval=flush_interval,
-                batch_size=batch_size,
-            )
+            if exporters:
+                if dedupe:
+                    logger.warning(
+                        "AgentPulse: dedupe=True only applies to the collector "
+                        "transport; ignored with exporters"
+                    )
+                self._processors.append(
+                    BatchProcessor(exporters, flush_interval=flush_interval)
+                )
+            else:
+                self._transport = Transport(
+                    endpoint=endpoint,
+                    api_key=api_key,
+                    flush_interval=flush_interval,
+                    batch_size=batch_size,
+                    lanes=lanes,
+                )
+                deduplicator = None
+                if dedupe:
+                    from .dedup import BlobDeduplicator
+
+                    deduplicator = BlobDeduplicator()
+                    self._transport.on_blob_failure = deduplicator.forget
+                self._processors.append(
+                    _TransportProcessor(self._transport, deduplicator)
+                )
             atexit.register(self.shutdown)
 
         _global_client = self
 
     def start_trace(
         self,
-        agent_name: Optional[str] = None,
-        metadata: Optional[dict[str, Any]] = None,
+        agent_name: str | None = None,
+        metadata: dict[str, Any] | None = None,
     ) -> Trace:
         trace = Trace(agent_name=agent_name, metadata=metadata)
         return trace
@@ -74,19 +126,39 @@ class AgentPulse:
         self,
         trace: Trace,
         status: TraceStatus = TraceStatus.SUCCESS,
-        error: Optional[str] = None,
+        error: str | None = None,
     ) -> None:
         trace.end(status=status, error=error)
-        if self._transport and self.enabled:
-            self._transport.send_trace(trace.to_dict())
-            for span in trace.spans:
-                self._transport.send_span(span.to_dict())
+        if not self.enabled:
+            return
+        # A failing processor is logged and skipped; it never breaks traced code.
+        for processor in self._processors:
+            try:
+                keep = processor.on_trace_end(trace)
+            except Exception:
+                logger.exception(
+                    "AgentPulse: %s.on_trace_end failed", type(processor).__name__
+                )
+                continue
+            if not keep:
+                return
+        for span in trace.spans:
+            for processor in self._processors:
+                try:
+                    keep = processor.on_end(span)
+                except Exception:
+                    logger.exception(
+                        "AgentPulse: %s.on_end failed", type(processor).__name__
+                    )
+                    continue
+                if not keep:
+                    break
 
     def start_span(
         self,
         name: str,
         kind: SpanKind = SpanKind.CUSTOM,
-        input_data: Optional[Any] = None,
+        input_data: Any | None = None,
     ) -> Span:
         trace = get_current_trace()
         if not trace:
@@ -95,6 +167,7 @@ class AgentPulse:
             span = Span(name=name, kind=kind, trace_id="")
             if input_data is not None:
                 span.set_input(input_data)
+            self._on_start(span)
             return span
 
         parent = get_current_span()
@@ -107,10 +180,22 @@ class AgentPulse:
         if input_data is not None:
             span.set_input(input_data)
         trace.spans.append(span)
+        self._on_start(span)
         return span
 
+    def _on_start(self, span: Span) -> None:
+        for processor in self._processors:
+            try:
+                processor.on_start(span)
+            except Exception:
+                logger.exception(
+                    "AgentPulse: %s.on_start failed", type(processor).__name__
+                )
+
     @contextmanager
-    def span(self, name: str, kind: SpanKind = SpanKind.CUSTOM) -> Generator[Span, None, None]:
+    def span(
+        self, name: str, kind: SpanKind = SpanKind.CUSTOM
+    ) -> Generator[Span, None, None]:
         """Context manager for creating a custom span."""
         span = self.start_span(name, kind)
         token = set_current_span(span)
@@ -130,24 +215,101 @@ class AgentPulse:
         with self.span(name, kind=SpanKind.TOOL) as span:
             yield span
 
-    def patch_openai(self, client: Optional[Any] = None) -> Optional[Any]:
+    def patch_openai(
+        self,
+        client: Any | None = None,
+        cache: bool | ResponseCache | None = None,
+        rate_limits: bool | RateLimitTracker | None = None,
+        limit: Limiter | None = None,
+    ) -> Any | None:
         """Patch OpenAI client for automatic LLM call tracking.
 
         If a client instance is passed, patches and returns that instance.
         If no client is passed, patches the openai module globally.
+        Pass `cache=True` or a `ResponseCache` to serve repeated deterministic
+        requests from a cache. Pass `rate_limits=True` to record rate-limit
+        headers, retries and wait time; per-model totals are then available
+        from `ap.rate_limits.snapshot()`. Pass a `Limiter` to cap concurrent
+        calls and tokens per minute per model.
         """
         from .patches.openai import patch_openai
-        return patch_openai(self, client)
 
-    def patch_anthropic(self, client: Optional[Any] = None) -> Optional[Any]:
+        return patch_openai(
+            self, client, cache=cache, rate_limits=rate_limits, limit=limit
+        )
+
+    def patch_anthropic(
+        self,
+        client: Any | None = None,
+        cache: bool | ResponseCache | None = None,
+        rate_limits: bool | RateLimitTracker | None = None,
+        limit: Limiter | None = None,
+    ) -> Any | None:
         """Patch Anthropic client for automatic LLM call tracking."""
         from .patches.anthropic import patch_anthropic
-        return patch_anthropic(self, client)
+
+        return patch_anthropic(
+            self, client, cache=cache, rate_limits=rate_limits, limit=limit
+        )
 
     def flush(self) -> None:
-        if self._transport:
-            self._transport.flush()
+        for processor in self._processors:
+            try:
+                processor.force_flush()
+            except Exception:
+                logger.exception(
+                    "AgentPulse: %s.force_flush failed", type(processor).__name__
+                )
+
+    def shutdown(self) -> None:
+        for processor in self._processors:
+            try:
+                processor.shutdown()
+            except Exception:
+                logger.exception(
+                    "AgentPulse: %s.shutdown failed", type(processor).__name__
+                )
+
+
+class _TransportProcessor(SpanProcessor):
+    """Terminal processor that feeds the default HTTP `Transport`.
+
+    Each trace is routed to one lane as a whole, so the collector always
+    receives a trace before its spans and a parent span before its children.
+    `end_trace` calls `on_end` for a trace's spans on the same thread right
+    after `on_trace_end`, which hands the chosen lane over directly.
+    """
+
+    def __init__(
+        self, transport: Transport, deduplicator: BlobDeduplicator | None = None
+    ) -> None:
+        self._transport = transport
+        self._deduplicator = deduplicator
+        self._current = threading.local()
+
+    def on_end(self, span: Span) -> bool:
+        trace_id, lane = getattr(self._current, "lane", (None, DEFAULT))
+        if trace_id != span.trace_id:
+            lane = DEFAULT
+        data = span.to_dict()
+        if self._deduplicator and data["input"] is not None:
+            data["input"], blobs = self._deduplicator.dedupe(data["input"])
+            if blobs:
+                self._transport.send_blobs(blobs)
+        self._transport.send_span(data, lane)
+        return True
+
+    def on_trace_end(self, trace: Trace) -> bool:
+        lane = self._transport.lanes.route(trace)
+        if not self._transport.admit(lane, 1 + len(trace.spans)):
+            logger.debug("AgentPulse: %s lane full, dropping trace %s", lane, trace.id)
+            return False
+        self._current.lane = (trace.id, lane)
+        self._transport.send_trace(trace.to_dict(), lane)
+        return True
+
+    def force_flush(self) -> None:
+        self._transport.flush()
 
     def shutdown(self) -> None:
-        if self._transport:
-            self._transport.close()
+        self._transport.close()
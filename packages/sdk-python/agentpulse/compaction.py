@@ -0,0 +1,185 @@
+"""Folding of repetitive sibling spans into summary spans."""
+
+from __future__ import annotations
+
+import threading
+import weakref
+from typing import Any
+
+from .context import get_current_trace
+from .models import Span, Trace
+from .processors import SpanProcessor
+
+# Upper bounds (ms) of the duration histogram buckets; the last bucket is open-ended.
+DURATION_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+_BUCKET_LABELS = [f"<={bound}" for bound in DURATION_BUCKETS_MS] + [
+    f">{DURATION_BUCKETS_MS[-1]}"
+]
+
+
+class CompactionProcessor(SpanProcessor):
+    """Folds long runs of identical sibling spans into one summary span.
+
+    Once `threshold` spans with the same parent, name and kind have ended
+    without error, every further one is removed from its trace as soon as it
+    ends and folded into a single summary span for that group. The summary
+    keeps the group's name, kind and parent, spans the folded calls' time
+    range, carries the sum of their tokens and cost (so trace totals are
+    unchanged) and has `metadata["compacted"]` with:
+
+    - `count`: number of folded spans.
+    - `duration_ms`: `min`, `max` and `total`.
+    - `duration_histogram_ms`: bucket upper bound in ms -> count.
+    - `first` / `last`: the first and last folded span's id, start time,
+      duration, input and output.
+
+    Spans with an error, or that have child spans, are never folded. Because
+    folding happens when each span ends, polling and retry loops keep both
+    memory and export size bounded. Per-trace state is dropped when the trace
+    ends or, if it never reaches this processor, when it is garbage collected.
+
+    Usage:
+        ap = AgentPulse(processors=[CompactionProcessor(threshold=20)])
+    """
+
+    def __init__(self, threshold: int = 20) -> None:
+        self.threshold = threshold
+        self.folded = 0
+        self._traces: dict[str, _TraceState] = {}
+        self._lock = threading.Lock()
+
+    def on_start(self, span: Span) -> None:
+        if not span.trace_id:
+            return
+        trace = get_current_trace()
+        if trace is None or trace.id != span.trace_id:
+            return
+        with self._lock:
+            state = self._traces.get(trace.id)
+            if state is None:
+                state = self._traces[trace.id] = _TraceState(trace)
+                # Without a lock: finalizers can run from GC while it is held.
+                weakref.finalize(trace, self._traces.pop, trace.id, None)
+            if span.parent_span_id:
+                state.parents.add(span.parent_span_id)
+        span.add_end_callback(self._finish)
+
+    def on_trace_end(self, trace: Trace) -> bool:
+        with self._lock:
+            self._traces.pop(trace.id, None)
+        return True
+
+    def _finish(self, span: Span) -> None:
+        with self._lock:
+            state = self._traces.get(span.trace_id)
+            trace = state.trace() if state is not None else None
+            if trace is None:
+                return
+            if span.id in state.parents:
+                state.parents.discard(span.id)
+                return
+            if span.error:
+                return
+            key = (span.parent_span_id, span.name, span.kind)
+            group = state.groups.get(key)
+            if group is None:
+                group = state.groups[key] = _Group()
+            group.seen += 1
+            if group.seen <= self.threshold:
+                return
+            if group.summary is None:
+                group.summary = _new_summary(span)
+                trace.spans.append(group.summary)
+            _fold(group.summary, span)
+            _remove(trace.spans, span)
+            self.folded += 1
+
+
+class _TraceState:
+    __slots__ = ("trace", "parents", "groups")
+
+    def __init__(self, trace: Trace) -> None:
+        # Weak, so state for traces that are never ended dies with them.
+        self.trace = weakref.ref(trace)
+        # Ids of spans that have children; those are never folded.
+        self.parents: set[str] = set()
+        self.groups: dict[tuple[str | None, str, Any], _Group] = {}
+
+
+class _Group:
+    __slots__ = ("seen", "summary")
+
+    def __init__(self) -> None:
+        self.seen = 0
+        self.summary: Span | None = None
+
+
+def _new_summary(span: Span) -> Span:
+    summary = Span(
+        name=span.name,
+        kind=span.kind,
+        trace_id=span.trace_id,
+        parent_span_id=span.parent_span_id,
+        started_at=span.started_at,
+        model=span.model,
+    )
+    summary.set_metadata(
+        "compacted",
+        {
+            "count": 0,
+            "duration_ms": {"min": None, "max": None, "total": 0.0},
+            "duration_histogram_ms": {label: 0 for label in _BUCKET_LABELS},
+            "first": None,
+            "last": None,
+        },
+    )
+    return summary
+
+
+def _fold(summary: Span, span: Span) -> None:
+    record = summary.metadata["compacted"]  # type: ignore[index]
+    duration_ms = ((span.ended_at or span.started_at) - span.started_at) * 1000
+    example = {
+        "id": span.id,
+        "started_at": span.started_at,
+        "duration_ms": round(duration_ms, 3),
+        "input": span.input,
+        "output": span.output,
+    }
+    record["count"] += 1
+    if record["first"] is None:
+        record["first"] = example
+    record["last"] = example
+
+    durations = record["duration_ms"]
+    durations["min"] = round(
+        duration_ms if durations["min"] is None else min(durations["min"], duration_ms),
+        3,
+    )
+    durations["max"] = round(
+        duration_ms if durations["max"] is None else max(durations["max"], duration_ms),
+        3,
+    )
+    durations["total"] = round(durations["total"] + duration_ms, 3)
+    bucket = next(
+        (i for i, bound in enumerate(DURATION_BUCKETS_MS) if duration_ms <= bound),
+        len(DURATION_BUCKETS_MS),
+    )
+    record["duration_histogram_ms"][_BUCKET_LABELS[bucket]] += 1
+
+    summary.started_at = min(summary.started_at, span.started_at)
+    summary.ended_at = max(summary.ended_at or 0.0, span.ended_at or span.started_at)
+    if span.tokens_in is not None:
+        summary.tokens_in = (summary.tokens_in or 0) + span.tokens_in
+    if span.tokens_out is not None:
+        summary.tokens_out = (summary.tokens_out or 0) + span.tokens_out
+    if span.cost_usd is not None:
+        summary.cost_usd = (summary.cost_usd or 0.0) + span.cost_usd
+
+
+def _remove(spans: list[Span], span: Span) -> None:
+    # The span that just ended is almost always at or near the end.
+    for index in range(len(spans) - 1, -1, -1):
+        if spans[index] is span:
+            del spans[index]
+            return
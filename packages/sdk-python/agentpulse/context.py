@@ -2,35 +2,40 @@
 
 from __future__ import annotations
 
-from contextvars import ContextVar, Token
-from typing import TYPE_CHECKING, Optional
+from contextvars import Context, ContextVar, Token
+from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
     from .models import Span, Trace
 
-_current_trace: ContextVar[Optional[Trace]] = ContextVar("agentpulse_trace", default=None)
-_current_span: ContextVar[Optional[Span]] = ContextVar("agentpulse_span", default=None)
+_current_trace: ContextVar[Trace | None] = ContextVar("agentpulse_trace", default=None)
+_current_span: ContextVar[Span | None] = ContextVar("agentpulse_span", default=None)
 
 
-def get_current_trace() -> Optional[Trace]:
+def get_current_trace() -> Trace | None:
     return _current_trace.get()
 
 
-def set_current_trace(trace: Optional[Trace]) -> Token[Optional[Trace]]:
+def set_current_trace(trace: Trace | None) -> Token[Trace | None]:
     return _current_trace.set(trace)
 
 
-def restore_trace(token: Token[Optional[Trace]]) -> None:
+def restore_trace(token: Token[Trace | None]) -> None:
     _current_trace.reset(token)
 
 
-def get_current_span() -> Optional[Span]:
+def get_current_span() -> Span | None:
     return _current_span.get()
 
 
-def set_current_span(span: Optional[Span]) -> Token[Optional[Span]]:
+def set_current_span(span: Span | None) -> Token[Span | None]:
     return _current_span.set(span)
 
 
-def restore_span(token: Token[Optional[Span]]) -> None:
+def restore_span(token: Token[Span | None]) -> None:
     _current_span.reset(token)
+
+
+def get_span_in_context(ctx: Context) -> Span | None:
+    """Return the span current in another context, e.g. a task's."""
+    return ctx.get(_current_span)
@@ -3,9 +3,18 @@
 from __future__ import annotations
 
 import asyncio
+import contextlib
 import functools
+import inspect
 import logging
-from typing import Any, Callable, Optional, TypeVar, overload
+import time
+from collections.abc import AsyncGenerator, Callable, Generator
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    TypeVar,
+    overload,
+)
 
 from .context import (
     get_current_span,
@@ -17,6 +26,10 @@ from .context import (
 )
 from .models import Span, SpanKind, Trace, TraceStatus
 
+if TYPE_CHECKING:
+    from .cache import ToolCache
+    from .limits import Limiter
+
 logger = logging.getLogger("agentpulse")
 
 F = TypeVar("F", bound=Callable[..., Any])
@@ -27,7 +40,9 @@ def trace(fn: F) -> F: ...
 
 
 @overload
-def trace(*, name: Optional[str] = None, metadata: Optional[dict[str, Any]] = None) -> Callable[[F], F]: ...
+def trace(
+    *, name: str | None = None, metadata: dict[str, Any] | None = None
+) -> Callable[[F], F]: ...
 
 
 @overload
@@ -35,14 +50,15 @@ def trace(name: str) -> Callable[[F], F]: ...
 
 
 def trace(
-    fn: Optional[F] = None,
+    fn: F | None = None,
     *,
-    name: Optional[str] = None,
-    metadata: Optional[dict[str, Any]] = None,
+    name: str | None = None,
+    metadata: dict[str, Any] | None = None,
 ) -> Any:
     """Decorator to trace an agent function.
 
-    Creates a new trace (if none active) or a child span.
+    Creates a new trace (if none active) or a child span. Generator and
+    async generator functions are traced for their whole iteration.
 
     Usage:
         @trace
@@ -60,12 +76,21 @@ def trace(
 
         @functools.wraps(func)
         async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
-            return await _run_traced(func, trace_name, metadata, args, kwargs, is_async=True)
+            return await _run_traced(
+                func, trace_name, metadata, args, kwargs, is_async=True
+            )
 
         @functools.wraps(func)
         def sync_wrapper(*args: Any, **kwargs: Any) -> Any:
             return _run_traced(func, trace_name, metadata, args, kwargs, is_async=False)
 
+        def open_scope() -> _GeneratorScope:
+            return _open_trace_scope(trace_name, metadata)
+
+        if inspect.isasyncgenfunction(func):
+            return _wrap_async_generator(func, open_scope)  # type: ignore[return-value]
+        if inspect.isgeneratorfunction(func):
+            return _wrap_generator(func, open_scope)  # type: ignore[return-value]
         if asyncio.iscoroutinefunction(func):
             return async_wrapper  # type: ignore[return-value]
         return sync_wrapper  # type: ignore[return-value]
@@ -78,7 +103,7 @@ def trace(
 def _run_traced(
     func: Callable[..., Any],
     trace_name: str,
-    metadata: Optional[dict[str, Any]],
+    metadata: dict[str, Any] | None,
     args: tuple[Any, ...],
     kwargs: dict[str, Any],
     *,
@@ -91,15 +116,17 @@ def _run_traced(
 
     if existing_trace:
         # Nested: create a child span instead of a new trace
-        span = Span(
-            name=trace_name,
-            kind=SpanKind.CUSTOM,
-            trace_id=existing_trace.id,
-            parent_span_id=(get_current_span() or Span(name="", kind=SpanKind.CUSTOM, trace_id="")).id
-            if get_current_span()
-            else None,
-        )
-        existing_trace.spans.append(span)
+        if client:
+            span = client.start_span(trace_name, SpanKind.CUSTOM)
+        else:
+            parent = get_current_span()
+            span = Span(
+                name=trace_name,
+                kind=SpanKind.CUSTOM,
+                trace_id=existing_trace.id,
+                parent_span_id=parent.id if parent else None,
+            )
+            existing_trace.spans.append(span)
         span_token = set_current_span(span)
 
         if is_async:
@@ -112,8 +139,12 @@ def _run_traced(
     span_token = set_current_span(None)
 
     if is_async:
-        return _async_trace_exec(func, trace_obj, trace_token, span_token, client, args, kwargs)
-    return _sync_trace_exec(func, trace_obj, trace_token, span_token, client, args, kwargs)
+        return _async_trace_exec(
+            func, trace_obj, trace_token, span_token, client, args, kwargs
+        )
+    return _sync_trace_exec(
+        func, trace_obj, trace_token, span_token, client, args, kwargs
+    )
 
 
 def _sync_span_exec(
@@ -211,7 +242,12 @@ def tool(fn: F) -> F: ...
 
 
 @overload
-def tool(*, name: Optional[str] = None) -> Callable[[F], F]: ...
+def tool(
+    *,
+    name: str | None = None,
+    cache: bool | ToolCache | None = None,
+    limit: Limiter | None = None,
+) -> Callable[[F], F]: ...
 
 
 @overload
@@ -219,21 +255,46 @@ def tool(name: str) -> Callable[[F], F]: ...
 
 
 def tool(
-    fn: Optional[F] = None,
+    fn: F | None = None,
     *,
-    name: Optional[str] = None,
+    name: str | None = None,
+    cache: bool | ToolCache | None = None,
+    limit: Limiter | None = None,
 ) -> Any:
     """Decorator to trace a tool function.
 
+    Pass `cache=True` (or a configured `ToolCache`) to cache results by
+    arguments; the span then records whether the call was a hit, a miss or
+    coalesced with an identical in-flight call, and how much time was saved.
+    Pass a `Limiter` to cap concurrent calls of the tool; time spent waiting
+    for a slot is recorded in `metadata["limit"]`.
+
     Usage:
         @tool
         def search(query): ...
 
         @tool(name="web-search")
         async def search(query): ...
+
+        @tool(cache=ToolCache(ttl=600))
+        def lookup(key): ...
+
+        @tool(limit=Limiter(concurrency=4))
+        def scrape(url): ...
+
+    Generator and async generator tools keep their span open until iteration
+    finishes and record item count and time to first item.
     """
     if fn is not None and isinstance(fn, str):
-        return tool(name=fn)
+        return tool(name=fn, cache=cache, limit=limit)
+
+    tool_cache: ToolCache | None = None
+    if cache is True:
+        from .cache import ToolCache
+
+        tool_cache = ToolCache()
+    elif cache:
+        tool_cache = cache
 
     def decorator(func: F) -> F:
         tool_name = name or func.__name__
@@ -241,13 +302,21 @@ def tool(
         @functools.wraps(func)
         async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
             from .client import get_client
+
             client = get_client()
             if not client:
-                return await func(*args, **kwargs)
+                call = limit.wrap_async(func, tool_name) if limit else func
+                if tool_cache:
+                    return await tool_cache.acall(tool_name, call, args, kwargs)
+                return await call(*args, **kwargs)
             span = client.start_span(tool_name, SpanKind.TOOL)
             span_token = set_current_span(span)
+            call = limit.wrap_async(func, tool_name, span) if limit else func
             try:
-                result = await func(*args, **kwargs)
+                if tool_cache:
+                    result = await tool_cache.acall(tool_name, call, args, kwargs, span)
+                else:
+                    result = await call(*args, **kwargs)
                 span.end()
                 return result
             except Exception as exc:
@@ -259,13 +328,21 @@ def tool(
         @functools.wraps(func)
         def sync_wrapper(*args: Any, **kwargs: Any) -> Any:
             from .client import get_client
+
             client = get_client()
             if not client:
-                return func(*args, **kwargs)
+                call = limit.wrap(func, tool_name) if limit else func
+                if tool_cache:
+                    return tool_cache.call(tool_name, call, args, kwargs)
+                return call(*args, **kwargs)
             span = client.start_span(tool_name, SpanKind.TOOL)
             span_token = set_current_span(span)
+            call = limit.wrap(func, tool_name, span) if limit else func
             try:
-                result = func(*args, **kwargs)
+                if tool_cache:
+                    result = tool_cache.call(tool_name, call, args, kwargs, span)
+                else:
+                    result = call(*args, **kwargs)
                 span.end()
                 return result
             except Exception as exc:
@@ -274,6 +351,28 @@ def tool(
             finally:
                 restore_span(span_token)
 
+        def open_scope() -> _GeneratorScope | None:
+            from .client import get_client
+
+            client = get_client()
+            if not client:
+                return None
+            return _GeneratorScope(span=client.start_span(tool_name, SpanKind.TOOL))
+
+        if inspect.isasyncgenfunction(func) or inspect.isgeneratorfunction(func):
+            if tool_cache:
+                raise TypeError(
+                    "@tool(cache=...) does not support generator function "
+                    f"{tool_name!r}"
+                )
+            if limit:
+                raise TypeError(
+                    "@tool(limit=...) does not support generator function "
+                    f"{tool_name!r}"
+                )
+            if inspect.isasyncgenfunction(func):
+                return _wrap_async_generator(func, open_scope)  # type: ignore[return-value]
+            return _wrap_generator(func, open_scope)  # type: ignore[return-value]
         if asyncio.iscoroutinefunction(func):
             return async_wrapper  # type: ignore[return-value]
         return sync_wrapper  # type: ignore[return-value]
@@ -281,3 +380,188 @@ def tool(
     if fn is not None and callable(fn):
         return decorator(fn)
     return decorator
+
+
+class _GeneratorScope:
+    """A span, or a top-level trace, kept open across the steps of a generator.
+
+    The span is only made current while the generator body runs, so the
+    consumer's code between items is not attributed to it.
+    """
+
+    def __init__(
+        self,
+        span: Span | None = None,
+        trace_obj: Trace | None = None,
+        client: Any = None,
+    ) -> None:
+        self.span = span
+        self.trace = trace_obj
+        self.client = client
+        self.started = time.perf_counter()
+        self.first_item: float | None = None
+        self.items = 0
+
+    def activate(self) -> tuple[Any, Any]:
+        if self.trace is not None:
+            return set_current_trace(self.trace), set_current_span(None)
+        return None, set_current_span(self.span)
+
+    def deactivate(self, tokens: tuple[Any, Any]) -> None:
+        restore_span(tokens[1])
+        if tokens[0] is not None:
+            restore_trace(tokens[0])
+
+    def item(self) -> None:
+        self.items += 1
+        if self.first_item is None:
+            self.first_item = time.perf_counter() - self.started
+
+    def finish(self, error: str | None = None, **flags: bool) -> None:
+        stats: dict[str, Any] = {
+            "items": self.items,
+            "time_to_first_item_ms": round(self.first_item * 1000, 3)
+            if self.first_item is not None
+            else None,
+            "duration_ms": round((time.perf_counter() - self.started) * 1000, 3),
+            **flags,
+        }
+        if self.span is not None:
+            self.span.set_metadata("generator", stats)
+            self.span.end(error=error)
+            return
+        if self.trace is not None:
+            self.trace.metadata = {**(self.trace.metadata or {}), "generator": stats}
+            status = TraceStatus.ERROR if error else TraceStatus.SUCCESS
+            if self.client:
+                self.client.end_trace(self.trace, status, error=error)
+            else:
+                self.trace.end(status, error=error)
+
+
+def _open_trace_scope(
+    trace_name: str, metadata: dict[str, Any] | None
+) -> _GeneratorScope:
+    from .client import get_client
+
+    client = get_client()
+    existing_trace = get_current_trace()
+    if existing_trace:
+        if client:
+            return _GeneratorScope(span=client.start_span(trace_name, SpanKind.CUSTOM))
+        parent = get_current_span()
+        span = Span(
+            name=trace_name,
+            kind=SpanKind.CUSTOM,
+            trace_id=existing_trace.id,
+            parent_span_id=parent.id if parent else None,
+        )
+        existing_trace.spans.append(span)
+        return _GeneratorScope(span=span)
+    return _GeneratorScope(
+        trace_obj=Trace(agent_name=trace_name, metadata=metadata), client=client
+    )
+
+
+def _wrap_generator(
+    func: Callable[..., Any], open_scope: Callable[[], _GeneratorScope | None]
+) -> Callable[..., Any]:
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Generator[Any, Any, Any]:
+        gen = func(*args, **kwargs)
+        scope = open_scope()
+        if scope is None:
+            return (yield from gen)
+
+        sent: Any = None
+        pending: BaseException | None = None
+        while True:
+            tokens = scope.activate()
+            try:
+                if pending is not None:
+                    item = gen.throw(pending)
+                else:
+                    item = gen.send(sent)
+            except StopIteration as stop:
+                scope.finish()
+                return stop.value
+            except Exception as exc:
+                scope.finish(error=str(exc))
+                raise
+            except BaseException:
+                scope.finish(closed_early=True)
+                raise
+            finally:
+                scope.deactivate(tokens)
+            scope.item()
+
+            try:
+                sent = yield item
+                pending = None
+            except GeneratorExit:
+                tokens = scope.activate()
+                try:
+                    gen.close()
+                finally:
+                    scope.deactivate(tokens)
+                    scope.finish(closed_early=True)
+                raise
+            except BaseException as exc:
+                pending = exc
+
+    return wrapper
+
+
+def _wrap_async_generator(
+    func: Callable[..., Any], open_scope: Callable[[], _GeneratorScope | None]
+) -> Callable[..., Any]:
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> AsyncGenerator[Any, Any]:
+        agen = func(*args, **kwargs)
+        scope = open_scope()
+        if scope is None:
+            async with contextlib.aclosing(agen):
+                async for item in agen:
+                    yield item
+            return
+
+        sent: Any = None
+        pending: BaseException | None = None
+        while True:
+            tokens = scope.activate()
+            try:
+                if pending is not None:
+                    item = await agen.athrow(pending)
+                else:
+                    item = await agen.asend(sent)
+            except StopAsyncIteration:
+                scope.finish()
+                return
+            except asyncio.CancelledError:
+                scope.finish(cancelled=True)
+                raise
+            except Exception as exc:
+                scope.finish(error=str(exc))
+                raise
+            except BaseException:
+                scope.finish(closed_early=True)
+                raise
+            finally:
+                scope.deactivate(tokens)
+            scope.item()
+
+            try:
+                sent = yield item
+                pending = None
+            except GeneratorExit:
+                tokens = scope.activate()
+                try:
+                    await agen.aclose()
+                finally:
+                    scope.deactivate(tokens)
+                    scope.finish(closed_early=True)
+                raise
+            except BaseException as exc:
+                pending = exc
+
+    return wrapper
@@ -0,0 +1,79 @@
+"""Content-addressed deduplication of large, repeated span input parts."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any
+
+BLOB_KEY = "$blob"
+
+
+class BlobDeduplicator:
+    """Replaces large input parts with digest references.
+
+    Every message (or content block, for messages whose content is a list of
+    blocks) whose JSON encoding is at least `min_size` bytes is hashed and
+    replaced by `{"$blob": "sha256:<hex>"}`. The content of each digest is
+    returned as a new blob the first time it is seen; an LRU of `max_entries`
+    digests remembers what has already been sent, so repeated system prompts
+    and context are shipped once and then only referenced.
+    """
+
+    def __init__(self, min_size: int = 256, max_entries: int = 4096) -> None:
+        self._min_size = min_size
+        self._max_entries = max_entries
+        self._sent: OrderedDict[str, None] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def dedupe(self, value: Any) -> tuple[Any, list[dict[str, Any]]]:
+        """Return `(value_with_refs, new_blobs)` for a span input or output."""
+        blobs: list[dict[str, Any]] = []
+        if isinstance(value, list):
+            return [self._dedupe_message(item, blobs) for item in value], blobs
+        if isinstance(value, dict):
+            return {
+                key: self._dedupe_part(item, blobs) for key, item in value.items()
+            }, blobs
+        return self._dedupe_part(value, blobs), blobs
+
+    def forget(self, digests: list[str]) -> None:
+        """Drop digests whose upload failed so they are sent again."""
+        with self._lock:
+            for digest in digests:
+                self._sent.pop(digest, None)
+
+    def _dedupe_message(self, message: Any, blobs: list[dict[str, Any]]) -> Any:
+        if isinstance(message, dict) and isinstance(message.get("content"), list):
+            return {
+                **message,
+                "content": [
+                    self._dedupe_part(block, blobs) for block in message["content"]
+                ],
+            }
+        return self._dedupe_part(message, blobs)
+
+    def _dedupe_part(self, part: Any, blobs: list[dict[str, Any]]) -> Any:
+        if part is None or isinstance(part, (bool, int, float)):
+            return part
+        if isinstance(part, str) and len(part) < self._min_size:
+            return part
+        encoded = json.dumps(part, sort_keys=True, separators=(",", ":"), default=str)
+        if len(encoded) < self._min_size:
+            return part
+
+        digest = "sha256:" + hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+        with self._lock:
+            if digest in self._sent:
+                self._sent.move_to_end(digest)
+                is_new = False
+            else:
+                self._sent[digest] = None
+                if len(self._sent) > self._max_entries:
+                    self._sent.popitem(last=False)
+                is_new = True
+        if is_new:
+            blobs.append({"digest": digest, "content": part})
+        return {BLOB_KEY: digest}
@@ -0,0 +1,14 @@
+"""Exporters that write telemetry to destinations other than the default transport."""
+
+from .base import BatchExporter, Exporter
+from .file import FileExporter
+from .http import HTTPExporter
+from .sqlite import SQLiteExporter
+
+__all__ = [
+    "Exporter",
+    "BatchExporter",
+    "SQLiteExporter",
+    "FileExporter",
+    "HTTPExporter",
+]
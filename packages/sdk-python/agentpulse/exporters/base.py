@@ -0,0 +1,62 @@
+"""Exporter interface."""
+
+from __future__ import annotations
+
+import warnings
+from typing import Any
+
+from ..processors import _SPAN, _TRACE, BatchProcessor
+
+
+class Exporter:
+    """Base class for exporters that write finished traces and spans somewhere.
+
+    Exporters are driven by a `BatchProcessor`, which calls `export` with
+    already-serialized records from its background thread, so implementations
+    can do blocking I/O without slowing down traced code.
+    """
+
+    def export(self, traces: list[dict[str, Any]], spans: list[dict[str, Any]]) -> None:
+        raise NotImplementedError
+
+    def force_flush(self) -> None:
+        """Make everything exported so far durable; called by `ap.flush()`."""
+
+    def shutdown(self) -> None:
+        pass
+
+
+class BatchExporter(BatchProcessor):
+    """Deprecated: use `AgentPulse(exporters=[...])`, or `BatchProcessor` directly.
+
+    Kept for code written against its dict-based interface: `send_trace` and
+    `send_span` take already serialized records, and `flush`/`close` are
+    `force_flush`/`shutdown`.
+    """
+
+    def __init__(
+        self,
+        exporters: list[Exporter],
+        flush_interval: float = 2.0,
+        batch_size: int = 512,
+        max_queue_size: int = 100_000,
+    ) -> None:
+        warnings.warn(
+            "BatchExporter is deprecated; "
+            "use AgentPulse(exporters=[...]) or BatchProcessor",
+            DeprecationWarning,
+            stacklevel=2,
+        )
+        super().__init__(exporters, flush_interval, batch_size, max_queue_size)
+
+    def send_trace(self, trace_data: dict[str, Any]) -> None:
+        self._enqueue((_TRACE, trace_data))
+
+    def send_span(self, span_data: dict[str, Any]) -> None:
+        self._enqueue((_SPAN, span_data))
+
+    def flush(self, timeout: float | None = 30.0) -> None:
+        self.force_flush(timeout)
+
+    def close(self) -> None:
+        self.shutdown()
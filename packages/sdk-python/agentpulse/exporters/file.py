@@ -0,0 +1,130 @@
+"""Rotating gzip-compressed NDJSON file exporter."""
+
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import threading
+import time
+from typing import IO, Any
+
+from .base import Exporter
+
+FILE_PREFIX = "agentpulse-"
+FILE_SUFFIX = ".ndjson.gz"
+PARTIAL_SUFFIX = ".part"
+
+
+class FileExporter(Exporter):
+    """Streams traces and spans to rotated, gzip-compressed NDJSON files.
+
+    Each line is `{"type": "trace" | "span", "data": {...}}`. A file is written
+    under a `.part` name and renamed to `*.ndjson.gz` once it is rotated - when
+    it reaches `max_bytes`, `max_age` seconds after it was opened (even if the
+    exporter is idle) or at shutdown - so readers only ever see complete files.
+    `ap.flush()` syncs the open file to disk, and `agentpulse upload` recovers
+    `.part` files left behind by a process that crashed.
+
+    Usage:
+        from agentpulse.exporters import FileExporter
+
+        ap = AgentPulse(exporters=[FileExporter("./telemetry")])
+    """
+
+    def __init__(
+        self,
+        directory: str = "agentpulse-data",
+        max_bytes: int = 64 * 1024 * 1024,
+        max_age: float = 300.0,
+        compresslevel: int = 6,
+        buffer_size: int = 1024 * 1024,
+    ) -> None:
+        self.directory = directory
+        self._max_bytes = max_bytes
+        self._max_age = max_age
+        self._compresslevel = compresslevel
+        self._buffer_size = buffer_size
+        self._lock = threading.Lock()
+        self._raw: IO[bytes] | None = None
+        self._gz: gzip.GzipFile | None = None
+        self._path: str | None = None
+        self._timer: threading.Timer | None = None
+        self._opened_at = 0.0
+        self._written = 0
+        self._seq = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def export(self, traces: list[dict[str, Any]], spans: list[dict[str, Any]]) -> None:
+        lines = [_encode_line("trace", t) for t in traces]
+        lines.extend(_encode_line("span", s) for s in spans)
+        if not lines:
+            return
+        chunk = b"".join(lines)
+
+        with self._lock:
+            if self._gz is not None and (
+                self._written >= self._max_bytes
+                or time.monotonic() - self._opened_at >= self._max_age
+            ):
+                self._rotate()
+            if self._gz is None:
+                self._open()
+            assert self._gz is not None
+            self._gz.write(chunk)
+            self._written += len(chunk)
+
+    def rotate(self) -> None:
+        """Close the current file so it becomes visible to uploaders."""
+        with self._lock:
+            self._rotate()
+
+    def force_flush(self) -> None:
+        """Write buffered records through to the `.part` file."""
+        with self._lock:
+            if self._gz is not None and self._raw is not None:
+                self._gz.flush()
+                self._raw.flush()
+
+    def shutdown(self) -> None:
+        self.rotate()
+
+    def _expire(self, path: str) -> None:
+        with self._lock:
+            if self._path == path:
+                self._rotate()
+
+    def _open(self) -> None:
+        self._seq += 1
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime())
+        stem = f"{FILE_PREFIX}{stamp}-{os.getpid()}-{self._seq:05d}"
+        name = f"{stem}{FILE_SUFFIX}{PARTIAL_SUFFIX}"
+        self._path = os.path.join(self.directory, name)
+        self._raw = open(self._path, "wb", buffering=self._buffer_size)
+        self._gz = gzip.GzipFile(
+            fileobj=self._raw, mode="wb", compresslevel=self._compresslevel
+        )
+        self._opened_at = time.monotonic()
+        self._written = 0
+        self._timer = threading.Timer(self._max_age, self._expire, args=(self._path,))
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _rotate(self) -> None:
+        if self._gz is None or self._raw is None or self._path is None:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._gz.close()
+        self._raw.close()
+        os.replace(self._path, self._path[: -len(PARTIAL_SUFFIX)])
+        self._gz = None
+        self._raw = None
+        self._path = None
+
+
+def _encode_line(kind: str, data: dict[str, Any]) -> bytes:
+    return (json.dumps({"type": kind, "data": data}, default=str) + "\n").encode(
+        "utf-8"
+    )
@@ -0,0 +1,40 @@
+"""HTTP exporter for use alongside other exporters in a `BatchProcessor`."""
+
+from __future__ import annotations
+
+from typing import Any
+from urllib.request import Request, urlopen
+
+from ..transport import encode, join_batch
+from .base import Exporter
+
+
+class HTTPExporter(Exporter):
+    """Posts batches to a collector's `/v1/traces` and `/v1/spans` endpoints.
+
+    The default `AgentPulse(endpoint=...)` setup uses `Transport` directly;
+    this exporter is for fanning out to a collector and other destinations
+    from one shared batching stage.
+    """
+
+    def __init__(
+        self, endpoint: str = "http://localhost:3000", api_key: str | None = None
+    ) -> None:
+        self._endpoint = endpoint.rstrip("/")
+        self._api_key = api_key
+
+    def export(self, traces: list[dict[str, Any]], spans: list[dict[str, Any]]) -> None:
+        if traces:
+            self._post(f"{self._endpoint}/v1/traces", traces)
+        if spans:
+            self._post(f"{self._endpoint}/v1/spans", spans)
+
+    def _post(self, url: str, payload: list[dict[str, Any]]) -> None:
+        headers = {"Content-Type": "application/json"}
+        if self._api_key:
+            headers["X-AgentPulse-Key"] = self._api_key
+
+        data = join_batch([encode(item) for item in payload])
+        req = Request(url, data=data, headers=headers, method="POST")
+        with urlopen(req, timeout=10) as resp:
+            resp.read()
@@ -0,0 +1,180 @@
+"""Local SQLite exporter - records traces without running the collector."""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+from typing import Any
+
+from .base import Exporter
+
+# Mirrors packages/collector/src/db/schema.ts so the file can be opened by the
+# collector (DB_PATH) or the dashboard later on.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+  id TEXT PRIMARY KEY,
+  name TEXT NOT NULL,
+  api_key TEXT UNIQUE NOT NULL,
+  created_at TEXT DEFAULT (datetime('now'))
+);
+
+CREATE TABLE IF NOT EXISTS traces (
+  id TEXT PRIMARY KEY,
+  project_id TEXT NOT NULL,
+  agent_name TEXT,
+  status TEXT DEFAULT 'running',
+  started_at REAL NOT NULL,
+  ended_at REAL,
+  total_tokens_in INTEGER DEFAULT 0,
+  total_tokens_out INTEGER DEFAULT 0,
+  total_cost_usd REAL DEFAULT 0,
+  metadata TEXT,
+  error TEXT,
+  FOREIGN KEY (project_id) REFERENCES projects(id)
+);
+
+CREATE TABLE IF NOT EXISTS spans (
+  id TEXT PRIMARY KEY,
+  trace_id TEXT NOT NULL,
+  parent_span_id TEXT,
+  name TEXT NOT NULL,
+  kind TEXT NOT NULL,
+  started_at REAL NOT NULL,
+  ended_at REAL,
+  input TEXT,
+  output TEXT,
+  model TEXT,
+  tokens_in INTEGER,
+  tokens_out INTEGER,
+  cost_usd REAL,
+  error TEXT,
+  metadata TEXT,
+  FOREIGN KEY (trace_id) REFERENCES traces(id),
+  FOREIGN KEY (parent_span_id) REFERENCES spans(id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_traces_project ON traces(project_id);
+CREATE INDEX IF NOT EXISTS idx_traces_started ON traces(started_at);
+CREATE INDEX IF NOT EXISTS idx_spans_trace ON spans(trace_id);
+CREATE INDEX IF NOT EXISTS idx_spans_started ON spans(started_at);
+"""
+
+_INSERT_TRACE = """
+INSERT OR REPLACE INTO traces
+  (id, project_id, agent_name, status, started_at, ended_at,
+   total_tokens_in, total_tokens_out, total_cost_usd, metadata, error)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_INSERT_SPAN = """
+INSERT OR REPLACE INTO spans
+  (id, trace_id, parent_span_id, name, kind, started_at, ended_at,
+   input, output, model, tokens_in, tokens_out, cost_usd, error, metadata)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def _json_or_none(value: Any) -> str | None:
+    if value is None:
+        return None
+    return json.dumps(value, default=str)
+
+
+class SQLiteExporter(Exporter):
+    """Writes traces and spans to a local SQLite database.
+
+    The database runs in WAL mode and every batch is written with
+    `executemany` in a single transaction. The insert statements are constant
+    strings, so sqlite3's statement cache prepares them once per connection.
+
+    Usage:
+        from agentpulse.exporters import SQLiteExporter
+
+        ap = AgentPulse(exporters=[SQLiteExporter("traces.db")])
+
+    By default rows are stored under the collector's seeded `default` project,
+    so the file can be served directly by the collector via `DB_PATH`.
+    """
+
+    def __init__(
+        self,
+        path: str = "agentpulse.db",
+        project_id: str = "default",
+        api_key: str = "ap_dev_default",
+    ) -> None:
+        self.path = path
+        self._project_id = project_id
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Only the exporter thread writes; shutdown() may close from another.
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.executescript(_SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(spans)")}
+        if "metadata" not in columns:
+            self._conn.execute("ALTER TABLE spans ADD COLUMN metadata TEXT")
+        self._conn.execute(
+            "INSERT OR IGNORE INTO projects (id, name, api_key) VALUES (?, ?, ?)",
+            (project_id, "Default Project", api_key),
+        )
+
+    def export(self, traces: list[dict[str, Any]], spans: list[dict[str, Any]]) -> None:
+        project_id = self._project_id
+        trace_rows = [
+            (
+                t["id"],
+                project_id,
+                t.get("agent_name"),
+                t.get("status") or "running",
+                t["started_at"],
+                t.get("ended_at"),
+                t.get("total_tokens_in") or 0,
+                t.get("total_tokens_out") or 0,
+                t.get("total_cost_usd") or 0,
+                _json_or_none(t.get("metadata")),
+                t.get("error"),
+            )
+            for t in traces
+        ]
+        span_rows = [
+            (
+                s["id"],
+                s["trace_id"],
+                s.get("parent_span_id"),
+                s["name"],
+                s["kind"],
+                s["started_at"],
+                s.get("ended_at"),
+                _json_or_none(s.get("input")),
+                _json_or_none(s.get("output")),
+                s.get("model"),
+                s.get("tokens_in"),
+                s.get("tokens_out"),
+                s.get("cost_usd"),
+                s.get("error"),
+                _json_or_none(s.get("metadata")),
+            )
+            for s in spans
+        ]
+
+        conn = self._conn
+        conn.execute("BEGIN")
+        try:
+            if trace_rows:
+                conn.executemany(_INSERT_TRACE, trace_rows)
+            if span_rows:
+                conn.executemany(_INSERT_SPAN, span_rows)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def shutdown(self) -> None:
+        self._conn.close()
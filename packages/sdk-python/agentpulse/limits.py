@@ -0,0 +1,392 @@
+"""Concurrency and token-rate limiting for tools and LLM calls."""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+from .models import Span
+
+_FOREVER = float("inf")
+
+
+class Limiter:
+    """Per-key concurrency and tokens-per-minute limits, for threads and asyncio.
+
+    Keys are tool names for `@tool(limit=...)` and model names for
+    `patch_openai/patch_anthropic(limit=...)`. Every key gets its own budget:
+    `concurrency` and `tokens_per_minute` apply to each key, and `limits`
+    overrides them for particular keys. Either limit may be None (unlimited).
+
+    LLM calls reserve an estimate of their tokens (prompt characters / 4 plus
+    `max_tokens`) before they start and settle to the actual usage afterwards.
+    A `stream=True` call holds its slot until the stream is exhausted or
+    closed, and settles from the usage reported in its chunks (OpenAI needs
+    `stream_options={"include_usage": True}`); a stream that reports none keeps
+    its reservation. Tool calls only take a concurrency slot.
+
+    The time spent waiting is recorded on the span as `metadata["limit"]`
+    (`key`, `wait_ms`, `reserved_tokens`), separate from the call itself, and
+    `snapshot()` reports per-key contention.
+
+    Usage:
+        limiter = Limiter(
+            concurrency=4,
+            limits={"gpt-4o": {"concurrency": 16, "tokens_per_minute": 450_000}},
+        )
+
+        @tool(limit=limiter)
+        def scrape(url): ...
+
+        ap.patch_openai(client, limit=limiter)
+    """
+
+    def __init__(
+        self,
+        concurrency: int | None = None,
+        tokens_per_minute: int | None = None,
+        limits: dict[str, dict[str, int | None]] | None = None,
+    ) -> None:
+        self.concurrency = concurrency
+        self.tokens_per_minute = tokens_per_minute
+        self.limits = dict(limits or {})
+        self._budgets: dict[str, _Budget] = {}
+        self._cond = threading.Condition()
+        self._async_waiters: list[
+            tuple[asyncio.AbstractEventLoop, asyncio.Future[None]]
+        ] = []
+
+    def acquire(self, key: str, tokens: int = 0) -> float:
+        """Block until a slot (and `tokens`) is available; returns seconds waited."""
+        started = time.monotonic()
+        with self._cond:
+            budget = self._budget(key)
+            budget.waiting += 1
+            try:
+                while True:
+                    delay = budget.try_take(tokens, time.monotonic())
+                    if delay == 0:
+                        break
+                    self._cond.wait(None if delay == _FOREVER else delay)
+            finally:
+                budget.waiting -= 1
+            waited = time.monotonic() - started
+            budget.record_wait(waited)
+        return waited
+
+    async def acquire_async(self, key: str, tokens: int = 0) -> float:
+        """Like `acquire`, but waits without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        with self._cond:
+            budget = self._budget(key)
+            budget.waiting += 1
+        try:
+            while True:
+                future: asyncio.Future[None] | None = None
+                with self._cond:
+                    delay = budget.try_take(tokens, time.monotonic())
+                    if delay == _FOREVER:
+                        future = loop.create_future()
+                        self._async_waiters.append((loop, future))
+                if delay == 0:
+                    break
+                if future is not None:
+                    await future
+                else:
+                    await asyncio.sleep(delay)
+        finally:
+            with self._cond:
+                budget.waiting -= 1
+        waited = time.monotonic() - started
+        with self._cond:
+            budget.record_wait(waited)
+        return waited
+
+    def release(self, key: str, reserved: int = 0, used: int | None = None) -> None:
+        """Free the slot; settle the difference between reserved and used tokens."""
+        with self._cond:
+            budget = self._budget(key)
+            budget.active -= 1
+            if used is not None:
+                budget.settle(reserved - used)
+            self._cond.notify_all()
+            waiters, self._async_waiters = self._async_waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_wake, future)
+
+    def wrap(
+        self,
+        func: Callable[..., Any],
+        key: str,
+        span: Span | None = None,
+        tokens: int = 0,
+        usage: Callable[[Any], int | None] | None = None,
+        streams: bool = False,
+    ) -> Callable[..., Any]:
+        """Wrap `func` so each call holds a slot; `usage(result)` gives tokens used.
+
+        With `streams`, a `stream=True` call keeps its slot until the returned
+        stream is exhausted or closed, and settles from the usage its chunks
+        report (`usage(chunk)`, largest value seen).
+        """
+
+        def limited(*args: Any, **kwargs: Any) -> Any:
+            waited = self.acquire(key, tokens)
+            _record(span, key, waited, tokens)
+            try:
+                result = func(*args, **kwargs)
+            except BaseException:
+                self.release(key, tokens)
+                raise
+            if streams and kwargs.get("stream"):
+                return _LimitedStream(
+                    result, functools.partial(self.release, key, tokens), usage
+                )
+            self.release(
+                key, tokens, usage(result) if usage and result is not None else None
+            )
+            return result
+
+        return limited
+
+    def wrap_async(
+        self,
+        func: Callable[..., Any],
+        key: str,
+        span: Span | None = None,
+        tokens: int = 0,
+        usage: Callable[[Any], int | None] | None = None,
+        streams: bool = False,
+    ) -> Callable[..., Any]:
+        async def limited(*args: Any, **kwargs: Any) -> Any:
+            waited = await self.acquire_async(key, tokens)
+            _record(span, key, waited, tokens)
+            try:
+                result = await func(*args, **kwargs)
+            except BaseException:
+                self.release(key, tokens)
+                raise
+            if streams and kwargs.get("stream"):
+                return _AsyncLimitedStream(
+                    result, functools.partial(self.release, key, tokens), usage
+                )
+            self.release(
+                key, tokens, usage(result) if usage and result is not None else None
+            )
+            return result
+
+        return limited
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        """Per-key active and waiting calls, acquisitions, and total/max wait."""
+        with self._cond:
+            return {
+                key: {
+                    "active": budget.active,
+                    "waiting": budget.waiting,
+                    "acquired": budget.acquired,
+                    "queued": budget.queued,
+                    "total_wait_ms": round(budget.total_wait * 1000, 3),
+                    "max_wait_ms": round(budget.max_wait * 1000, 3),
+                }
+                for key, budget in self._budgets.items()
+            }
+
+    def _budget(self, key: str) -> _Budget:
+        budget = self._budgets.get(key)
+        if budget is None:
+            override = self.limits.get(key, {})
+            budget = self._budgets[key] = _Budget(
+                override.get("concurrency", self.concurrency),
+                override.get("tokens_per_minute", self.tokens_per_minute),
+            )
+        return budget
+
+
+class _Budget:
+    __slots__ = (
+        "concurrency",
+        "capacity",
+        "rate",
+        "tokens",
+        "updated",
+        "active",
+        "waiting",
+        "acquired",
+        "queued",
+        "total_wait",
+        "max_wait",
+    )
+
+    def __init__(self, concurrency: int | None, tokens_per_minute: int | None) -> None:
+        self.concurrency = concurrency
+        self.capacity = float(tokens_per_minute) if tokens_per_minute else None
+        self.rate = self.capacity / 60 if self.capacity else 0.0
+        self.tokens = self.capacity or 0.0
+        self.updated = time.monotonic()
+        self.active = 0
+        self.waiting = 0
+        self.acquired = 0
+        self.queued = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def try_take(self, tokens: int, now: float) -> float:
+        """Take a slot and `tokens` and return 0, or return how long to wait first."""
+        if self.concurrency is not None and self.active >= self.concurrency:
+            return _FOREVER
+        if self.capacity is not None and tokens:
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            # A request larger than the whole budget goes through once it's full.
+            needed = min(tokens, self.capacity)
+            if self.tokens < needed:
+                return (needed - self.tokens) / self.rate
+            self.tokens -= tokens
+        self.active += 1
+        return 0
+
+    def settle(self, refund: int) -> None:
+        if self.capacity is not None:
+            self.tokens = min(self.capacity, self.tokens + refund)
+
+    def record_wait(self, waited: float) -> None:
+        self.acquired += 1
+        if waited > 0.001:
+            self.queued += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+
+
+class _LimitedStream:
+    """Proxy for a streaming response that releases its limiter slot when consumed."""
+
+    def __init__(
+        self,
+        stream: Any,
+        release: Callable[[int | None], None],
+        usage: Callable[[Any], int | None] | None,
+    ) -> None:
+        self._stream = stream
+        self._release_slot: Callable[[int | None], None] | None = release
+        self._usage = usage
+        self._used: int | None = None
+        self._iterator: Any = None
+
+    def __iter__(self) -> _LimitedStream:
+        return self
+
+    def __next__(self) -> Any:
+        if self._iterator is None:
+            self._iterator = iter(self._stream)
+        try:
+            chunk = next(self._iterator)
+        except BaseException:
+            self._release()
+            raise
+        self._observe(chunk)
+        return chunk
+
+    def __enter__(self) -> _LimitedStream:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        try:
+            close = getattr(self._stream, "close", None)
+            if close is not None:
+                close()
+        finally:
+            self._release()
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self._stream, name)
+
+    def __del__(self) -> None:
+        self._release()
+
+    def _observe(self, chunk: Any) -> None:
+        used = self._usage(chunk) if self._usage is not None else None
+        if used is not None and (self._used is None or used > self._used):
+            self._used = used
+
+    def _release(self) -> None:
+        release, self._release_slot = self._release_slot, None
+        if release is not None:
+            release(self._used)
+
+
+class _AsyncLimitedStream(_LimitedStream):
+    def __aiter__(self) -> _AsyncLimitedStream:
+        return self
+
+    async def __anext__(self) -> Any:
+        if self._iterator is None:
+            self._iterator = self._stream.__aiter__()
+        try:
+            chunk = await self._iterator.__anext__()
+        except BaseException:
+            self._release()
+            raise
+        self._observe(chunk)
+        return chunk
+
+    async def __aenter__(self) -> _AsyncLimitedStream:
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    async def close(self) -> None:  # type: ignore[override]
+        try:
+            close = getattr(self._stream, "close", None)
+            if close is not None:
+                await close()
+        finally:
+            self._release()
+
+
+def _wake(future: asyncio.Future[None]) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+def _record(span: Span | None, key: str, waited: float, tokens: int) -> None:
+    if span is not None:
+        info: dict[str, Any] = {"key": key, "wait_ms": round(waited * 1000, 3)}
+        if tokens:
+            info["reserved_tokens"] = tokens
+        span.set_metadata("limit", info)
+
+
+def estimate_tokens(kwargs: dict[str, Any]) -> int:
+    """Rough token reservation for an LLM request: prompt chars / 4 plus output cap."""
+    chars = 0
+    for message in kwargs.get("messages") or ():
+        content = (
+            message.get("content")
+            if isinstance(message, dict)
+            else getattr(message, "content", None)
+        )
+        if isinstance(content, str):
+            chars += len(content)
+        elif isinstance(content, list):
+            chars += sum(
+                len(part.get("text", "")) for part in content if isinstance(part, dict)
+            )
+    system = kwargs.get("system")
+    if isinstance(system, str):
+        chars += len(system)
+    output = kwargs.get("max_tokens") or kwargs.get("max_completion_tokens") or 0
+    return chars // 4 + int(output)
@@ -0,0 +1,267 @@
+"""Synthetic load generator for capacity testing the SDK and collector.
+
+Drives the real `@trace`/`@tool` decorators and `AgentPulse` client with
+configurable trace shapes from threads, asyncio tasks or processes.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+from .client import AgentPulse
+from .context import get_current_span
+from .decorators import tool, trace
+
+
+@dataclass
+class TraceShape:
+    """Shape of each generated trace: a tree of tool spans under one agent."""
+
+    depth: int = 2
+    fanout: int = 3
+    payload_bytes: int = 256
+    error_rate: float = 0.0
+
+    @property
+    def spans_per_trace(self) -> int:
+        return sum(self.fanout**level for level in range(1, self.depth + 1))
+
+
+@dataclass
+class LoadResult:
+    """Counts and timings of a run.
+
+    `dropped` is the records each transport lane shed under backpressure and
+    `rejected` the requests the collector refused (set when it is a stub), so
+    a run that loses data under load doesn't look healthy.
+    """
+
+    traces: int = 0
+    errors: int = 0
+    spans: int = 0
+    elapsed_s: float = 0.0
+    shutdown_s: float = 0.0
+    dropped: dict[str, int] = field(default_factory=dict)
+    rejected: int = 0
+    latencies: list[float] = field(default_factory=list, repr=False)
+
+    def merge(self, other: LoadResult) -> None:
+        self.traces += other.traces
+        self.errors += other.errors
+        self.spans += other.spans
+        self.shutdown_s = max(self.shutdown_s, other.shutdown_s)
+        for lane, count in other.dropped.items():
+            self.dropped[lane] = self.dropped.get(lane, 0) + count
+        self.rejected += other.rejected
+        self.latencies.extend(other.latencies)
+
+    def summary(self) -> dict[str, Any]:
+        latencies = sorted(self.latencies)
+        elapsed = max(self.elapsed_s, 1e-9)
+        data = asdict(self)
+        del data["latencies"]
+        data.update(
+            traces_per_s=round(self.traces / elapsed, 1),
+            spans_per_s=round(self.spans / elapsed, 1),
+            trace_p50_ms=round(_percentile(latencies, 0.50) * 1000, 3),
+            trace_p99_ms=round(_percentile(latencies, 0.99) * 1000, 3),
+        )
+        return data
+
+
+class LoadgenError(Exception):
+    """Raised by generated tools to simulate failures."""
+
+
+def run(
+    endpoint: str = "http://localhost:3000",
+    api_key: str | None = None,
+    shape: TraceShape | None = None,
+    traces: int = 1000,
+    concurrency: int = 8,
+    mode: str = "thread",
+    **client_options: Any,
+) -> LoadResult:
+    """Generate `traces` traces with `concurrency` threads, tasks or processes.
+
+    `mode` is one of "thread", "async" or "process". In process mode each
+    process gets its own client; `client_options` are passed to `AgentPulse`.
+    """
+    shape = shape or TraceShape()
+    start = time.perf_counter()
+
+    if mode == "process":
+        result = LoadResult()
+        counts = _split(traces, concurrency)
+        with ProcessPoolExecutor(max_workers=concurrency) as pool:
+            futures = [
+                pool.submit(
+                    _run_in_process, endpoint, api_key, shape, count, client_options
+                )
+                for count in counts
+            ]
+            for future in futures:
+                result.merge(future.result())
+    else:
+        ap = AgentPulse(api_key=api_key, endpoint=endpoint, **client_options)
+        if mode == "async":
+            result = asyncio.run(_run_async(shape, traces, concurrency))
+        elif mode == "thread":
+            result = _run_threads(shape, traces, concurrency)
+        else:
+            raise ValueError(f"unknown mode: {mode!r}")
+        shutdown_start = time.perf_counter()
+        ap.shutdown()
+        result.shutdown_s = time.perf_counter() - shutdown_start
+        result.dropped = _dropped(ap)
+
+    result.elapsed_s = time.perf_counter() - start
+    return result
+
+
+def _run_in_process(
+    endpoint: str,
+    api_key: str | None,
+    shape: TraceShape,
+    traces: int,
+    client_options: dict[str, Any],
+) -> LoadResult:
+    ap = AgentPulse(api_key=api_key, endpoint=endpoint, **client_options)
+    result = _run_threads(shape, traces, 1)
+    shutdown_start = time.perf_counter()
+    ap.shutdown()
+    result.shutdown_s = time.perf_counter() - shutdown_start
+    result.dropped = _dropped(ap)
+    return result
+
+
+def _dropped(ap: AgentPulse) -> dict[str, int]:
+    return dict(ap._transport.dropped) if ap._transport is not None else {}
+
+
+def _run_threads(shape: TraceShape, traces: int, concurrency: int) -> LoadResult:
+    result = LoadResult()
+    lock = threading.Lock()
+
+    def worker(count: int) -> None:
+        local = LoadResult()
+        rng = random.Random()
+        payload = "x" * shape.payload_bytes
+        for _ in range(count):
+            start = time.perf_counter()
+            try:
+                _sync_agent(shape, rng, payload)
+            except LoadgenError:
+                local.errors += 1
+            local.latencies.append(time.perf_counter() - start)
+            local.traces += 1
+            local.spans += shape.spans_per_trace
+        with lock:
+            result.merge(local)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, _split(traces, concurrency)))
+    return result
+
+
+async def _run_async(shape: TraceShape, traces: int, concurrency: int) -> LoadResult:
+    result = LoadResult()
+    payload = "x" * shape.payload_bytes
+
+    async def worker(count: int) -> None:
+        rng = random.Random()
+        for _ in range(count):
+            start = time.perf_counter()
+            try:
+                await _async_agent(shape, rng, payload)
+            except LoadgenError:
+                result.errors += 1
+            result.latencies.append(time.perf_counter() - start)
+            result.traces += 1
+            result.spans += shape.spans_per_trace
+
+    await asyncio.gather(*(worker(count) for count in _split(traces, concurrency)))
+    return result
+
+
+@trace(name="loadgen-agent")
+def _sync_agent(shape: TraceShape, rng: random.Random, payload: str) -> None:
+    _sync_children(1, shape, rng, payload)
+
+
+def _sync_children(
+    level: int, shape: TraceShape, rng: random.Random, payload: str
+) -> None:
+    failure = None
+    for _ in range(shape.fanout):
+        try:
+            _sync_tool(level, shape, rng, payload)
+        except LoadgenError as exc:
+            failure = exc
+    if failure:
+        raise failure
+
+
+@tool(name="loadgen-tool")
+def _sync_tool(level: int, shape: TraceShape, rng: random.Random, payload: str) -> str:
+    _attach_payload(payload)
+    if level < shape.depth:
+        _sync_children(level + 1, shape, rng, payload)
+    if shape.error_rate and rng.random() < shape.error_rate:
+        raise LoadgenError("synthetic tool failure")
+    return payload
+
+
+@trace(name="loadgen-agent")
+async def _async_agent(shape: TraceShape, rng: random.Random, payload: str) -> None:
+    await _async_children(1, shape, rng, payload)
+
+
+async def _async_children(
+    level: int, shape: TraceShape, rng: random.Random, payload: str
+) -> None:
+    results = await asyncio.gather(
+        *(_async_tool(level, shape, rng, payload) for _ in range(shape.fanout)),
+        return_exceptions=True,
+    )
+    for item in results:
+        if isinstance(item, BaseException):
+            raise item
+
+
+@tool(name="loadgen-tool")
+async def _async_tool(
+    level: int, shape: TraceShape, rng: random.Random, payload: str
+) -> str:
+    _attach_payload(payload)
+    await asyncio.sleep(0)
+    if level < shape.depth:
+        await _async_children(level + 1, shape, rng, payload)
+    if shape.error_rate and rng.random() < shape.error_rate:
+        raise LoadgenError("synthetic tool failure")
+    return payload
+
+
+def _attach_payload(payload: str) -> None:
+    span = get_current_span()
+    if span is not None:
+        span.set_input({"payload": payload})
+        span.set_output({"payload": payload})
+
+
+def _split(total: int, parts: int) -> list[int]:
+    parts = max(1, min(parts, total)) if total else 1
+    base, extra = divmod(total, parts)
+    return [base + (1 if i < extra else 0) for i in range(parts)]
+
+
+def _percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    return values[min(int(q * len(values)), len(values) - 1)]
@@ -0,0 +1,192 @@
+"""Event loop lag monitoring for async agents."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from collections import Counter
+from typing import Any
+
+from .context import get_span_in_context
+from .models import Span
+from .processors import SpanProcessor
+
+logger = logging.getLogger("agentpulse")
+
+# Upper bounds (ms) of the lag histogram buckets; the last bucket is open-ended.
+LAG_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class LoopMonitor(SpanProcessor):
+    """Measures event loop lag and blames blocking on the span that caused it.
+
+    A heartbeat callback is scheduled on the loop every `interval` seconds;
+    how late it runs is the loop lag, collected into a histogram. A watchdog
+    thread notices when the heartbeat is overdue by more than `threshold`,
+    looks up the task running on the loop and the span current in that task's
+    context (typically a sync `@tool`, or a sync LLM client, called from
+    `async def` code) and records `metadata["loop_blocked"]` on it with the
+    number of blocking intervals and their total and longest duration.
+
+    Before Python 3.12 a task's context can't be read from another thread, so
+    the monitor also acts as a processor and falls back to the most recently
+    started span still open on the loop thread - exact for sync spans, which
+    can't be interleaved with other tasks.
+
+    Usage:
+        monitor = LoopMonitor(threshold=0.1)
+        ap = AgentPulse(processors=[monitor])
+
+        async def main():
+            monitor.start()
+            ...
+            print(monitor.snapshot())
+    """
+
+    def __init__(self, threshold: float = 0.1, interval: float = 0.05) -> None:
+        self.threshold = threshold
+        self.interval = interval
+        self.histogram = [0] * (len(LAG_BUCKETS_MS) + 1)
+        self.blocks = 0
+        self.max_lag_ms = 0.0
+        self.offenders: Counter[str] = Counter()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._handle: asyncio.TimerHandle | None = None
+        self._expected = 0.0
+        self._suspect: Span | None = None
+        self._suspect_ms = 0.0
+        self._blamed_ms = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watchdog: threading.Thread | None = None
+        self._loop_thread: int | None = None
+        self._open: dict[int, Span] = {}
+
+    def start(self, loop: asyncio.AbstractEventLoop | None = None) -> LoopMonitor:
+        """Start monitoring `loop` (default: the running loop)."""
+        if loop is None:
+            loop = asyncio.get_running_loop()
+            self._loop_thread = threading.get_ident()
+        self._loop = loop
+        self._stop.clear()
+        self._expected = time.monotonic() + self.interval
+        self._handle = self._loop.call_later(self.interval, self._beat)
+        self._watchdog = threading.Thread(
+            target=self._watch, name="agentpulse-loop-monitor", daemon=True
+        )
+        self._watchdog.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    def on_start(self, span: Span) -> None:
+        if self._loop_thread is None or threading.get_ident() != self._loop_thread:
+            return
+        key = id(span)
+        with self._lock:
+            self._open[key] = span
+
+        def finish(span: Span) -> None:
+            with self._lock:
+                self._open.pop(key, None)
+
+        span.add_end_callback(finish)
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return the lag histogram (bucket upper bound in ms -> count), offenders."""
+        with self._lock:
+            labels = [f"<={bound}" for bound in LAG_BUCKETS_MS] + [
+                f">{LAG_BUCKETS_MS[-1]}"
+            ]
+            return {
+                "lag_histogram_ms": dict(zip(labels, self.histogram)),
+                "blocks": self.blocks,
+                "max_lag_ms": round(self.max_lag_ms, 3),
+                "blocked_ms_by_span": {
+                    name: round(ms, 3) for name, ms in self.offenders.most_common()
+                },
+            }
+
+    def _beat(self) -> None:
+        now = time.monotonic()
+        self._loop_thread = threading.get_ident()
+        lag_ms = max(now - self._expected, 0.0) * 1000
+        with self._lock:
+            bucket = next(
+                (i for i, bound in enumerate(LAG_BUCKETS_MS) if lag_ms <= bound),
+                len(LAG_BUCKETS_MS),
+            )
+            self.histogram[bucket] += 1
+            self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+            suspect = self._suspect
+            if lag_ms >= self.threshold * 1000:
+                self.blocks += 1
+                if suspect is not None:
+                    self._blame(suspect, lag_ms - self._blamed_ms)
+                    self.offenders[suspect.name] += self._suspect_ms
+            self._suspect = None
+            self._suspect_ms = 0.0
+            self._blamed_ms = 0.0
+        if lag_ms >= self.threshold * 1000:
+            logger.warning(
+                "AgentPulse: event loop blocked for %.0f ms%s",
+                lag_ms,
+                f" in span {suspect.name!r}" if suspect is not None else "",
+            )
+        if not self._stop.is_set() and self._loop is not None:
+            self._expected = now + self.interval
+            self._handle = self._loop.call_later(self.interval, self._beat)
+
+    def _watch(self) -> None:
+        while not self._stop.wait(min(self.interval, self.threshold) / 2):
+            loop = self._loop
+            if loop is None or loop.is_closed():
+                return
+            overdue = time.monotonic() - self._expected
+            if overdue < self.threshold:
+                continue
+            with self._lock:
+                current = _current_span_on(loop)
+                if current is None and self._open:
+                    current = next(reversed(self._open.values()))
+                if current is not None and current is not self._suspect:
+                    # A new span took over the block; the previous one keeps
+                    # what it has been charged so far.
+                    if self._suspect is not None:
+                        self.offenders[self._suspect.name] += self._suspect_ms
+                        self._blamed_ms += self._suspect_ms
+                    self._suspect = current
+                    self._suspect_ms = 0.0
+                if self._suspect is not None:
+                    self._blame(self._suspect, overdue * 1000 - self._blamed_ms)
+
+    def _blame(self, span: Span, blocked_ms: float) -> None:
+        """Record the current block on `span`, refining in-progress estimates."""
+        record = (span.metadata or {}).get("loop_blocked")
+        if record is None:
+            record = {"count": 0, "total_ms": 0.0, "max_ms": 0.0}
+            span.set_metadata("loop_blocked", record)
+        if self._suspect_ms == 0.0:
+            record["count"] += 1
+        record["total_ms"] = round(
+            record["total_ms"] + blocked_ms - self._suspect_ms, 3
+        )
+        record["max_ms"] = round(max(record["max_ms"], blocked_ms), 3)
+        self._suspect_ms = blocked_ms
+
+
+def _current_span_on(loop: asyncio.AbstractEventLoop) -> Span | None:
+    task = asyncio.current_task(loop)
+    if task is None:
+        return None
+    # Task.get_context() is 3.12+; before that the caller falls back to the
+    # spans this monitor tracks as a processor.
+    if not hasattr(task, "get_context"):
+        return None
+    return get_span_in_context(task.get_context())
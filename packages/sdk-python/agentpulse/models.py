@@ -2,11 +2,15 @@
 
 from __future__ import annotations
 
+import logging
 import time
 import uuid
+from collections.abc import Callable
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Any, Optional
+from typing import Any
+
+logger = logging.getLogger("agentpulse")
 
 
 class SpanKind(str, Enum):
@@ -27,21 +31,36 @@ class Span:
     kind: SpanKind
     trace_id: str
     id: str = field(default_factory=lambda: uuid.uuid4().hex)
-    parent_span_id: Optional[str] = None
+    parent_span_id: str | None = None
     started_at: float = field(default_factory=time.time)
-    ended_at: Optional[float] = None
-    input: Optional[Any] = None
-    output: Optional[Any] = None
-    model: Optional[str] = None
-    tokens_in: Optional[int] = None
-    tokens_out: Optional[int] = None
-    cost_usd: Optional[float] = None
-    error: Optional[str] = None
-
-    def end(self, error: Optional[str] = None) -> None:
+    ended_at: float | None = None
+    input: Any | None = None
+    output: Any | None = None
+    model: str | None = None
+    tokens_in: int | None = None
+    tokens_out: int | None = None
+    cost_usd: float | None = None
+    error: str | None = None
+    metadata: dict[str, Any] | None = None
+    # Callbacks registered by processors (resource accounting, profiling) that
+    # must run when the span ends rather than when its trace is exported.
+    _on_end: list[Callable[[Span], None]] | None = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    def end(self, error: str | None = None) -> None:
         self.ended_at = time.time()
         if error:
             self.error = error
+        if self._on_end is not None:
+            callbacks, self._on_end = self._on_end, None
+            for callback in callbacks:
+                try:
+                    callback(self)
+                except Exception:
+                    logger.exception(
+                        "AgentPulse: end callback for span '%s' failed", self.name
+                    )
 
     def set_output(self, output: Any) -> None:
         self.output = output
@@ -49,8 +68,20 @@ class Span:
     def set_input(self, input_data: Any) -> None:
         self.input = input_data
 
+    def add_end_callback(self, callback: Callable[[Span], None]) -> None:
+        if self._on_end is None:
+            self._on_end = []
+        self._on_end.append(callback)
+
+    def set_metadata(self, key: str, value: Any) -> None:
+        if self.metadata is None:
+            self.metadata = {}
+        self.metadata[key] = value
+
     def to_dict(self) -> dict[str, Any]:
-        kind_value = self.kind.value if isinstance(self.kind, SpanKind) else str(self.kind)
+        kind_value = (
+            self.kind.value if isinstance(self.kind, SpanKind) else str(self.kind)
+        )
         return {
             "id": self.id,
             "trace_id": self.trace_id,
@@ -66,24 +97,27 @@ class Span:
             "tokens_out": self.tokens_out,
             "cost_usd": self.cost_usd,
             "error": self.error,
+            "metadata": self.metadata,
         }
 
 
 @dataclass
 class Trace:
-    agent_name: Optional[str] = None
+    agent_name: str | None = None
     id: str = field(default_factory=lambda: uuid.uuid4().hex)
     status: TraceStatus = TraceStatus.RUNNING
     started_at: float = field(default_factory=time.time)
-    ended_at: Optional[float] = None
+    ended_at: float | None = None
     total_tokens_in: int = 0
     total_tokens_out: int = 0
     total_cost_usd: float = 0.0
-    metadata: Optional[dict[str, Any]] = None
-    error: Optional[str] = None
+    metadata: dict[str, Any] | None = None
+    error: str | None = None
     spans: list[Span] = field(default_factory=list)
 
-    def end(self, status: TraceStatus = TraceStatus.SUCCESS, error: Optional[str] = None) -> None:
+    def end(
+        self, status: TraceStatus = TraceStatus.SUCCESS, error: str | None = None
+    ) -> None:
         self.ended_at = time.time()
         self.status = status
         if error:
@@ -0,0 +1,16 @@
+"""Provider patches. Patched callables are marked so patching twice is a no-op."""
+
+from __future__ import annotations
+
+from typing import Any
+
+_PATCHED = "_agentpulse_patched"
+
+
+def is_patched(fn: Any) -> bool:
+    return getattr(fn, _PATCHED, False) is True
+
+
+def mark_patched(fn: Any) -> Any:
+    setattr(fn, _PATCHED, True)
+    return fn
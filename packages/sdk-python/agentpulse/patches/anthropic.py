@@ -5,18 +5,32 @@ from __future__ import annotations
 import asyncio
 import functools
 import logging
-from typing import TYPE_CHECKING, Any, Optional
+from typing import TYPE_CHECKING, Any
 
 if TYPE_CHECKING:
+    from ..cache import ResponseCache
     from ..client import AgentPulse
+    from ..limits import Limiter
+    from ..ratelimits import RateLimitTracker
 
+from ..cache import record_cached_llm_call
 from ..context import restore_span, set_current_span
+from ..limits import estimate_tokens
 from ..models import SpanKind, calculate_cost
+from . import is_patched, mark_patched
+from .raw import wrap_raw_create
+from .serialize import serialize_request
 
 logger = logging.getLogger("agentpulse")
 
 
-def patch_anthropic(ap: AgentPulse, client: Optional[Any] = None) -> Optional[Any]:
+def patch_anthropic(
+    ap: AgentPulse,
+    client: Any | None = None,
+    cache: bool | ResponseCache | None = None,
+    rate_limits: bool | RateLimitTracker | None = None,
+    limit: Limiter | None = None,
+) -> Any | None:
     """Patch Anthropic client(s) for automatic span creation."""
     try:
         import anthropic
@@ -24,59 +38,129 @@ def patch_anthropic(ap: AgentPulse, client: Optional[Any] = None) -> Optional[An
         logger.warning("AgentPulse: anthropic package not installed, skipping patch")
         return client
 
+    response_cache: ResponseCache | None = None
+    if cache is True:
+        from ..cache import ResponseCache
+
+        response_cache = ResponseCache()
+    elif cache:
+        response_cache = cache
+
+    tracker: RateLimitTracker | None = None
+    if rate_limits is True:
+        from ..ratelimits import RateLimitTracker
+
+        if ap.rate_limits is None:
+            ap.rate_limits = RateLimitTracker()
+        tracker = ap.rate_limits
+    elif rate_limits:
+        tracker = rate_limits
+
     if client is not None:
-        _patch_client_instance(ap, client)
+        _patch_client_instance(ap, client, response_cache, tracker, limit)
         return client
 
-    _patch_module(ap, anthropic)
+    _patch_module(ap, anthropic, response_cache, tracker, limit)
     return None
 
 
-def _patch_client_instance(ap: AgentPulse, client: Any) -> None:
+def _patch_client_instance(
+    ap: AgentPulse,
+    client: Any,
+    cache: ResponseCache | None = None,
+    tracker: RateLimitTracker | None = None,
+    limit: Limiter | None = None,
+) -> None:
     if hasattr(client, "messages"):
-        _wrap_messages(ap, client.messages)
+        _wrap_messages(ap, client.messages, cache, tracker, limit)
 
 
-def _patch_module(ap: AgentPulse, anthropic_module: Any) -> None:
+def _patch_module(
+    ap: AgentPulse,
+    anthropic_module: Any,
+    cache: ResponseCache | None = None,
+    tracker: RateLimitTracker | None = None,
+    limit: Limiter | None = None,
+) -> None:
+    if is_patched(anthropic_module.Anthropic.__init__):
+        logger.debug(
+            "AgentPulse: anthropic module already patched; "
+            "options of this patch_anthropic call are ignored"
+        )
+        return
     original_init = anthropic_module.Anthropic.__init__
     original_async_init = anthropic_module.AsyncAnthropic.__init__
 
     @functools.wraps(original_init)
     def patched_init(self: Any, *args: Any, **kwargs: Any) -> None:
         original_init(self, *args, **kwargs)
-        _patch_client_instance(ap, self)
+        _patch_client_instance(ap, self, cache, tracker, limit)
 
     @functools.wraps(original_async_init)
     def patched_async_init(self: Any, *args: Any, **kwargs: Any) -> None:
         original_async_init(self, *args, **kwargs)
-        _patch_client_instance(ap, self)
+        _patch_client_instance(ap, self, cache, tracker, limit)
 
-    anthropic_module.Anthropic.__init__ = patched_init
-    anthropic_module.AsyncAnthropic.__init__ = patched_async_init
+    anthropic_module.Anthropic.__init__ = mark_patched(patched_init)
+    anthropic_module.AsyncAnthropic.__init__ = mark_patched(patched_async_init)
 
 
-def _wrap_messages(ap: AgentPulse, messages_resource: Any) -> None:
+def _wrap_messages(
+    ap: AgentPulse,
+    messages_resource: Any,
+    cache: ResponseCache | None = None,
+    tracker: RateLimitTracker | None = None,
+    limit: Limiter | None = None,
+) -> None:
     if not hasattr(messages_resource, "create"):
         return
+    if is_patched(messages_resource.create):
+        logger.debug(
+            "AgentPulse: anthropic client already patched; "
+            "options of this patch_anthropic call are ignored"
+        )
+        return
 
     original_create = messages_resource.create
     is_async = asyncio.iscoroutinefunction(original_create)
+    # Raw-response access exposes headers and retry counts; it has to be
+    # taken before `create` is replaced, as it wraps the bound method.
+    raw_resource = getattr(messages_resource, "with_raw_response", None)
+    raw_create = getattr(raw_resource, "create", None) if tracker is not None else None
 
     if is_async:
+
         @functools.wraps(original_create)
         async def traced_create(*args: Any, **kwargs: Any) -> Any:
             model = kwargs.get("model", "unknown")
-            messages = kwargs.get("messages")
             span = ap.start_span(
                 name=f"anthropic.{model}",
                 kind=SpanKind.LLM,
-                input_data=_safe_serialize_messages(messages),
+                input_data=serialize_request(kwargs),
             )
             span.model = model
             span_token = set_current_span(span)
+            create = (
+                tracker.wrap_async(raw_create, span)
+                if tracker and raw_create
+                else original_create
+            )
+            if limit is not None:
+                create = limit.wrap_async(
+                    create,
+                    model,
+                    span,
+                    estimate_tokens(kwargs),
+                    _Usage(),
+                    streams=True,
+                )
             try:
-                response = await original_create(*args, **kwargs)
+                if cache and cache.is_cacheable(kwargs):
+                    response = await cache.acall(span.name, create, args, kwargs, span)
+                else:
+                    response = await create(*args, **kwargs)
                 _extract_usage(span, response)
+                record_cached_llm_call(span)
                 return response
             except Exception as exc:
                 span.end(error=str(exc))
@@ -84,20 +168,38 @@ def _wrap_messages(ap: AgentPulse, messages_resource: Any) -> None:
             finally:
                 restore_span(span_token)
     else:
+
         @functools.wraps(original_create)
         def traced_create(*args: Any, **kwargs: Any) -> Any:
             model = kwargs.get("model", "unknown")
-            messages = kwargs.get("messages")
             span = ap.start_span(
                 name=f"anthropic.{model}",
                 kind=SpanKind.LLM,
-                input_data=_safe_serialize_messages(messages),
+                input_data=serialize_request(kwargs),
             )
             span.model = model
             span_token = set_current_span(span)
+            create = (
+                tracker.wrap(raw_create, span)
+                if tracker and raw_create
+                else original_create
+            )
+            if limit is not None:
+                create = limit.wrap(
+                    create,
+                    model,
+                    span,
+                    estimate_tokens(kwargs),
+                    _Usage(),
+                    streams=True,
+                )
             try:
-                response = original_create(*args, **kwargs)
+                if cache and cache.is_cacheable(kwargs):
+                    response = cache.call(span.name, create, args, kwargs, span)
+                else:
+                    response = create(*args, **kwargs)
                 _extract_usage(span, response)
+                record_cached_llm_call(span)
                 return response
             except Exception as exc:
                 span.end(error=str(exc))
@@ -105,7 +207,11 @@ def _wrap_messages(ap: AgentPulse, messages_resource: Any) -> None:
             finally:
                 restore_span(span_token)
 
-    messages_resource.create = traced_create
+    messages_resource.create = mark_patched(traced_create)
+    if raw_resource is not None:
+        wrap_raw_create(
+            ap, raw_resource, "anthropic", _extract_usage, _total_tokens, tracker, limit
+        )
 
 
 def _extract_usage(span: Any, response: Any) -> None:
@@ -127,20 +233,38 @@ def _extract_usage(span: Any, response: Any) -> None:
     span.end()
 
 
-def _safe_serialize_messages(messages: Any) -> Any:
-    if messages is None:
+def _total_tokens(response: Any) -> int | None:
+    """Tokens actually used by a `Message`, for settling a `Limiter` reservation."""
+    usage = getattr(response, "usage", None)
+    if usage is None:
         return None
-    if not isinstance(messages, list):
-        return str(messages)[:1000]
-
-    result = []
-    for msg in messages:
-        if isinstance(msg, dict):
-            serialized = {**msg}
-            if "content" in serialized and isinstance(serialized["content"], str):
-                if len(serialized["content"]) > 500:
-                    serialized["content"] = serialized["content"][:500] + "...[truncated]"
-            result.append(serialized)
-        else:
-            result.append(str(msg)[:500])
-    return result
+    return (getattr(usage, "input_tokens", 0) or 0) + (
+        getattr(usage, "output_tokens", 0) or 0
+    )
+
+
+class _Usage:
+    """Tokens used by one call, from its `Message` or from its stream events.
+
+    A stream reports input tokens on `message_start` and the running output
+    count on each `message_delta`, so the total is the input from the first
+    plus the output from the latest.
+    """
+
+    def __init__(self) -> None:
+        self.input_tokens: int | None = None
+        self.output_tokens = 0
+
+    def __call__(self, response: Any) -> int | None:
+        kind = getattr(response, "type", None)
+        if kind == "message_start":
+            usage = response.message.usage
+            self.input_tokens = getattr(usage, "input_tokens", 0) or 0
+            self.output_tokens = getattr(usage, "output_tokens", 0) or 0
+        elif kind == "message_delta":
+            self.output_tokens = getattr(response.usage, "output_tokens", 0) or 0
+        elif self.input_tokens is None:
+            return _total_tokens(response)
+        if self.input_tokens is None:
+            return None
+        return self.input_tokens + self.output_tokens
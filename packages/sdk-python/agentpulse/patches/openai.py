@@ -5,18 +5,32 @@ from __future__ import annotations
 import asyncio
 import functools
 import logging
-from typing import TYPE_CHECKING, Any, Optional
+from typing import TYPE_CHECKING, Any
 
 if TYPE_CHECKING:
+    from ..cache import ResponseCache
     from ..client import AgentPulse
+    from ..limits import Limiter
+    from ..ratelimits import RateLimitTracker
 
-from ..context import get_current_span, restore_span, set_current_span
+from ..cache import record_cached_llm_call
+from ..context import restore_span, set_current_span
+from ..limits import estimate_tokens
 from ..models import SpanKind, calculate_cost
+from . import is_patched, mark_patched
+from .raw import wrap_raw_create
+from .serialize import serialize_request
 
 logger = logging.getLogger("agentpulse")
 
 
-def patch_openai(ap: AgentPulse, client: Optional[Any] = None) -> Optional[Any]:
+def patch_openai(
+    ap: AgentPulse,
+    client: Any | None = None,
+    cache: bool | ResponseCache | None = None,
+    rate_limits: bool | RateLimitTracker | None = None,
+    limit: Limiter | None = None,
+) -> Any | None:
     """Patch OpenAI client(s) for automatic span creation.
 
     If `client` is provided, wraps that specific instance and returns it.
@@ -28,65 +42,135 @@ def patch_openai(ap: AgentPulse, client: Optional[Any] = None) -> Optional[Any]:
         logger.warning("AgentPulse: openai package not installed, skipping patch")
         return client
 
+    response_cache: ResponseCache | None = None
+    if cache is True:
+        from ..cache import ResponseCache
+
+        response_cache = ResponseCache()
+    elif cache:
+        response_cache = cache
+
+    tracker: RateLimitTracker | None = None
+    if rate_limits is True:
+        from ..ratelimits import RateLimitTracker
+
+        if ap.rate_limits is None:
+            ap.rate_limits = RateLimitTracker()
+        tracker = ap.rate_limits
+    elif rate_limits:
+        tracker = rate_limits
+
     if client is not None:
-        _patch_client_instance(ap, client)
+        _patch_client_instance(ap, client, response_cache, tracker, limit)
         return client
 
     # Global patch: wrap the default clients
-    _patch_module(ap, openai)
+    _patch_module(ap, openai, response_cache, tracker, limit)
     return None
 
 
-def _patch_client_instance(ap: AgentPulse, client: Any) -> None:
+def _patch_client_instance(
+    ap: AgentPulse,
+    client: Any,
+    cache: ResponseCache | None = None,
+    tracker: RateLimitTracker | None = None,
+    limit: Limiter | None = None,
+) -> None:
     """Patch a specific OpenAI client instance."""
     if hasattr(client, "chat") and hasattr(client.chat, "completions"):
-        _wrap_completions(ap, client.chat.completions)
+        _wrap_completions(ap, client.chat.completions, cache, tracker, limit)
     if hasattr(client, "completions"):
-        _wrap_completions(ap, client.completions)
+        _wrap_completions(ap, client.completions, cache, tracker, limit)
 
 
-def _patch_module(ap: AgentPulse, openai_module: Any) -> None:
+def _patch_module(
+    ap: AgentPulse,
+    openai_module: Any,
+    cache: ResponseCache | None = None,
+    tracker: RateLimitTracker | None = None,
+    limit: Limiter | None = None,
+) -> None:
     """Monkey-patch the openai module to wrap new client instances."""
+    if is_patched(openai_module.OpenAI.__init__):
+        logger.debug(
+            "AgentPulse: openai module already patched; "
+            "options of this patch_openai call are ignored"
+        )
+        return
     original_init = openai_module.OpenAI.__init__
     original_async_init = openai_module.AsyncOpenAI.__init__
 
     @functools.wraps(original_init)
     def patched_init(self: Any, *args: Any, **kwargs: Any) -> None:
         original_init(self, *args, **kwargs)
-        _patch_client_instance(ap, self)
+        _patch_client_instance(ap, self, cache, tracker, limit)
 
     @functools.wraps(original_async_init)
     def patched_async_init(self: Any, *args: Any, **kwargs: Any) -> None:
         original_async_init(self, *args, **kwargs)
-        _patch_client_instance(ap, self)
+        _patch_client_instance(ap, self, cache, tracker, limit)
 
-    openai_module.OpenAI.__init__ = patched_init
-    openai_module.AsyncOpenAI.__init__ = patched_async_init
+    openai_module.OpenAI.__init__ = mark_patched(patched_init)
+    openai_module.AsyncOpenAI.__init__ = mark_patched(patched_async_init)
 
 
-def _wrap_completions(ap: AgentPulse, completions: Any) -> None:
+def _wrap_completions(
+    ap: AgentPulse,
+    completions: Any,
+    cache: ResponseCache | None = None,
+    tracker: RateLimitTracker | None = None,
+    limit: Limiter | None = None,
+) -> None:
     """Wrap the create method on a completions resource."""
     if not hasattr(completions, "create"):
         return
+    if is_patched(completions.create):
+        logger.debug(
+            "AgentPulse: openai client already patched; "
+            "options of this patch_openai call are ignored"
+        )
+        return
 
     original_create = completions.create
     is_async = asyncio.iscoroutinefunction(original_create)
+    # Raw-response access exposes headers and retry counts; it has to be
+    # taken before `create` is replaced, as it wraps the bound method.
+    raw_resource = getattr(completions, "with_raw_response", None)
+    raw_create = getattr(raw_resource, "create", None) if tracker is not None else None
 
     if is_async:
+
         @functools.wraps(original_create)
         async def traced_create(*args: Any, **kwargs: Any) -> Any:
             model = kwargs.get("model", "unknown")
-            messages = kwargs.get("messages")
             span = ap.start_span(
                 name=f"openai.{model}",
                 kind=SpanKind.LLM,
-                input_data=_safe_serialize_messages(messages),
+                input_data=serialize_request(kwargs),
             )
             span.model = model
             span_token = set_current_span(span)
+            create = (
+                tracker.wrap_async(raw_create, span)
+                if tracker and raw_create
+                else original_create
+            )
+            if limit is not None:
+                create = limit.wrap_async(
+                    create,
+                    model,
+                    span,
+                    estimate_tokens(kwargs),
+                    _total_tokens,
+                    streams=True,
+                )
             try:
-                response = await original_create(*args, **kwargs)
+                if cache and cache.is_cacheable(kwargs):
+                    response = await cache.acall(span.name, create, args, kwargs, span)
+                else:
+                    response = await create(*args, **kwargs)
                 _extract_usage(span, response)
+                record_cached_llm_call(span)
                 return response
             except Exception as exc:
                 span.end(error=str(exc))
@@ -94,20 +178,38 @@ def _wrap_completions(ap: AgentPulse, completions: Any) -> None:
             finally:
                 restore_span(span_token)
     else:
+
         @functools.wraps(original_create)
         def traced_create(*args: Any, **kwargs: Any) -> Any:
             model = kwargs.get("model", "unknown")
-            messages = kwargs.get("messages")
             span = ap.start_span(
                 name=f"openai.{model}",
                 kind=SpanKind.LLM,
-                input_data=_safe_serialize_messages(messages),
+                input_data=serialize_request(kwargs),
             )
             span.model = model
             span_token = set_current_span(span)
+            create = (
+                tracker.wrap(raw_create, span)
+                if tracker and raw_create
+                else original_create
+            )
+            if limit is not None:
+                create = limit.wrap(
+                    create,
+                    model,
+                    span,
+                    estimate_tokens(kwargs),
+                    _total_tokens,
+                    streams=True,
+                )
             try:
-                response = original_create(*args, **kwargs)
+                if cache and cache.is_cacheable(kwargs):
+                    response = cache.call(span.name, create, args, kwargs, span)
+                else:
+                    response = create(*args, **kwargs)
                 _extract_usage(span, response)
+                record_cached_llm_call(span)
                 return response
             except Exception as exc:
                 span.end(error=str(exc))
@@ -115,7 +217,11 @@ def _wrap_completions(ap: AgentPulse, completions: Any) -> None:
             finally:
                 restore_span(span_token)
 
-    completions.create = traced_create
+    completions.create = mark_patched(traced_create)
+    if raw_resource is not None:
+        wrap_raw_create(
+            ap, raw_resource, "openai", _extract_usage, _total_tokens, tracker, limit
+        )
 
 
 def _extract_usage(span: Any, response: Any) -> None:
@@ -137,21 +243,11 @@ def _extract_usage(span: Any, response: Any) -> None:
     span.end()
 
 
-def _safe_serialize_messages(messages: Any) -> Any:
-    """Safely serialize messages for storage, truncating large content."""
-    if messages is None:
+def _total_tokens(response: Any) -> int | None:
+    """Tokens actually used, for settling a `Limiter` reservation."""
+    usage = getattr(response, "usage", None)
+    if usage is None:
         return None
-    if not isinstance(messages, list):
-        return str(messages)[:1000]
-
-    result = []
-    for msg in messages:
-        if isinstance(msg, dict):
-            serialized = {**msg}
-            if "content" in serialized and isinstance(serialized["content"], str):
-                if len(serialized["content"]) > 500:
-                    serialized["content"] = serialized["content"][:500] + "...[truncated]"
-            result.append(serialized)
-        else:
-            result.append(str(msg)[:500])
-    return result
+    return (getattr(usage, "prompt_tokens", 0) or 0) + (
+        getattr(usage, "completion_tokens", 0) or 0
+    )
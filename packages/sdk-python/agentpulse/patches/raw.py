@@ -0,0 +1,132 @@
+"""Tracing for calls made through a resource's `with_raw_response.create`."""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import time
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from ..client import AgentPulse
+    from ..limits import Limiter
+    from ..ratelimits import RateLimitTracker
+
+from ..context import restore_span, set_current_span
+from ..limits import estimate_tokens
+from ..models import Span, SpanKind
+from . import is_patched, mark_patched
+from .serialize import serialize_request
+
+
+def wrap_raw_create(
+    ap: AgentPulse,
+    raw_resource: Any,
+    provider: str,
+    extract_usage: Callable[[Span, Any], None],
+    total_tokens: Callable[[Any], int | None],
+    tracker: RateLimitTracker | None = None,
+    limit: Limiter | None = None,
+) -> None:
+    """Trace `raw_resource.create`, which returns the raw HTTP response.
+
+    Spans, rate-limit capture and limits work as for `create`; the caller
+    still gets the raw response back. The response cache is not used, as it
+    stores parsed responses, and a raw `stream=True` response releases its
+    `Limiter` slot when it is returned rather than when the stream ends.
+    """
+    raw_create = getattr(raw_resource, "create", None)
+    if raw_create is None or is_patched(raw_create):
+        return
+
+    def usage(raw: Any) -> int | None:
+        return total_tokens(raw.parse())
+
+    def start(kwargs: dict[str, Any]) -> Span:
+        model = kwargs.get("model", "unknown")
+        span = ap.start_span(
+            name=f"{provider}.{model}",
+            kind=SpanKind.LLM,
+            input_data=serialize_request(kwargs),
+        )
+        span.model = model
+        return span
+
+    if asyncio.iscoroutinefunction(raw_create):
+
+        @functools.wraps(raw_create)
+        async def traced_raw_create(*args: Any, **kwargs: Any) -> Any:
+            span = start(kwargs)
+            span_token = set_current_span(span)
+
+            async def create(*args: Any, **kwargs: Any) -> Any:
+                started = time.monotonic()
+                try:
+                    raw = await raw_create(*args, **kwargs)
+                except Exception as exc:
+                    if tracker is not None:
+                        tracker.record_error(span, exc, started)
+                    raise
+                if tracker is not None:
+                    tracker.record(span, raw, started)
+                return raw
+
+            call = create
+            if limit is not None:
+                call = limit.wrap_async(
+                    create,
+                    span.model,
+                    span,
+                    estimate_tokens(kwargs),
+                    usage,
+                )
+            try:
+                raw = await call(*args, **kwargs)
+                extract_usage(span, raw.parse())
+                return raw
+            except Exception as exc:
+                span.end(error=str(exc))
+                raise
+            finally:
+                restore_span(span_token)
+
+    else:
+
+        @functools.wraps(raw_create)
+        def traced_raw_create(*args: Any, **kwargs: Any) -> Any:
+            span = start(kwargs)
+            span_token = set_current_span(span)
+
+            def create(*args: Any, **kwargs: Any) -> Any:
+                started = time.monotonic()
+                try:
+                    raw = raw_create(*args, **kwargs)
+                except Exception as exc:
+                    if tracker is not None:
+                        tracker.record_error(span, exc, started)
+                    raise
+                if tracker is not None:
+                    tracker.record(span, raw, started)
+                return raw
+
+            call = create
+            if limit is not None:
+                call = limit.wrap(
+                    create,
+                    span.model,
+                    span,
+                    estimate_tokens(kwargs),
+                    usage,
+                )
+            try:
+                raw = call(*args, **kwargs)
+                extract_usage(span, raw.parse())
+                return raw
+            except Exception as exc:
+                span.end(error=str(exc))
+                raise
+            finally:
+                restore_span(span_token)
+
+    raw_resource.create = mark_patched(traced_raw_create)
@@ -0,0 +1,218 @@
+"""Serialization of LLM request messages for span input.
+
+Shared by the OpenAI and Anthropic patches. Message content may be a plain
+string or a list of content blocks (text, images, documents, audio, tool calls
+and tool results). Text is truncated, binary payloads are replaced by a short
+summary and tool arguments/results are capped, so span payloads stay small no
+matter what the agent sends. The caller's messages are never mutated; new
+containers are only built for the parts that are kept.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Any
+
+TEXT_LIMIT = 500
+TOOL_LIMIT = 1000
+MAX_DEPTH = 6
+
+_TRUNCATED = "...[truncated]"
+
+
+def serialize_messages(messages: Any) -> Any:
+    """Serialize a list of chat messages for storage on a span."""
+    if messages is None:
+        return None
+    if not isinstance(messages, list):
+        return str(messages)[:1000]
+
+    result = []
+    for msg in messages:
+        if isinstance(msg, dict):
+            result.append(_serialize_message(msg))
+        else:
+            result.append(str(msg)[:TEXT_LIMIT])
+    return result
+
+
+def serialize_request(kwargs: dict[str, Any]) -> Any:
+    """Serialize the prompt of an LLM request: its messages, system prompt and tools.
+
+    An Anthropic `system` prompt becomes a leading `{"role": "system"}` message,
+    the shape OpenAI requests already have, and `tools` (or legacy `functions`)
+    schemas a `{"role": "tools"}` message whose content is the list of schemas,
+    so deduplication treats both like any other message content.
+    """
+    messages = serialize_messages(kwargs.get("messages"))
+    system = kwargs.get("system")
+    tools = kwargs.get("tools") or kwargs.get("functions")
+    if (system is None and not tools) or not isinstance(messages, (list, type(None))):
+        return messages
+    prefix: list[Any] = []
+    if system is not None:
+        prefix.append({"role": "system", "content": serialize_content(system)})
+    if tools:
+        prefix.append(
+            {
+                "role": "tools",
+                "content": [_summarize(tool, TOOL_LIMIT, 1) for tool in tools],
+            }
+        )
+    return prefix + (messages or [])
+
+
+def _serialize_message(msg: dict[str, Any]) -> dict[str, Any]:
+    serialized: dict[str, Any] = {}
+    for key, value in msg.items():
+        if key == "content":
+            serialized[key] = serialize_content(value)
+        elif key == "tool_calls" and isinstance(value, list):
+            serialized[key] = [_serialize_tool_call(call) for call in value]
+        else:
+            serialized[key] = _summarize(value, TEXT_LIMIT, 0)
+    return serialized
+
+
+def serialize_content(content: Any, limit: int = TEXT_LIMIT) -> Any:
+    """Serialize message content (a string or blocks), with text capped at `limit`."""
+    if isinstance(content, str):
+        return truncate(content, limit)
+    if isinstance(content, list):
+        return [_serialize_block(block, limit) for block in content]
+    return _summarize(content, limit, 0)
+
+
+def _serialize_block(block: Any, limit: int) -> Any:
+    if not isinstance(block, dict):
+        return _summarize(block, limit, 1)
+
+    block_type = block.get("type")
+
+    if block_type == "text":
+        return {"type": "text", "text": truncate(block.get("text"), limit)}
+
+    # Anthropic: {"type": "image"|"document",
+    #             "source": {"type": "base64", "media_type", "data"}}
+    if block_type in ("image", "document"):
+        source = block.get("source")
+        if isinstance(source, dict) and source.get("type") == "base64":
+            return {
+                "type": block_type,
+                **_binary_summary(source.get("data"), source.get("media_type")),
+            }
+        return _summarize(block, limit, 1)
+
+    # OpenAI: {"type": "image_url", "image_url": {"url": "data:image/png;base64,..."}}
+    if block_type == "image_url":
+        image = block.get("image_url")
+        url = image.get("url") if isinstance(image, dict) else image
+        if isinstance(url, str) and url.startswith("data:"):
+            header, _, data = url.partition(",")
+            media_type = header[5:].split(";", 1)[0] or None
+            return {"type": block_type, **_binary_summary(data, media_type)}
+        return _summarize(block, limit, 1)
+
+    # OpenAI: {"type": "input_audio", "input_audio": {"data", "format"}}
+    if block_type == "input_audio":
+        audio = block.get("input_audio") or {}
+        return {
+            "type": block_type,
+            **_binary_summary(audio.get("data"), f"audio/{audio.get('format', '')}"),
+        }
+
+    # OpenAI: {"type": "file", "file": {"file_data", "filename"}}
+    if block_type == "file":
+        file = block.get("file") or {}
+        if "file_data" in file:
+            summary = _binary_summary(file.get("file_data"), None)
+            return {"type": block_type, "filename": file.get("filename"), **summary}
+        return _summarize(block, limit, 1)
+
+    if block_type == "tool_use":
+        return {
+            "type": block_type,
+            "id": block.get("id"),
+            "name": block.get("name"),
+            "input": _cap_json(block.get("input"), TOOL_LIMIT),
+        }
+
+    if block_type == "tool_result":
+        result = {key: value for key, value in block.items() if key != "content"}
+        content = block.get("content")
+        if content is not None:
+            result["content"] = serialize_content(content, TOOL_LIMIT)
+        return result
+
+    return _summarize(block, limit, 1)
+
+
+def _serialize_tool_call(call: Any) -> Any:
+    if not isinstance(call, dict):
+        return _summarize(call, TOOL_LIMIT, 1)
+    function = call.get("function")
+    if not isinstance(function, dict):
+        return _summarize(call, TOOL_LIMIT, 1)
+    return {
+        **{key: value for key, value in call.items() if key != "function"},
+        "function": {
+            "name": function.get("name"),
+            "arguments": _cap_json(function.get("arguments"), TOOL_LIMIT),
+        },
+    }
+
+
+def truncate(value: Any, limit: int) -> Any:
+    if isinstance(value, str) and len(value) > limit:
+        return value[:limit] + _TRUNCATED
+    return value
+
+
+def _binary_summary(data: Any, media_type: Any) -> dict[str, Any]:
+    """Describe a binary payload by size, media type and a content hash."""
+    if isinstance(data, str):
+        raw = data.encode("ascii", "ignore")
+        size = len(raw) * 3 // 4 - data[-2:].count("=")
+    elif isinstance(data, (bytes, bytearray, memoryview)):
+        raw = bytes(data)
+        size = len(raw)
+    else:
+        return {"media_type": media_type, "bytes": None}
+    return {
+        "media_type": media_type,
+        "bytes": size,
+        "sha256": hashlib.sha256(raw).hexdigest()[:16],
+    }
+
+
+def _cap_json(value: Any, limit: int) -> Any:
+    """Keep small tool arguments as-is; cap large ones as a truncated JSON string."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return truncate(value, limit)
+    try:
+        encoded = json.dumps(value, default=str)
+    except (TypeError, ValueError):
+        return truncate(str(value), limit)
+    if len(encoded) <= limit:
+        return value
+    return encoded[:limit] + _TRUNCATED
+
+
+def _summarize(value: Any, limit: int, depth: int) -> Any:
+    """Generic fallback: truncate strings, summarize bytes, recurse into containers."""
+    if isinstance(value, str):
+        return truncate(value, limit)
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return _binary_summary(value, None)
+    if depth >= MAX_DEPTH:
+        return truncate(str(value), limit)
+    if isinstance(value, dict):
+        return {key: _summarize(item, limit, depth + 1) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_summarize(item, limit, depth + 1) for item in value]
+    return truncate(str(value), limit)
@@ -0,0 +1,186 @@
+"""Span processors: hooks between span creation and export."""
+
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from typing import TYPE_CHECKING, Any
+
+from .models import Span, Trace
+
+if TYPE_CHECKING:
+    from .exporters import Exporter
+
+logger = logging.getLogger("agentpulse")
+
+_FLUSH = "flush"
+_STOP = "stop"
+# Already serialized records, queued by the deprecated `BatchExporter`.
+_TRACE = "trace"
+_SPAN = "span"
+
+
+class SpanProcessor:
+    """Base class for span processors.
+
+    Processors run in the order they were given to `AgentPulse(processors=...)`.
+    `on_start` is called when a span is created; `on_end` and `on_trace_end`
+    are called when its trace finishes, before anything is serialized.
+    Returning False from `on_end` drops that span, and returning False from
+    `on_trace_end` drops the trace with all of its spans; later processors and
+    exporters never see dropped items.
+
+    Usage:
+        class Redact(SpanProcessor):
+            def on_end(self, span):
+                span.input = None
+                return True
+    """
+
+    def on_start(self, span: Span) -> None:
+        pass
+
+    def on_end(self, span: Span) -> bool:
+        return True
+
+    def on_trace_end(self, trace: Trace) -> bool:
+        return True
+
+    def force_flush(self) -> None:
+        pass
+
+    def shutdown(self) -> None:
+        pass
+
+
+class BatchProcessor(SpanProcessor):
+    """Queues finished traces and spans and exports them from a single thread.
+
+    All exporters share the one queue: each item is serialized once on the
+    background thread and the same batch is handed to every exporter.
+    Enqueueing never blocks; when the queue is full new items are dropped and
+    counted in `dropped`.
+    """
+
+    def __init__(
+        self,
+        exporters: list[Exporter],
+        flush_interval: float = 2.0,
+        batch_size: int = 512,
+        max_queue_size: int = 100_000,
+    ) -> None:
+        self._exporters = list(exporters)
+        self._flush_interval = flush_interval
+        self._batch_size = batch_size
+        self._queue: queue.Queue[Span | Trace | tuple[str, Any]] = queue.Queue(
+            max_queue_size
+        )
+        self._closed = False
+        self.dropped = 0
+        self._thread = threading.Thread(
+            target=self._run, name="agentpulse-exporter", daemon=True
+        )
+        self._thread.start()
+
+    def on_end(self, span: Span) -> bool:
+        self._enqueue(span)
+        return True
+
+    def on_trace_end(self, trace: Trace) -> bool:
+        self._enqueue(trace)
+        return True
+
+    def _enqueue(self, item: Span | Trace | tuple[str, Any]) -> None:
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+            logger.debug(
+                "AgentPulse: export queue full, dropping %s",
+                type(item).__name__.lower(),
+            )
+
+    def force_flush(self, timeout: float | None = 30.0) -> None:
+        """Block until everything queued before this call has been exported."""
+        if self._closed or not self._thread.is_alive():
+            return
+        done = threading.Event()
+        self._queue.put((_FLUSH, done))
+        done.wait(timeout)
+
+    def shutdown(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put((_STOP, None))
+        self._thread.join(timeout=30.0)
+        for exporter in self._exporters:
+            try:
+                exporter.shutdown()
+            except Exception as exc:
+                logger.warning(
+                    "AgentPulse: failed to shut down %s: %s",
+                    type(exporter).__name__,
+                    exc,
+                )
+
+    def _run(self) -> None:
+        traces: list[dict[str, Any]] = []
+        spans: list[dict[str, Any]] = []
+        deadline = time.monotonic() + self._flush_interval
+
+        while True:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0.0))
+            except queue.Empty:
+                item = (_FLUSH, None)
+
+            command = None
+            if isinstance(item, Span):
+                spans.append(item.to_dict())
+            elif isinstance(item, Trace):
+                traces.append(item.to_dict())
+            else:
+                command, event = item
+                if command == _TRACE:
+                    traces.append(event)
+                    command = None
+                elif command == _SPAN:
+                    spans.append(event)
+                    command = None
+
+            full = len(traces) + len(spans) >= self._batch_size
+            if command or full or time.monotonic() >= deadline:
+                if traces or spans:
+                    self._export(traces, spans)
+                    traces, spans = [], []
+                deadline = time.monotonic() + self._flush_interval
+
+            if command == _FLUSH and event is not None:
+                for exporter in self._exporters:
+                    try:
+                        exporter.force_flush()
+                    except Exception as exc:
+                        logger.warning(
+                            "AgentPulse: failed to flush %s: %s",
+                            type(exporter).__name__,
+                            exc,
+                        )
+                event.set()
+            elif command == _STOP:
+                return
+
+    def _export(
+        self, traces: list[dict[str, Any]], spans: list[dict[str, Any]]
+    ) -> None:
+        for exporter in self._exporters:
+            try:
+                exporter.export(traces, spans)
+            except Exception as exc:
+                logger.warning(
+                    "AgentPulse: %s failed to export batch: %s",
+                    type(exporter).__name__,
+                    exc,
+                )
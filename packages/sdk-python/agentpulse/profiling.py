@@ -0,0 +1,129 @@
+"""Stack sampling for slow spans."""
+
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from types import FrameType
+
+from .models import Span, SpanKind
+from .processors import SpanProcessor
+
+
+class StackSampler(SpanProcessor):
+    """Profiles spans that run longer than `threshold` seconds.
+
+    A background thread wakes every `interval` seconds and, for each thread
+    running a span of one of `kinds` that has been open longer than
+    `threshold`, captures that thread's stack with `sys._current_frames()`.
+    Samples are aggregated into folded stacks (`outer;...;inner count`, the
+    input format of flamegraph tools) and stored in `metadata["profile"]` when
+    the span ends. Spans that finish under the threshold are never sampled.
+
+    Async spans are sampled on their event loop thread, so a sample may show
+    another task that was running on the loop at that moment.
+
+    Usage:
+        ap = AgentPulse(processors=[StackSampler(threshold=1.0)])
+    """
+
+    def __init__(
+        self,
+        threshold: float = 1.0,
+        interval: float = 0.01,
+        kinds: tuple[SpanKind, ...] = (SpanKind.TOOL,),
+        max_depth: int = 64,
+        max_stacks: int = 200,
+    ) -> None:
+        self.threshold = threshold
+        self.interval = interval
+        self.kinds = kinds
+        self.max_depth = max_depth
+        self.max_stacks = max_stacks
+        self._running: dict[int, _Running] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="agentpulse-sampler", daemon=True
+        )
+        self._thread.start()
+
+    def on_start(self, span: Span) -> None:
+        if span.kind not in self.kinds:
+            return
+        running = _Running(threading.get_ident(), time.monotonic() + self.threshold)
+        key = id(running)
+        with self._lock:
+            self._running[key] = running
+
+        def finish(span: Span) -> None:
+            with self._lock:
+                self._running.pop(key, None)
+            if running.samples:
+                span.set_metadata(
+                    "profile",
+                    {
+                        "interval_ms": self.interval * 1000,
+                        "samples": sum(running.samples.values()),
+                        "folded": [
+                            f"{stack} {count}"
+                            for stack, count in running.samples.most_common()
+                        ],
+                    },
+                )
+
+        span.add_end_callback(finish)
+
+    def shutdown(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            now = time.monotonic()
+            with self._lock:
+                due = [
+                    running
+                    for running in self._running.values()
+                    if running.slow_after <= now
+                ]
+            if not due:
+                continue
+            frames = sys._current_frames()
+            folded: dict[int, str | None] = {}
+            for running in due:
+                if running.thread == own:
+                    continue
+                if running.thread not in folded:
+                    frame = frames.get(running.thread)
+                    folded[running.thread] = (
+                        self._fold(frame) if frame is not None else None
+                    )
+                stack = folded[running.thread]
+                if stack is None:
+                    continue
+                if stack in running.samples or len(running.samples) < self.max_stacks:
+                    running.samples[stack] += 1
+                else:
+                    running.samples["[other]"] += 1
+
+    def _fold(self, frame: FrameType | None) -> str:
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        names.reverse()
+        return ";".join(names)
+
+
+class _Running:
+    __slots__ = ("thread", "slow_after", "samples")
+
+    def __init__(self, thread: int, slow_after: float) -> None:
+        self.thread = thread
+        self.slow_after = slow_after
+        self.samples: Counter[str] = Counter()
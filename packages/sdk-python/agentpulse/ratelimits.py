@@ -0,0 +1,219 @@
+"""Provider rate-limit headers, retries and wait time on LLM spans."""
+
+from __future__ import annotations
+
+import re
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+from .models import Span
+
+# OpenAI: x-ratelimit-remaining-tokens; Anthropic: anthropic-ratelimit-tokens-remaining.
+_OPENAI_HEADER = re.compile(r"^x-ratelimit-(limit|remaining|reset)-(.+)$")
+_ANTHROPIC_HEADER = re.compile(r"^anthropic-ratelimit-(.+)-(limit|remaining|reset)$")
+_REQUEST_ID_HEADERS = ("x-request-id", "request-id")
+
+
+def parse_rate_limit_headers(headers: Any) -> dict[str, Any]:
+    """Normalize provider rate-limit headers.
+
+    Returns `{resource: {"limit", "remaining", "reset"}}` keyed by `requests`,
+    `tokens`, `input_tokens`, ... plus `retry_after_s` when the provider sent
+    `retry-after` / `retry-after-ms`. Reset values are kept as sent.
+    """
+    limits: dict[str, Any] = {}
+    if headers is None:
+        return limits
+    for name, value in headers.items():
+        name = name.lower()
+        match = _OPENAI_HEADER.match(name)
+        if match:
+            field, resource = match.groups()
+        else:
+            match = _ANTHROPIC_HEADER.match(name)
+            if not match:
+                if name == "retry-after-ms":
+                    limits["retry_after_s"] = _number(value, scale=0.001)
+                elif name == "retry-after" and "retry_after_s" not in limits:
+                    limits["retry_after_s"] = _number(value)
+                continue
+            resource, field = match.groups()
+        resource = resource.replace("-", "_")
+        limits.setdefault(resource, {})[field] = (
+            value if field == "reset" else _number(value)
+        )
+    return limits
+
+
+def _number(value: str, scale: float = 1.0) -> float | None:
+    try:
+        number = float(value) * scale
+    except (TypeError, ValueError):
+        return None
+    return int(number) if number.is_integer() else number
+
+
+class RateLimitTracker:
+    """Records rate-limit headers, retries and wait time for patched LLM calls.
+
+    Each LLM span gets `metadata["provider"]` with:
+
+    - `retries`: retries the provider SDK made before this response.
+    - `total_ms`: wall time of the call, including retries and backoff.
+    - `attempt_ms`: time of the final HTTP attempt.
+    - `waiting_ms`: `total_ms - attempt_ms`, time lost to earlier attempts,
+      backoff sleeps and connection setup.
+    - `processing_ms`: server-side generation time, when the provider reports
+      it (`openai-processing-ms`).
+    - `rate_limit`: the parsed rate-limit headers (see `parse_rate_limit_headers`).
+
+    The tracker also aggregates per-model headroom; `snapshot()` returns the
+    latest and lowest `remaining / limit` per resource, call, retry and 429
+    counts, and the average wait.
+
+    Usage:
+        ap.patch_openai(client, rate_limits=True)
+        ...
+        print(ap.rate_limits.snapshot())
+    """
+
+    def __init__(self) -> None:
+        self._models: dict[str, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def wrap(self, raw_create: Callable[..., Any], span: Span) -> Callable[..., Any]:
+        """Wrap a `with_raw_response.create` to record and return the parsed result."""
+
+        def create(*args: Any, **kwargs: Any) -> Any:
+            started = time.monotonic()
+            try:
+                raw = raw_create(*args, **kwargs)
+            except Exception as exc:
+                self.record_error(span, exc, started)
+                raise
+            self.record(span, raw, started)
+            return raw.parse()
+
+        return create
+
+    def wrap_async(
+        self, raw_create: Callable[..., Any], span: Span
+    ) -> Callable[..., Any]:
+        async def create(*args: Any, **kwargs: Any) -> Any:
+            started = time.monotonic()
+            try:
+                raw = await raw_create(*args, **kwargs)
+            except Exception as exc:
+                self.record_error(span, exc, started)
+                raise
+            self.record(span, raw, started)
+            return raw.parse()
+
+        return create
+
+    def record(self, span: Span, raw: Any, started: float) -> None:
+        """Record a raw provider response (`LegacyAPIResponse`) on `span`."""
+        total_ms = (time.monotonic() - started) * 1000
+        headers = getattr(raw, "headers", None)
+        info: dict[str, Any] = {
+            "retries": getattr(raw, "retries_taken", None),
+            "total_ms": round(total_ms, 3),
+        }
+        try:
+            # httpx only knows the elapsed time once the body has been read,
+            # which is not the case for streams.
+            attempt_ms = raw.http_response.elapsed.total_seconds() * 1000
+        except (AttributeError, RuntimeError):
+            attempt_ms = None
+        if attempt_ms is not None:
+            info["attempt_ms"] = round(attempt_ms, 3)
+            info["waiting_ms"] = round(max(total_ms - attempt_ms, 0.0), 3)
+        self._record(span, info, headers)
+
+    def record_error(self, span: Span, exc: Exception, started: float) -> None:
+        """Record a failed call; `RateLimitError` and friends carry response headers."""
+        response = getattr(exc, "response", None)
+        info: dict[str, Any] = {
+            "total_ms": round((time.monotonic() - started) * 1000, 3)
+        }
+        status = getattr(exc, "status_code", None) or getattr(
+            response, "status_code", None
+        )
+        if status is not None:
+            info["status"] = status
+        self._record(span, info, getattr(response, "headers", None))
+
+    def snapshot(self) -> dict[str, Any]:
+        """Per-model rate-limit headroom and retry statistics."""
+        with self._lock:
+            result: dict[str, Any] = {}
+            for model, stats in self._models.items():
+                calls = stats["calls"]
+                result[model] = {
+                    "calls": calls,
+                    "retries": stats["retries"],
+                    "throttled": stats["throttled"],
+                    "avg_waiting_ms": round(stats["waiting_ms"] / calls, 3)
+                    if calls
+                    else 0.0,
+                    "retry_after_s": stats["retry_after_s"],
+                    "headroom": {
+                        resource: dict(entry)
+                        for resource, entry in stats["headroom"].items()
+                    },
+                }
+            return result
+
+    def _record(self, span: Span, info: dict[str, Any], headers: Any) -> None:
+        limits = parse_rate_limit_headers(headers)
+        if headers is not None:
+            processing = headers.get("openai-processing-ms")
+            if processing is not None:
+                info["processing_ms"] = _number(processing)
+            request_id = next(
+                (
+                    headers.get(name)
+                    for name in _REQUEST_ID_HEADERS
+                    if headers.get(name)
+                ),
+                None,
+            )
+            if request_id:
+                info["request_id"] = request_id
+        if limits:
+            info["rate_limit"] = limits
+        span.set_metadata("provider", info)
+
+        model = span.model or "unknown"
+        with self._lock:
+            stats = self._models.get(model)
+            if stats is None:
+                stats = self._models[model] = {
+                    "calls": 0,
+                    "retries": 0,
+                    "throttled": 0,
+                    "waiting_ms": 0.0,
+                    "retry_after_s": None,
+                    "headroom": {},
+                }
+            stats["calls"] += 1
+            stats["retries"] += info.get("retries") or 0
+            stats["waiting_ms"] += info.get("waiting_ms", 0.0)
+            if info.get("status") == 429:
+                stats["throttled"] += 1
+            if "retry_after_s" in limits:
+                stats["retry_after_s"] = limits["retry_after_s"]
+            for resource, values in limits.items():
+                if not isinstance(values, dict):
+                    continue
+                limit, remaining = values.get("limit"), values.get("remaining")
+                entry = stats["headroom"].setdefault(resource, {})
+                entry.update(values)
+                if limit and remaining is not None:
+                    headroom = round(remaining / limit, 4)
+                    entry["headroom"] = headroom
+                    entry["min_headroom"] = min(
+                        entry.get("min_headroom", headroom), headroom
+                    )
@@ -0,0 +1,178 @@
+"""Minimal in-process collector for capacity testing.
+
+Implements `/v1/traces`, `/v1/spans`, `/v1/blobs` and `/v1/health` with the
+same request format as the real collector, but only counts what it receives.
+An artificial `delay` and `fail_rate` make it easy to reproduce backpressure
+and drop behavior without the Bun collector or a database.
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+_INGEST_PATHS = ("/v1/traces", "/v1/spans", "/v1/blobs")
+
+
+@dataclass
+class RouteStats:
+    requests: int = 0
+    items: int = 0
+    bytes: int = 0
+    failures: int = 0
+    latencies: list[float] = field(default_factory=list)
+
+
+class StubCollector:
+    """Threaded HTTP server that records ingest throughput and latency.
+
+    Usage:
+        with StubCollector(port=0) as stub:
+            ap = AgentPulse(endpoint=stub.endpoint)
+            ...
+        print(stub.summary())
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 3000,
+        delay: float = 0.0,
+        fail_rate: float = 0.0,
+    ) -> None:
+        self.delay = delay
+        self.fail_rate = fail_rate
+        self.routes: dict[str, RouteStats] = {
+            path: RouteStats() for path in _INGEST_PATHS
+        }
+        self.started_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._server.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def endpoint(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> StubCollector:
+        self.started_at = time.monotonic()
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="agentpulse-stub", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        self.started_at = time.monotonic()
+        self._server.serve_forever()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> StubCollector:
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    def record(
+        self, path: str, items: int, size: int, latency: float, failed: bool
+    ) -> None:
+        with self._lock:
+            stats = self.routes[path]
+            stats.requests += 1
+            stats.bytes += size
+            stats.latencies.append(latency)
+            if failed:
+                stats.failures += 1
+            else:
+                stats.items += items
+
+    @property
+    def rejected(self) -> int:
+        """Requests answered with an injected failure."""
+        with self._lock:
+            return sum(stats.failures for stats in self.routes.values())
+
+    def summary(self) -> dict[str, Any]:
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        with self._lock:
+            result: dict[str, Any] = {"elapsed_s": round(elapsed, 3)}
+            for path, stats in self.routes.items():
+                latencies = sorted(stats.latencies)
+                result[path] = {
+                    "requests": stats.requests,
+                    "items": stats.items,
+                    "items_per_s": round(stats.items / elapsed, 1),
+                    "bytes": stats.bytes,
+                    "failures": stats.failures,
+                    "latency_p50_ms": round(_percentile(latencies, 0.50) * 1000, 2),
+                    "latency_p99_ms": round(_percentile(latencies, 0.99) * 1000, 2),
+                }
+        return result
+
+
+def _percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    return values[min(int(q * len(values)), len(values) - 1)]
+
+
+def _make_handler(stub: StubCollector) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self) -> None:
+            if self.path.rstrip("/") == "/v1/health":
+                self._reply(
+                    200, {"status": "ok", "service": "agentpulse-stub-collector"}
+                )
+            else:
+                self._reply(404, {"error": "Not found"})
+
+        def do_POST(self) -> None:
+            start = time.perf_counter()
+            path = self.path.rstrip("/")
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if path not in _INGEST_PATHS:
+                self._reply(404, {"error": "Not found"})
+                return
+            if stub.delay:
+                time.sleep(stub.delay)
+            if stub.fail_rate and random.random() < stub.fail_rate:
+                stub.record(
+                    path, 0, len(body), time.perf_counter() - start, failed=True
+                )
+                self._reply(503, {"error": "Injected failure"})
+                return
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                self._reply(400, {"error": "Invalid JSON"})
+                return
+            items = len(payload) if isinstance(payload, list) else 1
+            stub.record(
+                path, items, len(body), time.perf_counter() - start, failed=False
+            )
+            self._reply(201, {"ingested": items})
+
+        def _reply(self, status: int, payload: dict[str, Any]) -> None:
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    return Handler
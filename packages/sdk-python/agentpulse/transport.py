@@ -5,96 +5,407 @@ from __future__ import annotations
 import json
 import logging
 import threading
-from collections import deque
-from typing import Any, Optional
-from urllib.request import Request, urlopen
+import time
+from collections import OrderedDict, deque
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
 from urllib.error import URLError
+from urllib.request import Request, urlopen
+
+from .dedup import BLOB_KEY
+from .models import SpanKind, Trace, TraceStatus
 
 logger = logging.getLogger("agentpulse")
 
+# Shared encoder: compact separators and UTF-8 passed through instead of
+# \u-escaped. Circular references are still checked: inputs and metadata are
+# user data and may reference themselves.
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=str)
+_ascii_encoder = json.JSONEncoder(separators=(",", ":"), default=str)
+
+
+def encode(item: dict[str, Any]) -> bytes:
+    """Encode one record to the bytes that go into a batch payload."""
+    text = _encoder.encode(item)
+    try:
+        return text.encode("utf-8")
+    except UnicodeEncodeError:
+        # Lone surrogates (e.g. from badly decoded input) aren't valid UTF-8;
+        # \u-escape them as the ASCII encoder does.
+        return _ascii_encoder.encode(item).encode("ascii")
+
+
+def join_batch(fragments: list[bytes]) -> bytes:
+    """Assemble pre-encoded records into a JSON array without re-encoding them."""
+    return b"[" + b",".join(fragments) + b"]"
+
+
+_BLOB_MARKER = f'"{BLOB_KEY}"'.encode()
+_MAX_UNDELIVERED = 256
+
+PRIORITY = "priority"
+DEFAULT = "default"
+BULK = "bulk"
+
+
+@dataclass
+class Lane:
+    """Flush interval (seconds), batch size and capacity (queued records) of a lane."""
+
+    flush_interval: float
+    batch_size: int
+    capacity: int
+
+
+@dataclass
+class Lanes:
+    """Transport lanes and the thresholds that route traces into them.
+
+    A trace goes to `priority` when it failed or any span has an error, cost
+    at least `cost_usd` or ran at least `latency` seconds. It goes to `bulk`
+    when it has no LLM spans and none of the above, and to `default` otherwise.
+    A trace always travels whole, with all of its spans, in one lane.
+    """
+
+    priority: Lane = field(
+        default_factory=lambda: Lane(flush_interval=0.2, batch_size=50, capacity=20_000)
+    )
+    default: Lane = field(
+        default_factory=lambda: Lane(flush_interval=2.0, batch_size=50, capacity=50_000)
+    )
+    bulk: Lane = field(
+        default_factory=lambda: Lane(
+            flush_interval=10.0, batch_size=500, capacity=10_000
+        )
+    )
+    cost_usd: float = 0.01
+    latency: float = 10.0
+
+    @classmethod
+    def for_interval(cls, flush_interval: float, batch_size: int) -> Lanes:
+        """Default lanes around the client's `flush_interval` and `batch_size`."""
+        return cls(
+            priority=Lane(
+                flush_interval=min(0.2, flush_interval),
+                batch_size=batch_size,
+                capacity=20_000,
+            ),
+            default=Lane(
+                flush_interval=flush_interval, batch_size=batch_size, capacity=50_000
+            ),
+            bulk=Lane(
+                flush_interval=flush_interval * 5,
+                batch_size=batch_size * 10,
+                capacity=10_000,
+            ),
+        )
+
+    def route(self, trace: Trace) -> str:
+        """Name of the lane `trace` and its spans are sent in."""
+        if trace.status == TraceStatus.ERROR or trace.total_cost_usd >= self.cost_usd:
+            return PRIORITY
+        if (
+            trace.ended_at is not None
+            and trace.ended_at - trace.started_at >= self.latency
+        ):
+            return PRIORITY
+        has_llm = False
+        for span in trace.spans:
+            if span.error or (span.cost_usd or 0.0) >= self.cost_usd:
+                return PRIORITY
+            if (
+                span.ended_at is not None
+                and span.ended_at - span.started_at >= self.latency
+            ):
+                return PRIORITY
+            has_llm = has_llm or span.kind == SpanKind.LLM
+        return DEFAULT if has_llm else BULK
+
+
+class _Batch:
+    """A queued trace and the spans queued after it."""
+
+    __slots__ = ("trace", "spans")
+
+    def __init__(self, trace: bytes | None) -> None:
+        self.trace = trace
+        self.spans: list[bytes] = []
+
+    def __len__(self) -> int:
+        return (self.trace is not None) + len(self.spans)
+
+
+class _LaneQueue:
+    __slots__ = (
+        "name",
+        "config",
+        "batches",
+        "records",
+        "due",
+        "dropped",
+        "evicted",
+        "evicted_before",
+    )
+
+    def __init__(self, name: str, config: Lane) -> None:
+        self.name = name
+        self.config = config
+        # Trace id -> batch, oldest first. Spans whose trace was already sent
+        # get a batch without a trace.
+        self.batches: OrderedDict[str, _Batch] = OrderedDict()
+        self.records = 0
+        self.due = time.monotonic() + config.flush_interval
+        self.dropped = 0
+        # Ids of traces evicted since the last two flushes; spans of these
+        # traces that arrive afterwards are dropped rather than sent orphaned.
+        self.evicted: set[str] = set()
+        self.evicted_before: set[str] = set()
+
+    def __len__(self) -> int:
+        return self.records
+
 
 class Transport:
     """Batched HTTP transport with background flushing.
 
     Accumulates events and flushes them in batches to minimize overhead.
     Uses only stdlib (urllib) to maintain zero-dependency constraint.
+
+    Records are encoded to JSON once, by the thread that submits them and
+    before taking the queue lock; batches are byte concatenations of those
+    fragments. Queues are swapped out under the lock and posted by a
+    background sender, so producers never wait on encoding or the network.
+
+    Records are queued in lanes (see `Lanes`), each with its own flush
+    interval, batch size and capacity, and lanes are sent in priority order.
+    Under backpressure low-value data goes first: a trace that doesn't fit in
+    its lane takes room from the lanes below it, evicting their oldest queued
+    traces (bulk, then default) with all of their spans, and is only dropped
+    itself when that is not enough. Shed records are counted per lane in `dropped`.
     """
 
     def __init__(
         self,
         endpoint: str,
-        api_key: Optional[str] = None,
+        api_key: str | None = None,
         flush_interval: float = 2.0,
         batch_size: int = 50,
+        lanes: Lanes | None = None,
     ) -> None:
         self._endpoint = endpoint.rstrip("/")
         self._api_key = api_key
-        self._flush_interval = flush_interval
-        self._batch_size = batch_size
-        self._trace_queue: deque[dict[str, Any]] = deque()
-        self._span_queue: deque[dict[str, Any]] = deque()
+        self.lanes = lanes or Lanes.for_interval(flush_interval, batch_size)
+        self._lanes = {
+            PRIORITY: _LaneQueue(PRIORITY, self.lanes.priority),
+            DEFAULT: _LaneQueue(DEFAULT, self.lanes.default),
+            BULK: _LaneQueue(BULK, self.lanes.bulk),
+        }
+        self._blob_queue: deque[bytes] = deque()
+        self._blob_contents: list[tuple[str, Any]] = []
+        # Content of blobs whose upload failed, by digest; spans that reference
+        # them are sent with the content inlined until a later upload succeeds.
+        self._undelivered: OrderedDict[str, Any] = OrderedDict()
+        # Called with the digests of blobs that could not be delivered.
+        self.on_blob_failure: Callable[[list[str]], None] | None = None
         self._lock = threading.Lock()
-        self._timer: Optional[threading.Timer] = None
+        # Serializes posting so blobs always reach the collector before the
+        # spans that reference them; never held while queueing.
+        self._send_lock = threading.Lock()
+        self._wakeup = threading.Event()
         self._closed = False
-        self._start_flush_timer()
+        self._thread = threading.Thread(
+            target=self._run, name="agentpulse-transport", daemon=True
+        )
+        self._thread.start()
 
-    def _start_flush_timer(self) -> None:
-        if self._closed:
-            return
-        self._timer = threading.Timer(self._flush_interval, self._flush_loop)
-        self._timer.daemon = True
-        self._timer.start()
+    @property
+    def dropped(self) -> dict[str, int]:
+        """Records shed per lane: rejected, or evicted to make room in a higher lane."""
+        return {name: lane.dropped for name, lane in self._lanes.items()}
 
-    def _flush_loop(self) -> None:
-        self.flush()
-        self._start_flush_timer()
+    def admit(self, lane: str, count: int) -> bool:
+        """Make room for a trace of `count` records in `lane`.
 
-    def send_trace(self, trace_data: dict[str, Any]) -> None:
-        with self._lock:
-            self._trace_queue.append(trace_data)
-            if len(self._trace_queue) >= self._batch_size:
-                self._flush_traces()
+        Returns False, counting the trace as dropped, if there is none.
 
-    def send_span(self, span_data: dict[str, Any]) -> None:
+        A full lane borrows capacity from the lanes below it, evicting their
+        oldest traces, lowest lane first, if that is what it takes. A trace
+        larger than the lane's capacity is still accepted while the lane is empty.
+        """
         with self._lock:
-            self._span_queue.append(span_data)
-            if len(self._span_queue) >= self._batch_size:
-                self._flush_spans()
+            queue = self._lanes[lane]
+            if queue.records + count <= queue.config.capacity or not queue.records:
+                return True
+            names = list(self._lanes)
+            lower = [
+                self._lanes[name] for name in reversed(names[names.index(lane) + 1 :])
+            ]
+            excess = (
+                queue.records
+                + count
+                - queue.config.capacity
+                - sum(other.config.capacity - other.records for other in lower)
+            )
+            if excess > sum(other.records for other in lower):
+                queue.dropped += count
+                return False
+            for other in lower:
+                while excess > 0 and other.batches:
+                    trace_id, batch = other.batches.popitem(last=False)
+                    if batch.trace is not None:
+                        other.evicted.add(trace_id)
+                    other.records -= len(batch)
+                    other.dropped += len(batch)
+                    excess -= len(batch)
+            return True
 
-    def flush(self) -> None:
+    def send_trace(self, trace_data: dict[str, Any], lane: str = DEFAULT) -> None:
+        data = self._encode(trace_data)
+        if data is None:
+            return
         with self._lock:
-            self._flush_traces()
-            self._flush_spans()
+            queue = self._lanes[lane]
+            queue.batches[trace_data["id"]] = _Batch(data)
+            queue.records += 1
+            full = queue.records >= queue.config.batch_size
+        if full:
+            self._wakeup.set()
 
-    def _flush_traces(self) -> None:
-        if not self._trace_queue:
+    def send_span(self, span_data: dict[str, Any], lane: str = DEFAULT) -> None:
+        """Queue a span in the lane its trace was sent in."""
+        data = self._encode(span_data)
+        if data is None:
             return
-        batch = list(self._trace_queue)
-        self._trace_queue.clear()
-        self._post(f"{self._endpoint}/v1/traces", batch)
+        trace_id = span_data["trace_id"]
+        with self._lock:
+            queue = self._lanes[lane]
+            if trace_id in queue.evicted or trace_id in queue.evicted_before:
+                queue.dropped += 1
+                return
+            batch = queue.batches.get(trace_id)
+            if batch is None:
+                batch = queue.batches[trace_id] = _Batch(None)
+            batch.spans.append(data)
+            queue.records += 1
+            full = queue.records >= queue.config.batch_size
+        if full:
+            self._wakeup.set()
 
-    def _flush_spans(self) -> None:
-        if not self._span_queue:
-            return
-        batch = list(self._span_queue)
-        self._span_queue.clear()
-        self._post(f"{self._endpoint}/v1/spans", batch)
+    def send_blobs(self, blobs: list[dict[str, Any]]) -> None:
+        """Queue deduplicated content; delivered before the spans that reference it."""
+        encoded = [encode(blob) for blob in blobs]
+        with self._lock:
+            self._blob_queue.extend(encoded)
+            self._blob_contents.extend(
+                (blob["digest"], blob["content"]) for blob in blobs
+            )
+
+    def flush(self) -> None:
+        self._flush(list(self._lanes))
+
+    def _run(self) -> None:
+        while not self._closed:
+            now = time.monotonic()
+            with self._lock:
+                due = [
+                    name
+                    for name, queue in self._lanes.items()
+                    if queue.due <= now or len(queue) >= queue.config.batch_size
+                ]
+                wait = min(queue.due for queue in self._lanes.values()) - now
+            if due:
+                self._flush(due)
+                continue
+            self._wakeup.wait(max(wait, 0.0))
+            self._wakeup.clear()
+
+    def _flush(self, lanes: list[str]) -> None:
+        with self._send_lock:
+            now = time.monotonic()
+            batches = []
+            with self._lock:
+                blobs = list(self._blob_queue)
+                self._blob_queue.clear()
+                contents, self._blob_contents = self._blob_contents, []
+                for name in lanes:
+                    queue = self._lanes[name]
+                    queue.due = now + queue.config.flush_interval
+                    queue.evicted_before, queue.evicted = queue.evicted, set()
+                    if queue.batches:
+                        queued = list(queue.batches.values())
+                        traces = [
+                            batch.trace for batch in queued if batch.trace is not None
+                        ]
+                        batches.append(
+                            (traces, [span for batch in queued for span in batch.spans])
+                        )
+                        queue.batches.clear()
+                        queue.records = 0
+
+            if blobs:
+                if self._post(f"{self._endpoint}/v1/blobs", blobs):
+                    for digest, _ in contents:
+                        self._undelivered.pop(digest, None)
+                else:
+                    for digest, content in contents:
+                        self._undelivered[digest] = content
+                    while len(self._undelivered) > _MAX_UNDELIVERED:
+                        self._undelivered.popitem(last=False)
+                    if self.on_blob_failure:
+                        self.on_blob_failure([digest for digest, _ in contents])
+            for traces, spans in batches:
+                if traces:
+                    self._post(f"{self._endpoint}/v1/traces", traces)
+                if spans:
+                    if self._undelivered:
+                        spans = [self._inline(fragment) for fragment in spans]
+                    self._post(f"{self._endpoint}/v1/spans", spans)
+
+    def _inline(self, fragment: bytes) -> bytes:
+        """Replace references to undelivered blobs in an encoded span with content."""
+        if _BLOB_MARKER not in fragment:
+            return fragment
+        undelivered = self._undelivered
+
+        def expand(value: Any) -> Any:
+            if isinstance(value, list):
+                return [expand(item) for item in value]
+            if isinstance(value, dict):
+                if len(value) == 1 and value.get(BLOB_KEY) in undelivered:
+                    return undelivered[value[BLOB_KEY]]
+                return {key: expand(item) for key, item in value.items()}
+            return value
+
+        span = json.loads(fragment)
+        span["input"] = expand(span.get("input"))
+        return encode(span)
+
+    @staticmethod
+    def _encode(item: dict[str, Any]) -> bytes | None:
+        try:
+            return encode(item)
+        except (TypeError, ValueError, RecursionError) as exc:
+            logger.warning(
+                "AgentPulse: dropping record that could not be encoded: %s", exc
+            )
+            return None
 
-    def _post(self, url: str, payload: list[dict[str, Any]]) -> None:
+    def _post(self, url: str, fragments: list[bytes]) -> bool:
         headers = {"Content-Type": "application/json"}
         if self._api_key:
             headers["X-AgentPulse-Key"] = self._api_key
 
-        data = json.dumps(payload).encode("utf-8")
-        req = Request(url, data=data, headers=headers, method="POST")
+        req = Request(url, data=join_batch(fragments), headers=headers, method="POST")
         try:
             with urlopen(req, timeout=10) as resp:
                 resp.read()
         except (URLError, OSError) as exc:
             logger.warning("AgentPulse: failed to send telemetry to %s: %s", url, exc)
+            return False
+        return True
 
     def close(self) -> None:
         self._closed = True
-        if self._timer:
-            self._timer.cancel()
+        self._wakeup.set()
         self.flush()
@@ -0,0 +1,280 @@
+"""Bulk upload of exported NDJSON files to a collector."""
+
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+import os
+import time
+import zlib
+from collections.abc import Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from .exporters.file import FILE_PREFIX, FILE_SUFFIX, PARTIAL_SUFFIX
+
+logger = logging.getLogger("agentpulse")
+
+PROGRESS_SUFFIX = ".progress"
+UPLOADED_SUFFIX = ".uploaded"
+
+# Traces are uploaded before spans so span rows never reference missing traces.
+_PHASES = (("trace", "/v1/traces"), ("span", "/v1/spans"))
+
+
+@dataclass
+class UploadStats:
+    files: int = 0
+    traces: int = 0
+    spans: int = 0
+    failed_batches: int = 0
+
+
+def find_files(directory: str) -> list[str]:
+    """Return completed export files in `directory`, oldest first."""
+    names = sorted(
+        n
+        for n in os.listdir(directory)
+        if n.startswith(FILE_PREFIX) and n.endswith(FILE_SUFFIX)
+    )
+    return [os.path.join(directory, n) for n in names]
+
+
+def recover_partial(directory: str, stale_after: float = 900.0) -> list[str]:
+    """Complete `.part` files not written to for `stale_after` seconds.
+
+    A `.part` file is only left behind when the writing process died before
+    rotating it. Every complete record it holds is rewritten to a regular
+    export file; the truncated tail, if any, is discarded. Returns the paths of
+    the recovered files.
+    """
+    recovered = []
+    now = time.time()
+    for name in sorted(os.listdir(directory)):
+        if not (
+            name.startswith(FILE_PREFIX) and name.endswith(FILE_SUFFIX + PARTIAL_SUFFIX)
+        ):
+            continue
+        part = os.path.join(directory, name)
+        try:
+            if now - os.path.getmtime(part) < stale_after:
+                continue
+        except OSError:
+            continue
+        path = part[: -len(PARTIAL_SUFFIX)]
+        tmp = path + ".tmp"
+        lines = 0
+        with gzip.open(tmp, "wb") as out:
+            for line in _complete_lines(part):
+                out.write(line)
+                lines += 1
+        os.replace(tmp, path)
+        os.remove(part)
+        logger.info("AgentPulse: recovered %d record(s) from %s", lines, part)
+        recovered.append(path)
+    return recovered
+
+
+def _complete_lines(path: str) -> Iterator[bytes]:
+    """Yield the intact lines of a possibly truncated gzip file."""
+    with gzip.open(path, "rb") as fh:
+        while True:
+            try:
+                line = fh.readline()
+            except (EOFError, OSError, zlib.error):
+                return
+            if not line.endswith(b"\n"):
+                return
+            try:
+                json.loads(line)
+            except ValueError:
+                return
+            yield line
+
+
+def upload(
+    directory: str,
+    endpoint: str = "http://localhost:3000",
+    api_key: str | None = None,
+    batch_size: int = 1000,
+    concurrency: int = 4,
+    retries: int = 3,
+    delete: bool = False,
+    stale_after: float | None = 900.0,
+) -> UploadStats:
+    """Stream every completed file in `directory` to the collector.
+
+    Files are read line by line and posted in batches of `batch_size` with up to
+    `concurrency` requests in flight. Progress is checkpointed next to each file
+    (`*.progress`), so an interrupted upload resumes where it stopped. Finished
+    files are renamed to `*.uploaded`, or removed when `delete` is set.
+    `.part` files older than `stale_after` seconds are recovered first (see
+    `recover_partial`); pass None to leave them alone.
+
+    Failed requests are retried with backoff on network errors and 5xx
+    responses; a 4xx response fails the batch at once.
+    """
+    stats = UploadStats()
+    if stale_after is not None:
+        recover_partial(directory, stale_after)
+    with ThreadPoolExecutor(
+        max_workers=concurrency, thread_name_prefix="agentpulse-upload"
+    ) as pool:
+        for path in find_files(directory):
+            if _upload_file(
+                pool,
+                path,
+                endpoint.rstrip("/"),
+                api_key,
+                batch_size,
+                concurrency,
+                retries,
+                stats,
+            ):
+                stats.files += 1
+                _finish(path, delete)
+    return stats
+
+
+def _upload_file(
+    pool: ThreadPoolExecutor,
+    path: str,
+    endpoint: str,
+    api_key: str | None,
+    batch_size: int,
+    concurrency: int,
+    retries: int,
+    stats: UploadStats,
+) -> bool:
+    progress = _load_progress(path)
+
+    for kind, route in _PHASES:
+        done = progress.get(kind, 0)
+        # Batches complete out of order; only the contiguous prefix is checkpointed.
+        pending: dict[Future[None], tuple[int, int]] = {}
+        completed: dict[int, int] = {}
+        failed = False
+
+        for start, batch in _batches(path, kind, done, batch_size):
+            if len(pending) >= concurrency * 2:
+                done, failed = _collect(pending, completed, done, stats, kind)
+                _save_progress(path, progress, kind, done)
+                if failed:
+                    break
+            future = pool.submit(_post, f"{endpoint}{route}", batch, api_key, retries)
+            pending[future] = (start, start + len(batch))
+
+        while pending:
+            done, batch_failed = _collect(pending, completed, done, stats, kind)
+            failed = failed or batch_failed
+        _save_progress(path, progress, kind, done)
+
+        if failed:
+            logger.warning(
+                "AgentPulse: upload of %s stopped; it will resume from the checkpoint",
+                path,
+            )
+            return False
+    return True
+
+
+def _collect(
+    pending: dict[Future[None], tuple[int, int]],
+    completed: dict[int, int],
+    done: int,
+    stats: UploadStats,
+    kind: str,
+) -> tuple[int, bool]:
+    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+    failed = False
+    for future in finished:
+        start, end = pending.pop(future)
+        if future.exception() is not None:
+            stats.failed_batches += 1
+            failed = True
+            continue
+        completed[start] = end
+        if kind == "trace":
+            stats.traces += end - start
+        else:
+            stats.spans += end - start
+    while done in completed:
+        done = completed.pop(done)
+    return done, failed
+
+
+def _batches(
+    path: str, kind: str, skip: int, batch_size: int
+) -> Iterator[tuple[int, list[Any]]]:
+    """Yield `(index, records)` batches of one record type, skipping `skip` records."""
+    index = 0
+    batch: list[Any] = []
+    batch_start = skip
+    with gzip.open(path, "rt", encoding="utf-8") as fh:
+        for line in fh:
+            record = json.loads(line)
+            if record.get("type") != kind:
+                continue
+            index += 1
+            if index <= skip:
+                continue
+            batch.append(record["data"])
+            if len(batch) >= batch_size:
+                yield batch_start, batch
+                batch_start += len(batch)
+                batch = []
+    if batch:
+        yield batch_start, batch
+
+
+def _post(url: str, payload: list[Any], api_key: str | None, retries: int) -> None:
+    headers = {"Content-Type": "application/json"}
+    if api_key:
+        headers["X-AgentPulse-Key"] = api_key
+    data = json.dumps(payload).encode("utf-8")
+
+    for attempt in range(retries + 1):
+        req = Request(url, data=data, headers=headers, method="POST")
+        try:
+            with urlopen(req, timeout=30) as resp:
+                resp.read()
+            return
+        except HTTPError as exc:
+            if exc.code < 500 or attempt == retries:
+                raise
+            time.sleep(min(2**attempt * 0.5, 10.0))
+        except (URLError, OSError):
+            if attempt == retries:
+                raise
+            time.sleep(min(2**attempt * 0.5, 10.0))
+
+
+def _load_progress(path: str) -> dict[str, int]:
+    try:
+        with open(path + PROGRESS_SUFFIX) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_progress(path: str, progress: dict[str, int], kind: str, done: int) -> None:
+    progress[kind] = done
+    tmp = path + PROGRESS_SUFFIX + ".tmp"
+    with open(tmp, "w") as fh:
+        json.dump(progress, fh)
+    os.replace(tmp, path + PROGRESS_SUFFIX)
+
+
+def _finish(path: str, delete: bool) -> None:
+    if delete:
+        os.remove(path)
+    else:
+        os.replace(path, path + UPLOADED_SUFFIX)
+    try:
+        os.remove(path + PROGRESS_SUFFIX)
+    except OSError:
+        pass
@@ -0,0 +1,41 @@
+import pytest
+
+from agentpulse import AgentPulse, client
+from agentpulse.exporters.base import Exporter
+
+
+class MemoryExporter(Exporter):
+    def __init__(self):
+        self.traces = []
+        self.spans = []
+
+    def export(self, traces, spans):
+        self.traces.extend(traces)
+        self.spans.extend(spans)
+
+
+@pytest.fixture(autouse=True)
+def _reset_global_client():
+    yield
+    client._global_client = None
+
+
+@pytest.fixture
+def exporter():
+    return MemoryExporter()
+
+
+@pytest.fixture
+def make_client(exporter):
+    clients = []
+
+    def make(**kwargs):
+        kwargs.setdefault("exporters", [exporter])
+        kwargs.setdefault("flush_interval", 60)
+        ap = AgentPulse(**kwargs)
+        clients.append(ap)
+        return ap
+
+    yield make
+    for ap in clients:
+        ap.shutdown()
@@ -0,0 +1,162 @@
+import asyncio
+import threading
+
+import pytest
+
+from agentpulse import Span, SpanKind, ToolCache
+
+
+class Unkeyable:
+    pass
+
+
+def test_sync_calls_are_coalesced():
+    cache = ToolCache()
+    release = threading.Event()
+    calls = []
+
+    def slow(x):
+        calls.append(x)
+        release.wait(1)
+        return x * 2
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.call("t", slow, (2,), {})))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert results == [4, 4, 4, 4]
+    assert calls == [2]
+
+
+def test_records_hit_and_miss():
+    cache = ToolCache()
+    first, second = (
+        Span(name="t", kind=SpanKind.TOOL, trace_id=""),
+        Span(name="t", kind=SpanKind.TOOL, trace_id=""),
+    )
+    cache.call("t", lambda x: x, (1,), {}, first)
+    cache.call("t", lambda x: x, (1,), {}, second)
+    assert first.metadata["cache"]["status"] == "miss"
+    assert second.metadata["cache"]["status"] == "hit"
+
+
+def test_unkeyable_arguments_are_not_cached():
+    cache = ToolCache()
+    calls = []
+
+    def tool(arg):
+        calls.append(arg)
+        return len(calls)
+
+    assert cache.call("t", tool, (Unkeyable(),), {}) == 1
+    assert cache.call("t", tool, (Unkeyable(),), {}) == 2
+
+
+async def test_async_calls_are_coalesced():
+    cache = ToolCache()
+    calls = []
+
+    async def slow(x):
+        calls.append(x)
+        await asyncio.sleep(0.01)
+        return x * 2
+
+    spans = [Span(name="t", kind=SpanKind.TOOL, trace_id="") for _ in range(3)]
+    results = await asyncio.gather(
+        *(cache.acall("t", slow, (2,), {}, span) for span in spans)
+    )
+    assert results == [4, 4, 4]
+    assert calls == [2]
+    assert [span.metadata["cache"]["status"] for span in spans] == [
+        "miss",
+        "coalesced",
+        "coalesced",
+    ]
+
+
+async def test_async_followers_retry_after_leader_fails():
+    cache = ToolCache()
+    calls = []
+
+    async def flaky(x):
+        calls.append(x)
+        await asyncio.sleep(0.01)
+        if len(calls) == 1:
+            raise RuntimeError("first fails")
+        return x
+
+    results = await asyncio.gather(
+        *(cache.acall("t", flaky, (1,), {}) for _ in range(3)),
+        return_exceptions=True,
+    )
+    assert isinstance(results[0], RuntimeError)
+    assert results[1:] == [1, 1]
+    assert len(calls) == 2
+
+
+def test_sync_followers_retry_after_leader_fails():
+    cache = ToolCache()
+    started = threading.Event()
+    calls = []
+
+    def flaky(x):
+        calls.append(x)
+        if len(calls) == 1:
+            started.set()
+            threading.Event().wait(0.05)
+            raise RuntimeError("first fails")
+        return x
+
+    errors, results = [], []
+
+    def leader():
+        try:
+            cache.call("t", flaky, (1,), {})
+        except RuntimeError as exc:
+            errors.append(exc)
+
+    thread = threading.Thread(target=leader)
+    thread.start()
+    started.wait(1)
+    results.append(cache.call("t", flaky, (1,), {}))
+    thread.join()
+    assert len(errors) == 1
+    assert results == [1]
+
+
+@pytest.fixture
+def broken_disk_cache(tmp_path):
+    cache = ToolCache(path=str(tmp_path / "cache.db"))
+    cache._disk.close()
+    return cache
+
+
+def test_disk_failure_falls_back_to_memory(broken_disk_cache):
+    assert broken_disk_cache.call("t", lambda x: x, (1,), {}) == 1
+    assert broken_disk_cache.call("t", lambda x: x + 1, (1,), {}) == 1
+
+
+async def test_disk_failure_does_not_strand_followers(broken_disk_cache):
+    async def slow(x):
+        await asyncio.sleep(0.01)
+        return x
+
+    results = await asyncio.wait_for(
+        asyncio.gather(
+            *(broken_disk_cache.acall("t", slow, (1,), {}) for _ in range(3))
+        ),
+        timeout=1,
+    )
+    assert results == [1, 1, 1]
+
+
+def test_results_persist_across_instances(tmp_path):
+    path = str(tmp_path / "cache.db")
+    ToolCache(path=path).call("t", lambda x: x, (1,), {})
+    assert ToolCache(path=path).call("t", lambda x: x + 1, (1,), {}) == 1
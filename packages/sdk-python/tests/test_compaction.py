@@ -0,0 +1,50 @@
+import gc
+
+from agentpulse import CompactionProcessor, SpanKind, SpanProcessor, trace
+
+
+class DropTraces(SpanProcessor):
+    def on_trace_end(self, trace):
+        return False
+
+
+def run_polling_trace(ap, polls=10):
+    @trace
+    def agent():
+        for _ in range(polls):
+            with ap.span("poll", SpanKind.TOOL):
+                pass
+
+    agent()
+
+
+def test_folds_repeated_siblings(make_client, exporter):
+    compaction = CompactionProcessor(threshold=3)
+    ap = make_client(processors=[compaction])
+    run_polling_trace(ap)
+    ap.flush()
+
+    names = [span["name"] for span in exporter.spans]
+    assert names == ["poll"] * 4
+    summary = exporter.spans[-1]["metadata"]["compacted"]
+    assert summary["count"] == 7
+    assert sum(summary["duration_histogram_ms"].values()) == 7
+    assert compaction.folded == 7
+    assert compaction._traces == {}
+
+
+def test_state_released_when_trace_is_dropped_upstream(make_client):
+    compaction = CompactionProcessor(threshold=3)
+    ap = make_client(processors=[DropTraces(), compaction])
+    run_polling_trace(ap)
+    gc.collect()
+    assert compaction._traces == {}
+
+
+def test_state_released_when_client_is_disabled(make_client):
+    compaction = CompactionProcessor(threshold=3)
+    ap = make_client(enabled=False, processors=[compaction])
+    for _ in range(5):
+        run_polling_trace(ap)
+    gc.collect()
+    assert compaction._traces == {}
@@ -0,0 +1,72 @@
+import json
+
+from agentpulse import BatchProcessor, Span, SpanKind, Trace
+from agentpulse.exporters.base import Exporter
+from agentpulse.transport import Transport, encode, join_batch
+
+
+class Recorder(Exporter):
+    def __init__(self):
+        self.batches = []
+
+    def export(self, traces, spans):
+        self.batches.append((traces, spans))
+
+
+class Broken(Exporter):
+    def export(self, traces, spans):
+        raise RuntimeError("disk full")
+
+
+def test_encode_is_compact_utf8():
+    assert (
+        encode({"text": "héllo", "n": [1, 2]}) == '{"text":"héllo","n":[1,2]}'.encode()
+    )
+
+
+def test_encode_escapes_lone_surrogates():
+    data = encode({"text": "bad \udc80"})
+    assert json.loads(data) == {"text": "bad \udc80"}
+
+
+def test_join_batch_builds_a_json_array():
+    records = [{"id": 1}, {"id": "two"}]
+    assert json.loads(join_batch([encode(r) for r in records])) == records
+
+
+def test_unencodable_record_is_dropped_on_the_callers_thread(caplog):
+    data = {"id": "s1", "trace_id": "t1"}
+    data["input"] = data
+    transport = Transport("http://collector.invalid", flush_interval=3600)
+    try:
+        transport.send_span(data)
+    finally:
+        transport.close()
+    assert len(transport._lanes["default"]) == 0
+    assert "could not be encoded" in caplog.text
+
+
+def test_batch_processor_serializes_once_for_all_exporters(monkeypatch):
+    calls = []
+    to_dict = Span.to_dict
+
+    def counting_to_dict(self):
+        calls.append(self.id)
+        return to_dict(self)
+
+    monkeypatch.setattr(Span, "to_dict", counting_to_dict)
+    first, second = Recorder(), Recorder()
+    processor = BatchProcessor([first, Broken(), second], flush_interval=3600)
+    trace = Trace()
+    span = Span(name="s", kind=SpanKind.TOOL, trace_id=trace.id)
+    processor.on_trace_end(trace)
+    processor.on_end(span)
+    processor.force_flush()
+    processor.shutdown()
+
+    assert calls == [span.id]
+    assert first.batches == second.batches
+    traces, spans = first.batches[0]
+    assert second.batches[0][1] is spans
+    assert [t["id"] for t in traces] == [trace.id]
+    assert [s["id"] for s in spans] == [span.id]
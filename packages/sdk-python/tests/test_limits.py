@@ -0,0 +1,170 @@
+import asyncio
+import gc
+import threading
+from types import SimpleNamespace as NS
+
+import pytest
+
+from agentpulse import Limiter, tool
+from agentpulse.patches.anthropic import _Usage
+
+
+def usage(chunk):
+    u = getattr(chunk, "usage", None)
+    return None if u is None else u.total_tokens
+
+
+class Stream:
+    def __init__(self):
+        self.closed = False
+
+    def __iter__(self):
+        yield NS(usage=None)
+        yield NS(usage=NS(total_tokens=30))
+
+    def close(self):
+        self.closed = True
+
+
+class AsyncStream:
+    async def __aiter__(self):
+        yield NS(usage=None)
+        yield NS(usage=NS(total_tokens=30))
+
+    async def close(self):
+        pass
+
+
+def active(limiter, key):
+    return limiter.snapshot()[key]["active"]
+
+
+def test_concurrency_slot_blocks_until_released():
+    limiter = Limiter(concurrency=1)
+    limiter.acquire("k")
+    acquired = threading.Event()
+
+    def second():
+        limiter.acquire("k")
+        acquired.set()
+
+    thread = threading.Thread(target=second)
+    thread.start()
+    assert not acquired.wait(0.05)
+    limiter.release("k")
+    assert acquired.wait(1)
+    thread.join()
+    assert limiter.snapshot()["k"]["queued"] == 1
+
+
+def test_reservation_settles_to_usage():
+    limiter = Limiter(tokens_per_minute=6000)
+    call = limiter.wrap(
+        lambda: NS(usage=NS(total_tokens=30)), "m", tokens=1000, usage=usage
+    )
+    call()
+    assert limiter._budgets["m"].tokens == pytest.approx(5970, abs=5)
+    assert active(limiter, "m") == 0
+
+
+def test_stream_holds_slot_until_exhausted():
+    limiter = Limiter(concurrency=1, tokens_per_minute=6000)
+    create = limiter.wrap(
+        lambda **kwargs: Stream(), "m", tokens=1000, usage=usage, streams=True
+    )
+    stream = create(stream=True)
+    assert active(limiter, "m") == 1
+    assert len(list(stream)) == 2
+    assert active(limiter, "m") == 0
+    assert limiter._budgets["m"].tokens == pytest.approx(5970, abs=5)
+
+
+def test_stream_released_on_close_and_collection():
+    limiter = Limiter(concurrency=1)
+    create = limiter.wrap(lambda **kwargs: Stream(), "m", streams=True)
+    with create(stream=True) as stream:
+        next(stream)
+        assert active(limiter, "m") == 1
+    assert active(limiter, "m") == 0
+    assert stream._stream.closed
+    stream = create(stream=True)
+    del stream
+    gc.collect()
+    assert active(limiter, "m") == 0
+
+
+def test_non_stream_call_is_not_proxied():
+    limiter = Limiter(concurrency=1)
+    create = limiter.wrap(lambda **kwargs: Stream(), "m", streams=True)
+    assert type(create(stream=False)) is Stream
+    assert active(limiter, "m") == 0
+
+
+async def test_async_stream_holds_slot_until_exhausted():
+    limiter = Limiter(concurrency=1, tokens_per_minute=6000)
+
+    async def acreate(**kwargs):
+        return AsyncStream()
+
+    create = limiter.wrap_async(acreate, "m", tokens=500, usage=usage, streams=True)
+    stream = await create(stream=True)
+    assert active(limiter, "m") == 1
+    assert len([chunk async for chunk in stream]) == 2
+    assert active(limiter, "m") == 0
+    assert limiter._budgets["m"].tokens == pytest.approx(5970, abs=5)
+
+
+async def test_async_waiter_wakes_on_release():
+    limiter = Limiter(concurrency=1)
+    await limiter.acquire_async("k")
+    waiter = asyncio.ensure_future(limiter.acquire_async("k"))
+    await asyncio.sleep(0.01)
+    assert not waiter.done()
+    limiter.release("k")
+    await asyncio.wait_for(waiter, 1)
+
+
+def test_tool_with_stream_argument_gets_its_own_result():
+    limiter = Limiter(concurrency=1)
+
+    @tool(limit=limiter)
+    def fetch(query, stream=False):
+        return [query]
+
+    assert fetch("a", stream=True) == ["a"]
+    assert active(limiter, "fetch") == 0
+
+
+async def test_async_tool_with_stream_argument_gets_its_own_result():
+    limiter = Limiter(concurrency=1)
+
+    @tool(limit=limiter)
+    async def fetch(query, stream=False):
+        return [query]
+
+    assert await fetch("a", stream=True) == ["a"]
+    assert active(limiter, "fetch") == 0
+
+
+def test_anthropic_stream_usage_adds_input_and_final_output():
+    events = [
+        NS(
+            type="message_start",
+            message=NS(usage=NS(input_tokens=100, output_tokens=1)),
+        ),
+        NS(type="content_block_delta"),
+        NS(type="message_delta", usage=NS(output_tokens=20)),
+        NS(type="message_delta", usage=NS(output_tokens=50)),
+        NS(type="message_stop"),
+    ]
+    limiter = Limiter(tokens_per_minute=6000)
+    create = limiter.wrap(
+        lambda **kwargs: iter(events), "m", tokens=1000, usage=_Usage(), streams=True
+    )
+    assert len(list(create(stream=True))) == 5
+    assert limiter._budgets["m"].tokens == pytest.approx(6000 - 150, abs=5)
+
+
+def test_anthropic_message_usage():
+    message = NS(type="message", usage=NS(input_tokens=100, output_tokens=50))
+    assert _Usage()(message) == 150
@@ -0,0 +1,32 @@
+from agentpulse.loadgen import LoadResult, TraceShape, run
+from agentpulse.stub_collector import StubCollector
+from agentpulse.transport import Lane, Lanes
+
+
+def test_summary_reports_shed_records():
+    tiny = Lane(flush_interval=60, batch_size=10_000, capacity=20)
+    with StubCollector(port=0) as stub:
+        result = run(
+            endpoint=stub.endpoint,
+            shape=TraceShape(depth=1, fanout=3),
+            traces=50,
+            concurrency=2,
+            lanes=Lanes(priority=tiny, default=tiny, bulk=tiny),
+        )
+    summary = result.summary()
+    assert summary["traces"] == 50
+    assert summary["dropped"]["bulk"] > 0
+    assert summary["rejected"] == 0
+
+
+def test_stub_counts_rejected_requests():
+    with StubCollector(port=0, fail_rate=1.0) as stub:
+        run(endpoint=stub.endpoint, traces=5, concurrency=1)
+        assert stub.rejected > 0
+
+
+def test_merge_sums_dropped_per_lane():
+    result = LoadResult(dropped={"bulk": 2}, rejected=1)
+    result.merge(LoadResult(dropped={"bulk": 3, "default": 1}, rejected=2))
+    assert result.dropped == {"bulk": 5, "default": 1}
+    assert result.rejected == 3
@@ -0,0 +1,40 @@
+import json
+import sqlite3
+
+import pytest
+
+from agentpulse import trace
+from agentpulse.exporters import SQLiteExporter
+
+
+@pytest.mark.parametrize("value", [0, False, "", [], {}])
+def test_falsy_outputs_are_stored(make_client, tmp_path, value):
+    path = str(tmp_path / "traces.db")
+    ap = make_client(exporters=[SQLiteExporter(path)])
+
+    @trace
+    def agent():
+        with ap.span("lookup") as span:
+            span.set_output(value)
+
+    agent()
+    ap.flush()
+    with sqlite3.connect(path) as conn:
+        (output,) = conn.execute("SELECT output FROM spans").fetchone()
+    assert output is not None
+    assert json.loads(output) == value
+
+
+def test_missing_output_is_null(make_client, tmp_path):
+    path = str(tmp_path / "traces.db")
+    ap = make_client(exporters=[SQLiteExporter(path)])
+
+    @trace
+    def agent():
+        with ap.span("step"):
+            pass
+
+    agent()
+    ap.flush()
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT output FROM spans").fetchone() == (None,)
@@ -0,0 +1,166 @@
+import json
+
+import pytest
+
+from agentpulse import Span, SpanKind, Trace, TraceStatus, trace
+from agentpulse.transport import BULK, DEFAULT, PRIORITY, Lane, Lanes, Transport
+
+
+def make_trace(*kinds, **span_fields):
+    t = Trace()
+    for kind in kinds:
+        span = Span(name="s", kind=kind, trace_id=t.id)
+        for name, value in span_fields.items():
+            setattr(span, name, value)
+        span.end()
+        t.spans.append(span)
+    return t
+
+
+@pytest.mark.parametrize(
+    ("t", "lane"),
+    [
+        (make_trace(SpanKind.TOOL), BULK),
+        (make_trace(SpanKind.TOOL, SpanKind.LLM), DEFAULT),
+        (make_trace(SpanKind.TOOL, error="boom"), PRIORITY),
+        (make_trace(SpanKind.LLM, cost_usd=0.05), PRIORITY),
+        (make_trace(SpanKind.TOOL, started_at=0.0, ended_at=30.0), PRIORITY),
+    ],
+)
+def test_route(t, lane):
+    assert Lanes().route(t) == lane
+
+
+def test_route_failed_trace_to_priority():
+    t = make_trace(SpanKind.TOOL)
+    t.end(status=TraceStatus.ERROR)
+    assert Lanes().route(t) == PRIORITY
+
+
+@pytest.fixture
+def posts(monkeypatch):
+    sent = []
+
+    def post(self, url, fragments):
+        sent.append((url.rsplit("/", 1)[-1], [json.loads(f) for f in fragments]))
+        return True
+
+    monkeypatch.setattr(Transport, "_post", post)
+    return sent
+
+
+@pytest.fixture
+def transport(posts):
+    lane = Lane(flush_interval=3600, batch_size=10_000, capacity=10)
+    t = Transport(
+        "http://collector.invalid",
+        lanes=Lanes(priority=lane, default=lane, bulk=lane),
+    )
+    yield t
+    t.close()
+
+
+def queue(transport, lane, trace_id, spans=4):
+    if not transport.admit(lane, 1 + spans):
+        return False
+    transport.send_trace({"id": trace_id}, lane)
+    for i in range(spans):
+        transport.send_span({"id": f"{trace_id}-{i}", "trace_id": trace_id}, lane)
+    return True
+
+
+def sent_ids(posts, kind):
+    return [
+        record["id"] for route, records in posts if route == kind for record in records
+    ]
+
+
+def test_full_lane_evicts_oldest_bulk_trace_first(transport, posts):
+    assert queue(transport, BULK, "b0") and queue(transport, BULK, "b1")
+    assert queue(transport, DEFAULT, "d0") and queue(transport, DEFAULT, "d1")
+    assert queue(transport, DEFAULT, "d2")
+    assert transport.dropped == {PRIORITY: 0, DEFAULT: 0, BULK: 5}
+    transport.flush()
+    assert sent_ids(posts, "traces") == ["d0", "d1", "d2", "b1"]
+    assert "b0-0" not in sent_ids(posts, "spans")
+
+
+def test_priority_evicts_bulk_before_default(transport):
+    for lane in (BULK, DEFAULT, PRIORITY):
+        assert queue(transport, lane, f"{lane}0") and queue(transport, lane, f"{lane}1")
+    assert queue(transport, PRIORITY, "p2") and queue(transport, PRIORITY, "p3")
+    assert transport.dropped == {PRIORITY: 0, DEFAULT: 0, BULK: 10}
+    assert queue(transport, PRIORITY, "p4")
+    assert transport.dropped == {PRIORITY: 0, DEFAULT: 5, BULK: 10}
+
+
+def test_borrows_free_room_below_without_evicting(transport):
+    queue(transport, BULK, "b0")
+    queue(transport, PRIORITY, "p0")
+    queue(transport, PRIORITY, "p1")
+    assert queue(transport, PRIORITY, "p2")
+    assert transport.dropped == {PRIORITY: 0, DEFAULT: 0, BULK: 0}
+
+
+def test_rejects_when_nothing_lower_can_go(transport):
+    assert queue(transport, BULK, "b0") and queue(transport, BULK, "b1")
+    assert not queue(transport, BULK, "b2")
+    assert transport.dropped[BULK] == 5
+
+
+def test_spans_of_evicted_trace_are_dropped(transport, posts):
+    queue(transport, BULK, "b0")
+    queue(transport, BULK, "b1")
+    queue(transport, DEFAULT, "d0", spans=9)
+    queue(transport, DEFAULT, "d1", spans=1)
+    transport.send_span({"id": "late", "trace_id": "b0"}, BULK)
+    transport.flush()
+    assert "late" not in sent_ids(posts, "spans")
+    assert "b0" not in sent_ids(posts, "traces")
+
+
+def test_oversized_trace_fits_empty_lane(transport):
+    queue(transport, BULK, "b0")
+    assert queue(transport, PRIORITY, "p0", spans=50)
+    assert transport.dropped == {PRIORITY: 0, DEFAULT: 0, BULK: 0}
+
+
+def test_flush_sends_higher_lanes_first_and_traces_before_spans(transport, posts):
+    queue(transport, BULK, "b0", spans=1)
+    queue(transport, PRIORITY, "p0", spans=1)
+    transport.flush()
+    assert posts == [
+        ("traces", [{"id": "p0"}]),
+        ("spans", [{"id": "p0-0", "trace_id": "p0"}]),
+        ("traces", [{"id": "b0"}]),
+        ("spans", [{"id": "b0-0", "trace_id": "b0"}]),
+    ]
+
+
+def test_spans_travel_in_their_trace_lane(make_client, posts, monkeypatch):
+    lanes = {}
+    send_trace, send_span = Transport.send_trace, Transport.send_span
+
+    def record_trace(self, data, lane=DEFAULT):
+        lanes[data["id"]] = lane
+        send_trace(self, data, lane)
+
+    def record_span(self, data, lane=DEFAULT):
+        lanes[data["id"]] = (data["trace_id"], lane)
+        send_span(self, data, lane)
+
+    monkeypatch.setattr(Transport, "send_trace", record_trace)
+    monkeypatch.setattr(Transport, "send_span", record_span)
+    ap = make_client(exporters=None, endpoint="http://collector.invalid")
+
+    @trace
+    def agent(fail):
+        with ap.span("step", SpanKind.TOOL) as span:
+            if fail:
+                span.error = "boom"
+
+    agent(False)
+    agent(True)
+    span_lanes = [value for value in lanes.values() if isinstance(value, tuple)]
+    assert sorted(lane for _, lane in span_lanes) == [BULK, PRIORITY]
+    assert all(lanes[trace_id] == lane for trace_id, lane in span_lanes)